@@ -0,0 +1,305 @@
+# bnsDataset.py - BNS spreadsheet loading and the compiled corpus artifact
+#
+# The xlsx stays the source of truth. It is compiled once into a directory of
+# .npy arrays (UTF-8 blobs + offsets per text field) that every process can
+# memory-map instead of parsing the workbook. Rebuild explicitly with:
+#   python bnsDataset.py
+import os
+import json
+import hashlib
+import shutil
+import logging
+import argparse
+import tempfile
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Always get project root correctly on Streamlit Cloud
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+FILE_PATH = os.path.join(PROJECT_ROOT, "dataset", "bnsdataset.xlsx")
+CACHE_DIR = os.environ.get("NYAYA_CACHE_DIR", os.path.join(PROJECT_ROOT, "dataset", "cache"))
+CORPUS_DIR = os.path.join(CACHE_DIR, "corpus")
+CORPUS_FORMAT_VERSION = 1
+
+REQUIRED_COLUMNS = [
+    'Section_Number', 'Subsection_Number', 'Title', 'Content',
+    'Explanation', 'Exception', 'Illustrations', 'Punishment', 'Cross_References'
+]
+NUMERIC_COLUMNS = ['Section_Number', 'Subsection_Number']
+TEXT_COLUMNS = [col for col in REQUIRED_COLUMNS if col not in NUMERIC_COLUMNS]
+
+# Placeholders used for missing values in the spreadsheet
+FIELD_DEFAULTS = {
+    'Content': 'No content available',
+    'Explanation': 'No explanation available',
+    'Exception': 'No exceptions mentioned',
+    'Illustrations': 'No illustrations provided',
+    'Punishment': 'No punishment specified',
+    'Cross_References': 'No cross references',
+    'Title': 'Untitled section'
+}
+
+# Fields combined into the text that gets embedded for semantic search.
+# Bump SEARCH_TEXT_VERSION whenever the recipe below changes so that
+# persisted embeddings built with the old recipe are invalidated.
+SEARCH_TEXT_FIELDS = ['Title', 'Content', 'Explanation', 'Illustrations']
+SEARCH_TEXT_VERSION = 1
+SEARCH_TEXT_COLUMN = 'Search_Text'
+
+# Sentinel stored for a missing section number in the int64 column
+MISSING_SECTION = -1
+
+SECTION_INDEX_DTYPE = np.dtype([('section', np.int64), ('subsection', np.float64), ('row', np.int64)])
+
+
+def file_sha256(path: str) -> str:
+    """Hash a file's contents in 1 MiB blocks"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def load_dataset(file_path: str = FILE_PATH) -> pd.DataFrame:
+    """Read the BNS spreadsheet, fill missing values and validate columns"""
+    logger.info(f"Loading dataset from {file_path}")
+    dataset = pd.read_excel(file_path)
+
+    # Handle missing values more intelligently
+    dataset = dataset.fillna(FIELD_DEFAULTS)
+
+    # Validate required columns
+    missing_columns = [col for col in REQUIRED_COLUMNS if col not in dataset.columns]
+    if missing_columns:
+        raise ValueError(f"Missing required columns: {missing_columns}")
+
+    logger.info(f"Dataset loaded successfully with {len(dataset)} rows")
+    return dataset
+
+
+def combine_search_text(parts) -> str:
+    """Join the searchable fields of one row into a single string"""
+    text_parts = [str(part) for part in parts]
+    return " ".join([part for part in text_parts if part and part != 'nan'])
+
+
+def build_search_texts(dataset: pd.DataFrame) -> List[str]:
+    """Combine multiple fields of every row for better matching"""
+    columns = [dataset[field].tolist() for field in SEARCH_TEXT_FIELDS]
+    return [combine_search_text(parts) for parts in zip(*columns)]
+
+
+def _encode_strings(values: List[str]):
+    """Pack strings into one UTF-8 byte blob plus an offsets array"""
+    encoded = [str(value).encode("utf-8") for value in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(item) for item in encoded])
+    blob = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+    return blob, offsets
+
+
+def compile_corpus(file_path: str = FILE_PATH, out_dir: str = CORPUS_DIR) -> str:
+    """Compile the spreadsheet into the memory-mappable corpus directory"""
+    dataset = load_dataset(file_path)
+    source_hash = file_sha256(file_path)
+
+    parent = os.path.dirname(os.path.abspath(out_dir))
+    os.makedirs(parent, exist_ok=True)
+    tmp_dir = tempfile.mkdtemp(dir=parent, prefix=".corpus-")
+    try:
+        sections = pd.to_numeric(dataset['Section_Number'], errors='coerce')
+        sections = sections.fillna(MISSING_SECTION).astype(np.int64).to_numpy()
+        subsections = pd.to_numeric(dataset['Subsection_Number'], errors='coerce').astype(np.float64).to_numpy()
+        np.save(os.path.join(tmp_dir, "Section_Number.npy"), sections)
+        np.save(os.path.join(tmp_dir, "Subsection_Number.npy"), subsections)
+
+        columns = {col: dataset[col].tolist() for col in TEXT_COLUMNS}
+        columns[SEARCH_TEXT_COLUMN] = build_search_texts(dataset)
+        for col, values in columns.items():
+            blob, offsets = _encode_strings(values)
+            np.save(os.path.join(tmp_dir, f"{col}.blob.npy"), blob)
+            np.save(os.path.join(tmp_dir, f"{col}.offsets.npy"), offsets)
+
+        # (section, subsection) -> row, sorted for binary search
+        index = np.empty(len(dataset), dtype=SECTION_INDEX_DTYPE)
+        index['section'] = sections
+        index['subsection'] = subsections
+        index['row'] = np.arange(len(dataset))
+        index.sort(order=['section', 'subsection', 'row'])
+        np.save(os.path.join(tmp_dir, "section_index.npy"), index)
+
+        with open(os.path.join(tmp_dir, "manifest.json"), "w", encoding="utf-8") as f:
+            json.dump({
+                "format": CORPUS_FORMAT_VERSION,
+                "source": os.path.basename(file_path),
+                "source_hash": source_hash,
+                "rows": len(dataset),
+                "text_columns": list(columns),
+                "search_text_fields": SEARCH_TEXT_FIELDS,
+                "search_text_version": SEARCH_TEXT_VERSION,
+            }, f, indent=2)
+
+        if os.path.exists(out_dir):
+            shutil.rmtree(out_dir)
+        os.replace(tmp_dir, out_dir)
+    except Exception:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+
+    logger.info(f"Compiled {len(dataset)} rows from {file_path} into {out_dir}")
+    return out_dir
+
+
+def subsection_key(section: int, subsection: float) -> Optional[int]:
+    """
+    Subsection number as an int. The sheet stores subsections as
+    "<section>.<subsection>" floats (e.g. 103.2), but plain ints are accepted too.
+    """
+    if subsection is None or subsection != subsection:  # None or NaN
+        return None
+    whole, _, fraction = repr(float(subsection)).partition(".")
+    if int(whole) == section:
+        fraction = fraction.rstrip("0")
+        return int(fraction) if fraction.isdigit() else None
+    return int(float(subsection)) if float(subsection).is_integer() else None
+
+
+class SectionIndex:
+    """O(1) lookup from (section, subsection) to row position"""
+
+    def __init__(self, section_index: np.ndarray):
+        self._exact: Dict[Tuple[int, Optional[int]], int] = {}
+        self._by_section: Dict[int, List[Tuple[Optional[int], int]]] = {}
+        # section_index is already sorted by (section, subsection, row)
+        for section, subsection, row in section_index.tolist():
+            if section == MISSING_SECTION:
+                continue
+            key = subsection_key(section, subsection)
+            self._exact.setdefault((section, key), row)
+            self._by_section.setdefault(section, []).append((key, row))
+        self._sections = np.array(sorted(self._by_section), dtype=np.int64)
+
+    def __contains__(self, section: int) -> bool:
+        return section in self._by_section
+
+    def lookup(self, section: int, subsection: Optional[int] = None) -> Optional[int]:
+        """Row of the exact subsection, or of the section's first subsection"""
+        if subsection is not None:
+            row = self._exact.get((section, subsection))
+            if row is not None:
+                return row
+        entries = self._by_section.get(section)
+        return entries[0][1] if entries else None
+
+    def subsections(self, section: int) -> List[Tuple[Optional[int], int]]:
+        """All (subsection, row) pairs of a section, ordered by subsection"""
+        return list(self._by_section.get(section, []))
+
+    def section_range(self, start: int, end: int) -> List[int]:
+        """Section numbers present in the corpus within [start, end]"""
+        lo = np.searchsorted(self._sections, start, side='left')
+        hi = np.searchsorted(self._sections, end, side='right')
+        return self._sections[lo:hi].tolist()
+
+
+class CompiledCorpus:
+    """Read-only, memory-mapped view over a compiled corpus directory"""
+
+    def __init__(self, corpus_dir: str = CORPUS_DIR):
+        self.corpus_dir = corpus_dir
+        with open(os.path.join(corpus_dir, "manifest.json"), "r", encoding="utf-8") as f:
+            self.manifest = json.load(f)
+        if self.manifest.get("format") != CORPUS_FORMAT_VERSION:
+            raise ValueError(f"Unsupported corpus format in {corpus_dir}")
+
+        self.source_hash = self.manifest["source_hash"]
+        self.section_numbers = self._load("Section_Number.npy")
+        self.subsection_numbers = self._load("Subsection_Number.npy")
+        self.section_index = self._load("section_index.npy")
+        self.sections = SectionIndex(self.section_index)
+        self._blobs = {}
+        self._offsets = {}
+        for col in self.manifest["text_columns"]:
+            self._blobs[col] = self._load(f"{col}.blob.npy")
+            self._offsets[col] = self._load(f"{col}.offsets.npy")
+
+    def _load(self, name: str) -> np.ndarray:
+        return np.load(os.path.join(self.corpus_dir, name), mmap_mode="r")
+
+    def __len__(self) -> int:
+        return int(self.manifest["rows"])
+
+    def text(self, column: str, i: int) -> str:
+        offsets = self._offsets[column]
+        return bytes(self._blobs[column][offsets[i]:offsets[i + 1]]).decode("utf-8")
+
+    def column(self, column: str) -> List[str]:
+        """Decode a whole text column (used when rebuilding derived indexes)"""
+        offsets = self._offsets[column]
+        data = bytes(self._blobs[column])
+        return [data[offsets[i]:offsets[i + 1]].decode("utf-8") for i in range(len(self))]
+
+    @property
+    def search_texts(self) -> List[str]:
+        return self.column(SEARCH_TEXT_COLUMN)
+
+    def row(self, i: int) -> Dict:
+        """Materialize one row as a dict keyed by the spreadsheet column names"""
+        section = int(self.section_numbers[i])
+        record = {
+            'Section_Number': None if section == MISSING_SECTION else section,
+            'Subsection_Number': self.subsection_numbers[i],
+        }
+        for col in TEXT_COLUMNS:
+            record[col] = self.text(col, i)
+        return record
+
+
+def _read_manifest(corpus_dir: str) -> Optional[Dict]:
+    try:
+        with open(os.path.join(corpus_dir, "manifest.json"), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def load_corpus(file_path: str = FILE_PATH, corpus_dir: str = CORPUS_DIR) -> CompiledCorpus:
+    """Open the compiled corpus, recompiling first if the spreadsheet changed"""
+    manifest = _read_manifest(corpus_dir)
+    if os.path.exists(file_path):
+        stale = (
+            manifest is None
+            or manifest.get("format") != CORPUS_FORMAT_VERSION
+            or manifest.get("search_text_version") != SEARCH_TEXT_VERSION
+            or manifest.get("source_hash") != file_sha256(file_path)
+        )
+        if stale:
+            logger.info(f"Compiled corpus at {corpus_dir} is missing or stale, rebuilding")
+            compile_corpus(file_path, corpus_dir)
+    elif manifest is None:
+        raise FileNotFoundError(f"Neither {file_path} nor a compiled corpus in {corpus_dir} exists")
+
+    corpus = CompiledCorpus(corpus_dir)
+    logger.info(f"Loaded compiled corpus with {len(corpus)} rows from {corpus_dir}")
+    return corpus
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compile bnsdataset.xlsx into the binary corpus")
+    parser.add_argument("--dataset", default=FILE_PATH, help="Path to bnsdataset.xlsx")
+    parser.add_argument("--out", default=CORPUS_DIR, help="Output corpus directory")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    out_dir = compile_corpus(args.dataset, args.out)
+    print(f"Compiled corpus written to {out_dir}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+# chatLoadTest.py - load test for server.py
+#
+# Opens many asyncio clients spread over several rooms; each sender posts
+# messages carrying its send time, and every receiver records the fan-out
+# latency (send -> delivery) of each copy it gets. Reports delivered
+# messages/sec and latency percentiles.
+#   python chatLoadTest.py --clients 2000 --rooms 20 --messages 20
+#   python chatLoadTest.py --host 10.0.0.5 --port 8051 --clients 500
+# Without --host an in-process ChatServer is started on a free port (it then
+# shares the event loop with the clients, so latencies are pessimistic).
+# Thousands of clients need a raised open-file limit (ulimit -n).
+import json
+import time
+import asyncio
+import argparse
+from typing import Dict, List
+
+import numpy as np
+
+from server import ChatServer
+
+PREFIX = "loadtest"
+
+
+async def _connect(host: str, port: int, username: str, room: str):
+    reader, writer = await asyncio.open_connection(host, port, limit=1024 * 1024)
+    writer.write((json.dumps({"username": username, "room": room}) + "\n").encode("utf-8"))
+    await writer.drain()
+    return reader, writer
+
+
+async def _receive(reader: asyncio.StreamReader, latencies: List[float], expected: int,
+                   done: asyncio.Event, dropped: List[int]):
+    """Count load-test messages until this client has seen all it expects"""
+    seen = 0
+    while seen < expected:
+        line = await reader.readline()
+        if not line:
+            # Server cut us off as a slow consumer
+            dropped.append(1)
+            break
+        msg = json.loads(line)
+        text = msg.get("message", "")
+        if not text.startswith(PREFIX):
+            continue
+        latencies.append(time.perf_counter() - float(text.split(":")[2]))
+        seen += 1
+    done.set()
+
+
+async def run(host: str, port: int, clients: int, rooms: int, senders: int,
+              messages: int, interval: float, timeout: float) -> Dict:
+    room_names = [f"room-{r}" for r in range(rooms)]
+    members = {room: [] for room in room_names}
+    connect_start = time.perf_counter()
+    connections = []
+    # Connect in waves so the accept backlog is not overrun
+    for start in range(0, clients, 256):
+        wave = [_connect(host, port, f"user-{i}", room_names[i % rooms])
+                for i in range(start, min(start + 256, clients))]
+        connections.extend(await asyncio.gather(*wave))
+    for i, connection in enumerate(connections):
+        members[room_names[i % rooms]].append(connection)
+    connect_time = time.perf_counter() - connect_start
+
+    # Each room's first `senders` members send; everyone in the room receives every copy
+    latencies: List[float] = []
+    dropped: List[int] = []
+    waiters = []
+    receivers = []
+    for room, conns in members.items():
+        expected = min(senders, len(conns)) * messages
+        for reader, _ in conns:
+            done = asyncio.Event()
+            waiters.append(done)
+            receivers.append(asyncio.ensure_future(_receive(reader, latencies, expected, done, dropped)))
+
+    async def send(writer: asyncio.StreamWriter, sender_id: str):
+        for seq in range(messages):
+            text = f"{PREFIX}:{sender_id}-{seq}:{time.perf_counter()!r}"
+            writer.write((json.dumps({"message": text}) + "\n").encode("utf-8"))
+            await writer.drain()
+            if interval:
+                await asyncio.sleep(interval)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(send(writer, f"{room}/{j}")
+                           for room, conns in members.items()
+                           for j, (_, writer) in enumerate(conns[:senders])))
+    sent = time.perf_counter() - start
+    try:
+        await asyncio.wait_for(asyncio.gather(*(w.wait() for w in waiters)), timeout)
+    except asyncio.TimeoutError:
+        pass
+    elapsed = time.perf_counter() - start
+
+    for task in receivers:
+        task.cancel()
+    for _, writer in connections:
+        writer.close()
+
+    expected_total = sum(min(senders, len(conns)) * messages * len(conns) for conns in members.values())
+    latencies_ms = np.array(latencies) * 1000
+    percentile = (lambda q: float(np.percentile(latencies_ms, q))) if len(latencies_ms) else (lambda q: 0.0)
+    return {
+        "clients": clients,
+        "rooms": rooms,
+        "connect_s": connect_time,
+        "sent": sum(min(senders, len(conns)) * messages for conns in members.values()),
+        "send_s": sent,
+        "delivered": len(latencies),
+        "expected": expected_total,
+        "disconnected": len(dropped),
+        "elapsed_s": elapsed,
+        "delivered_per_s": len(latencies) / elapsed if elapsed else 0.0,
+        "latency_ms_p50": percentile(50),
+        "latency_ms_p95": percentile(95),
+        "latency_ms_p99": percentile(99),
+        "latency_ms_max": float(latencies_ms.max()) if len(latencies_ms) else 0.0,
+    }
+
+
+async def _main(args) -> Dict:
+    server = None
+    host, port = args.host, args.port
+    if host is None:
+        server = ChatServer("127.0.0.1", 0, queue_size=args.queue_size)
+        await server.start()
+        host, port = server.host, server.port
+    try:
+        result = await run(host, port, args.clients, args.rooms, args.senders,
+                           args.messages, args.interval, args.timeout)
+        if server is not None:
+            result["server"] = dict(server.stats)
+    finally:
+        if server is not None:
+            await server.stop()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the Inbox chat server")
+    parser.add_argument("--host", help="Server to test (default: start one in-process)")
+    parser.add_argument("--port", type=int, default=8051)
+    parser.add_argument("--clients", type=int, default=1000)
+    parser.add_argument("--rooms", type=int, default=10)
+    parser.add_argument("--senders", type=int, default=2, help="Senders per room")
+    parser.add_argument("--messages", type=int, default=20, help="Messages per sender")
+    parser.add_argument("--interval", type=float, default=0.01, help="Seconds between a sender's messages")
+    parser.add_argument("--queue-size", type=int, default=256, help="Per-client send queue (in-process server)")
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--json", action="store_true", help="Print raw results as JSON")
+    args = parser.parse_args()
+
+    result = asyncio.run(_main(args))
+    if args.json:
+        print(json.dumps(result, indent=2))
+        return
+    print(f"{result['clients']} clients in {result['rooms']} rooms, connected in {result['connect_s']:.2f}s")
+    print(f"sent {result['sent']} messages, delivered {result['delivered']}/{result['expected']} "
+          f"in {result['elapsed_s']:.2f}s ({result['delivered_per_s']:.0f} msg/s), "
+          f"{result['disconnected']} clients disconnected")
+    print(f"fan-out latency ms: p50 {result['latency_ms_p50']:.1f}  p95 {result['latency_ms_p95']:.1f}  "
+          f"p99 {result['latency_ms_p99']:.1f}  max {result['latency_ms_max']:.1f}")
+    if "server" in result:
+        print(f"server: {result['server']}")
+
+
+if __name__ == "__main__":
+    main()
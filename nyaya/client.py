@@ -1,18 +1,27 @@
 # client.py — Final cleaned & complete version
+import os
 import streamlit as st
 import socket
 import json
 import threading
-import time
 from datetime import datetime
-from nyayaFunction import modelRun
+from nyayaFunction import modelRun_stream, warm_up, translates_query
 from langTranslator import MinimalIndianTranslator
+from translationCache import CachedTranslator
+from sectionTranslations import PretranslatedTranslator
+from searchClient import SEARCH_SERVICE_URL, RemoteSearchClient
+from documentJobs import DOC_WORKERS, DONE, FAILED, STAGES, JobQueue
 
 # ============================================================================
 # Configuration (change these if needed)
 # ============================================================================
 CHAT_SERVER_HOST = "127.0.0.1"   # change if your chat server runs elsewhere
 CHAT_SERVER_PORT = 8051
+CHAT_ROOM = "lobby"
+CHAT_HISTORY_ITEMS = 200          # messages kept per chat connection
+INBOX_REFRESH_SECONDS = 1.0       # how often the Inbox fragment checks for new messages
+INBOX_SHOWN_ITEMS = 10
+JOBS_REFRESH_SECONDS = 1.0        # how often the Document Intelligence panel polls job progress
 
 # Maximum message history to keep in session (for performance)
 MAX_HISTORY_ITEMS = 200
@@ -22,108 +31,177 @@ TRIM_TO_LAST = 100
 # Chat client (for "Inbox" feature) — simple TCP client
 # ============================================================================
 class ChatClient:
-    def __init__(self, host=CHAT_SERVER_HOST, port=CHAT_SERVER_PORT):
+    def __init__(self, host=CHAT_SERVER_HOST, port=CHAT_SERVER_PORT, room=CHAT_ROOM):
         self.host = host
         self.port = port
+        self.room = room
         self.client_socket = None
         self.connected = False
-        self.messages = []  # list of dicts: {"sender": ..., "message": ..., "timestamp": ...}
+        self.messages = []  # list of dicts: {"sender": ..., "message": ..., "timestamp": ..., "room": ...}
+        self.version = 0    # bumped by the receive thread whenever messages arrive
+        self.last_error = None  # shown by the caller; this class makes no Streamlit calls
+        self._lock = threading.Lock()
+
+    def _send(self, payload):
+        # One JSON object per line (see server.py)
+        self.client_socket.sendall((json.dumps(payload) + "\n").encode("utf-8"))
 
     def connect(self, username):
         try:
             self.client_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
             self.client_socket.connect((self.host, self.port))
-            self.client_socket.send(json.dumps({"username": username}).encode("utf-8"))
+            self._send({"username": username, "room": self.room})
             self.connected = True
 
             receive_thread = threading.Thread(target=self.receive_messages, daemon=True)
             receive_thread.start()
             return True
         except Exception as e:
-            st.sidebar.error(f"Connection failed: {e}")
+            self.last_error = str(e)
             return False
 
     def send_message(self, message):
         if not self.connected:
             return False
         try:
-            self.client_socket.send(json.dumps({"message": message}).encode("utf-8"))
+            self._send({"message": message})
             return True
         except Exception as e:
-            st.sidebar.error(f"Send failed: {e}")
+            self.last_error = str(e)
             self.connected = False
             return False
 
     def receive_messages(self):
+        buffer = b""
         while self.connected:
             try:
                 data = self.client_socket.recv(4096)
                 if not data:
                     self.connected = False
                     break
-                # Try decode and append
-                try:
-                    payload = data.decode("utf-8")
-                    # The server may send multiple JSON objects concatenated; try parsing robustly
-                    parts = payload.strip().split("\n")
-                    for part in parts:
-                        if not part:
-                            continue
-                        try:
-                            msg = json.loads(part)
-                            self.messages.append(msg)
-                        except json.JSONDecodeError:
-                            # attempt to salvage partial messages
-                            continue
-                except Exception:
-                    continue
-                time.sleep(0.1)
+                # A read may hold several messages or end mid-message; keep the tail
+                buffer += data
+                *lines, buffer = buffer.split(b"\n")
+                received = []
+                for line in lines:
+                    if not line.strip():
+                        continue
+                    try:
+                        received.append(json.loads(line.decode("utf-8")))
+                    except (UnicodeDecodeError, json.JSONDecodeError):
+                        continue
+                if received:
+                    with self._lock:
+                        self.messages = (self.messages + received)[-CHAT_HISTORY_ITEMS:]
+                        self.version += 1
             except Exception:
                 self.connected = False
                 break
+        with self._lock:
+            self.version += 1
+
+    def recent(self, n):
+        """(version, last n messages) as one consistent snapshot"""
+        with self._lock:
+            return self.version, self.messages[-n:]
+
+
+@st.cache_resource
+def get_remote_search():
+    """One pooled connection to the search service, shared by every session"""
+    return RemoteSearchClient(SEARCH_SERVICE_URL)
+
+
+@st.cache_resource
+def get_job_queue():
+    """Document jobs table plus this process's worker threads, shared by every session"""
+    jobs = JobQueue()
+    jobs.start_workers(DOC_WORKERS)
+    return jobs
 
 
 # ============================================================================
 # Translation & formatting helpers
 # ============================================================================
+def _english(text):
+    return text
+
+
+def format_legal_header(response, tr=_english):
+    """Title, section and the explanation heading of a successful response"""
+    title = response.get("title", "Legal Information")
+    section = response.get("section_number", "N/A")
+    subsection = response.get("subsection_number", "N/A")
+    return f"""**{tr(title)}**
+
+**{tr('Section')}:** {section}  |  **{tr('Subsection')}:** {subsection}
+
+**{tr('Detailed Explanation')}:**  
+"""
+
+
+def format_legal_footer(response, tr=_english):
+    """Punishment, cross references and source line of a successful response"""
+    punishment = response.get("punishment", "No punishment specified.")
+    cross_refs = response.get("cross_references", "None specified.")
+    return f"""**{tr('Punishment')}:**  
+{tr(punishment)}
+
+**{tr('Cross References')}:**  
+{tr(cross_refs)}
+
+---  
+*{tr('Source: Bharatiya Nyaya Sanhita (BNS)')}*
+"""
+
+
 def format_legal_text(response, translator=None, target_lang="english"):
     """
     Convert structured response (dict) into a human readable markdown string.
     If translator is provided and target_lang != 'english', translate final text.
     """
+    translate = translator and target_lang and target_lang.lower() != "english"
+
     if isinstance(response, dict) and response.get("status") == "success":
-        title = response.get("title", "Legal Information")
-        section = response.get("section_number", "N/A")
-        subsection = response.get("subsection_number", "N/A")
         explanation = response.get("explanation", response.get("original_explanation", "No explanation available."))
-        punishment = response.get("punishment", "No punishment specified.")
-        cross_refs = response.get("cross_references", "None specified.")
-
-        text = f"""**{title}**
 
-**Section:** {section}  |  **Subsection:** {subsection}
+        def render(tr):
+            return f"{format_legal_header(response, tr)}{tr(explanation)}\n\n{format_legal_footer(response, tr)}"
 
-**Detailed Explanation:**  
-{explanation}
+        if not translate:
+            return render(_english)
+        # Static section fields and labels come from the pre-translated corpus
+        # (sectionTranslations.py); whatever it lacks (typically the fresh LLM
+        # explanation) is translated live, all of it in one batch
+        fields = []
 
-**Punishment:**  
-{punishment}
+        def collect(field):
+            fields.append(str(field))
+            return ""
 
-**Cross References:**  
-{cross_refs}
-
----  
-*Source: Bharatiya Nyaya Sanhita (BNS)*
-"""
+        render(collect)
+        fields = list(dict.fromkeys(fields))
+        try:
+            if hasattr(translator, "translate_batch"):
+                translated = translator.translate_batch(fields, "english", target_lang)
+            else:
+                translated = [translator.translate(field, "english", target_lang) for field in fields]
+        except Exception:
+            # fallback to original English formatted text on translation error
+            translated = fields
+        lookup = dict(zip(fields, translated))
+        return render(lambda field: lookup.get(str(field)) or str(field))
     elif isinstance(response, dict) and response.get("status") == "no_match":
         text = f"{response.get('message','No relevant legal information found.')}\n\n💡 {response.get('suggestion','Try rephrasing your query or use more specific legal terms.')}"
+    elif isinstance(response, dict) and response.get("status") == "warming_up":
+        text = f"⏳ {response.get('message', 'The legal search engine is warming up. Please try again shortly.')}"
     elif isinstance(response, dict) and response.get("status") == "error":
         text = f"Error: {response.get('message', 'Unknown error')}"
     else:
         text = str(response)
 
     # Translate final formatted text if requested
-    if translator and target_lang and target_lang.lower() != "english":
+    if translate:
         try:
             return translator.translate(text, "english", target_lang)
         except Exception:
@@ -132,6 +210,22 @@ def format_legal_text(response, translator=None, target_lang="english"):
     return text
 
 
+def render_history_content(content, translator=None, target_lang="english"):
+    """
+    Markdown for a stored assistant message. Pipeline answers keep one render per
+    language under 'renders', so reruns reuse them instead of re-translating.
+    """
+    if "bot" in content:
+        renders = content.setdefault("renders", {})
+        if target_lang not in renders:
+            renders[target_lang] = format_legal_text(content["bot"], translator, target_lang)
+        return renders[target_lang]
+    if content.get("type") == "error":
+        # Error messages are stored already translated
+        return f"Error: {content.get('message', 'Unknown error')}"
+    return format_legal_text(content, translator, target_lang)
+
+
 def safe_translate(translator, text, src_lang, tgt_lang):
     """
     Wrapper for translator.translate with safe fallback.
@@ -153,11 +247,96 @@ def check_query_length(q, max_len=500):
     return True, q
 
 
+@st.fragment(run_every=INBOX_REFRESH_SECONDS)
+def inbox_room():
+    """Chat room panel; reruns on its own, so new messages never rerun the whole page"""
+    client = st.session_state.client
+    version, recent = client.recent(INBOX_SHOWN_ITEMS)
+    if version != st.session_state.inbox_version:
+        # Only reformat when the receive thread has delivered something new
+        st.session_state.inbox_version = version
+        st.session_state.inbox_view = [
+            (msg.get("sender", "Server"), msg.get("message", ""), msg.get("timestamp", datetime.now().strftime("%H:%M:%S")))
+            for msg in recent
+        ]
+
+    if not client.connected:
+        st.warning("Disconnected from chat server.")
+    st.write("**Recent messages from server:**")
+    for sender, content, t in st.session_state.inbox_view:
+        if sender == "Server":
+            st.info(f"[{t}] {content}")
+        elif sender == st.session_state.username:
+            st.success(f"[{t}] You: {content}")
+        else:
+            st.warning(f"[{t}] {sender}: {content}")
+
+    # Inside the fragment, sending only reruns this panel too
+    with st.form("send_inbox", clear_on_submit=True):
+        out_msg = st.text_input("Type a message to server", key="inbox_msg")
+        send_ok = st.form_submit_button("Send")
+        if send_ok and out_msg:
+            if client.send_message(out_msg):
+                st.success("Sent to server")
+            else:
+                st.error(f"Failed to send: {client.last_error}" if client.last_error else "Failed to send")
+
+
+@st.fragment(run_every=JOBS_REFRESH_SECONDS)
+def document_jobs(show_text):
+    """Progress and results of this session's document jobs; reruns on its own"""
+    jobs = get_job_queue()
+    for job_id in st.session_state.doc_jobs:
+        record = jobs.get(job_id)
+        if record is None:
+            continue
+        name = record["filename"] or job_id
+        result = record["result"]
+        if record["status"] == FAILED:
+            st.error(f"{name}: {record['error']}")
+            continue
+        if record["status"] != DONE:
+            stage = record["stage"] or "queued"
+            if stage == "extract" and record["pages_total"]:
+                fraction = record["pages_done"] / record["pages_total"]
+                label = f"{name}: reading page {record['pages_done']}/{record['pages_total']}"
+            else:
+                fraction = STAGES.index(stage) / len(STAGES) if stage in STAGES else 0.0
+                label = f"{name}: {stage}"
+            st.progress(fraction, text=label)
+            continue
+
+        with st.expander(f"{name} ({len(result.get('pages', []))} pages)", expanded=True):
+            if result.get("summary"):
+                st.markdown("**Summary**")
+                st.write(result["summary"])
+            if result.get("sections"):
+                st.markdown("**Relevant BNS sections**")
+                for section in result["sections"]:
+                    cited = " (cited)" if section.get("cited") else ""
+                    st.write(f"Section {section['section_number']}: {section['title']}{cited}"
+                             f" — score {section.get('score', 0):.2f}")
+                    for evidence in section.get("evidence", []):
+                        st.caption(f"Page {evidence['page']}: {evidence['text']}")
+            if show_text and result.get("pages"):
+                text = "".join(f"--- Page {p['page']} ---\n{p['text']}\n\n" for p in result["pages"])
+                st.download_button("Download text", text, file_name=f"{os.path.splitext(name)[0]}.txt",
+                                   key=f"download_{job_id}")
+
+
 # ============================================================================
 # Streamlit UI bootstrapping
 # ============================================================================
 st.set_page_config(page_title="Nyaya — AI Legal Assistant", layout="wide")
 
+if SEARCH_SERVICE_URL:
+    # Search runs in searchService.py; this process never loads the engine
+    search_stream = get_remote_search().search_stream
+else:
+    # Load the search engine in the background (once per process) so the UI paints immediately
+    warm_up()
+    search_stream = modelRun_stream
+
 st.title("Nyaya — AI Legal Assistant")
 st.write("---")
 
@@ -169,17 +348,22 @@ if "username" not in st.session_state:
 if "connected" not in st.session_state:
     st.session_state.connected = False
 if "translator" not in st.session_state:
+    # Chunks default to the provider's request limit
     translator = MinimalIndianTranslator()
-    translator.set_chunk_size(300)
-    st.session_state.translator = translator
+    # Pre-translated corpus first, then the process-wide cache, then live translation
+    st.session_state.translator = PretranslatedTranslator(CachedTranslator(translator))
 if "selected_language" not in st.session_state:
     st.session_state.selected_language = "english"
 if "messages" not in st.session_state:
     st.session_state.messages = [
         {"role": "assistant", "content": "Hello! I'm **Nyaya**, your AI legal assistant. How can I help you today?", "timestamp": datetime.now().isoformat()}
     ]
-if "auto_refresh" not in st.session_state:
-    st.session_state.auto_refresh = False
+if "doc_jobs" not in st.session_state:
+    # Job ids live in the URL too, so a reload or reconnect picks the results back up
+    st.session_state.doc_jobs = [j for j in st.query_params.get("jobs", "").split(",") if j]
+if "inbox_version" not in st.session_state:
+    st.session_state.inbox_version = -1
+    st.session_state.inbox_view = []
 if "max_query_length" not in st.session_state:
     st.session_state.max_query_length = 500   
 
@@ -208,8 +392,6 @@ with st.sidebar:
 
     # Inbox UI
     if menu == "Inbox":
-        st.session_state.auto_refresh = True
-
         if not st.session_state.connected:
             st.subheader("Login to Chat Server")
             with st.form("login_form"):
@@ -221,34 +403,16 @@ with st.sidebar:
                         st.session_state.username = username
                         st.session_state.connected = True
                         st.success("Connected to chat server")
-                        st.experimental_rerun()
+                        st.rerun()
                     else:
-                        st.error("Connection failed. Check server or host/port settings.")
+                        st.error(f"Connection failed ({st.session_state.client.last_error}). "
+                                 "Check server or host/port settings.")
 
         else:
             st.subheader("Chat Room")
             st.success(f"Connected as: {st.session_state.username}")
 
-            st.write("**Recent messages from server:**")
-            for msg in st.session_state.client.messages[-10:]:
-                sender = msg.get("sender", "Server")
-                content = msg.get("message", "")
-                t = msg.get("timestamp", datetime.now().strftime("%H:%M:%S"))
-                if sender == "Server":
-                    st.info(f"[{t}] {content}")
-                elif sender == st.session_state.username:
-                    st.success(f"[{t}] You: {content}")
-                else:
-                    st.warning(f"[{t}] {sender}: {content}")
-
-            with st.form("send_inbox"):
-                out_msg = st.text_input("Type a message to server", key="inbox_msg")
-                send_ok = st.form_submit_button("Send")
-                if send_ok and out_msg:
-                    if st.session_state.client.send_message(out_msg):
-                        st.success("Sent to server")
-                    else:
-                        st.error("Failed to send")
+            inbox_room()
 
     # Document intelligence / Upload
     else:
@@ -259,9 +423,14 @@ with st.sidebar:
             extract_text = st.checkbox("Extract text", value=True)
             legal_analysis = st.checkbox("Legal analysis", value=True)
             if st.button("Analyze Documents"):
-                with st.spinner("Processing documents..."):
-                    time.sleep(1)
-                    st.success("Documents processed (placeholder).")
+                options = {"summarize": legal_analysis, "sections": legal_analysis}
+                for uploaded in uploaded_files:
+                    job_id = get_job_queue().submit(uploaded.getvalue(), uploaded.name, options)
+                    if job_id not in st.session_state.doc_jobs:
+                        st.session_state.doc_jobs.append(job_id)
+                st.query_params["jobs"] = ",".join(st.session_state.doc_jobs)
+        if st.session_state.doc_jobs:
+            document_jobs(extract_text if uploaded_files else True)
 
 # ============================================================================
 # Main chat area
@@ -297,7 +466,7 @@ for i, msg in enumerate(messages):
 
         if isinstance(content, dict):
             st.markdown(
-                format_legal_text(
+                render_history_content(
                     content,
                     st.session_state.translator,
                     st.session_state.selected_language,
@@ -328,7 +497,7 @@ if prompt:
         with st.chat_message("assistant"):
             st.error(err_text)
         st.session_state.messages.append({"role": "assistant", "content": {"type": "error", "message": err_text}, "timestamp": datetime.now().isoformat()})
-        st.experimental_rerun()
+        st.rerun()
 
     # 1) Display user message immediately
     with st.chat_message("user"):
@@ -337,39 +506,53 @@ if prompt:
     # 2) Save user message to history
     st.session_state.messages.append({"role": "user", "content": prompt, "timestamp": datetime.now().isoformat()})
 
-    # 3) Translate user's prompt into English (backend language)
-    if selected_lang != "english":
-        english_query = safe_translate(st.session_state.translator, prompt, selected_lang, "english")
+    # 3) Translate user's prompt into English (backend language), unless the
+    # multilingual query model can embed this language directly
+    if translates_query(selected_lang):
+        search_query = safe_translate(st.session_state.translator, prompt, selected_lang, "english")
     else:
-        english_query = prompt
+        search_query = prompt
 
-    # 4) Query backend (modelRun) — runs in English
+    # 4) Query backend (modelRun).
+    # The stream yields the matched section first, then the explanation tokens.
     with st.chat_message("assistant"):
         with st.spinner("Thinking..."):
             try:
-                bot_response = modelRun(english_query)  # expected to be dict with keys like status, title, explanation...
+                stream = search_stream(search_query)
+                bot_response = next(stream)  # expected to be dict with keys like status, title, explanation...
             except Exception as e:
                 err_msg = f"Error during modelRun: {e}"
                 # translate error message if necessary
                 display_err = safe_translate(st.session_state.translator, err_msg, "english", selected_lang) if selected_lang != "english" else err_msg
                 st.error(display_err)
                 st.session_state.messages.append({"role": "assistant", "content": {"type": "error", "message": display_err}, "timestamp": datetime.now().isoformat()})
-                st.experimental_rerun()
-
-            # 5) Format and translate final output to selected language
-            try:
-                final_rendered = format_legal_text(bot_response, st.session_state.translator, selected_lang)
-            except Exception:
-                # fallback to a safe str rendering
-                final_rendered = str(bot_response)
+                st.rerun()
+
+        if selected_lang == "english" and isinstance(bot_response, dict) and bot_response.get("status") == "success":
+            # 5) English: show the section at once and stream the explanation token by token
+            st.markdown(format_legal_header(bot_response))
+            st.write_stream(stream)
+            st.markdown(format_legal_footer(bot_response))
+            final_rendered = format_legal_text(bot_response)
+        else:
+            # 5) Other languages need the full explanation before it can be translated
+            with st.spinner("Thinking..."):
+                for _ in stream:
+                    pass
+                try:
+                    final_rendered = format_legal_text(bot_response, st.session_state.translator, selected_lang)
+                except Exception:
+                    # fallback to a safe str rendering
+                    final_rendered = str(bot_response)
 
             # 6) Display final rendered output immediately
             st.markdown(final_rendered)
 
     # 7) Save assistant response to history in a way that preserves both source data and rendered text
-    # We store a dict with two keys: 'bot' = original response dict (if any), 'rendered' = final translated markdown string
+    # We store 'bot' = original response dict (if any), 'rendered' = final translated markdown string
+    # and 'renders' = rendered markdown per language, reused by the history renderer
     stored_content = bot_response if isinstance(bot_response, dict) else {"raw": bot_response}
-    wrapped = {"bot": stored_content, "rendered": final_rendered}
+    wrapped = {"bot": stored_content, "rendered": final_rendered, "renders": {selected_lang: final_rendered}}
     st.session_state.messages.append({"role": "assistant", "content": wrapped, "timestamp": datetime.now().isoformat()})
 
     # 8) Trim history for performance
@@ -378,17 +561,3 @@ if prompt:
 
     # 9) Rerun to ensure UI updates (history will now include this turn)
     st.rerun()
-
-# ============================================================================
-# Auto-refresh / Inbox polling (only when Inbox selected)
-# ============================================================================
-if menu == "Inbox":
-    st.session_state.auto_refresh = True
-else:
-    st.session_state.auto_refresh = False
-
-if st.session_state.auto_refresh and menu == "Inbox":
-    # small sleep so we don't lock the UI too aggressively
-    time.sleep(1)
-    st.rerun()
-
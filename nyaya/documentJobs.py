@@ -0,0 +1,283 @@
+# documentJobs.py - background jobs for the Document Intelligence sidebar
+#
+# Uploaded PDFs are queued in a SQLite table (WAL mode) and processed by
+# worker threads as pipeline stages:
+#   extract    pdfUsingOCR.extract_pages, with per-page progress
+#   summarize  pdfSummarize.DocumentSummarizer (map-reduce over the gateway)
+#   sections   firMapping.map_document over the extracted pages (no LLM)
+# Each stage's output is saved as soon as it finishes, and a job is keyed on
+# the PDF's content hash plus its options, so re-uploading a document or
+# reconnecting to a finished job never recomputes it. The Streamlit app runs
+# NYAYA_DOC_WORKERS worker threads; more can run as separate processes:
+#   python documentJobs.py --workers 2
+#   python documentJobs.py --status <job id>
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import argparse
+import threading
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+from bnsDataset import CACHE_DIR
+
+logger = logging.getLogger(__name__)
+
+JOBS_DB_PATH = os.environ.get("NYAYA_JOBS_DB", os.path.join(CACHE_DIR, "jobs.sqlite3"))
+JOBS_DIR = os.environ.get("NYAYA_JOBS_DIR", os.path.join(CACHE_DIR, "jobs"))
+DOC_WORKERS = int(os.environ.get("NYAYA_DOC_WORKERS", "1"))
+POLL_SECONDS = 1.0
+# A running job whose heartbeat is older than this is assumed dead and requeued;
+# workers refresh it every HEARTBEAT_SECONDS while a stage runs
+STALE_SECONDS = 300
+HEARTBEAT_SECONDS = 30
+
+STAGES = ["extract", "summarize", "sections"]
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+
+
+def job_id(data: bytes, options: Dict) -> str:
+    """Same PDF bytes and options -> same job"""
+    digest = hashlib.sha256(data)
+    digest.update(json.dumps(options, sort_keys=True).encode("utf-8"))
+    return digest.hexdigest()[:32]
+
+
+class JobQueue:
+    """SQLite-backed job table; safe to share between threads and processes"""
+
+    def __init__(self, path: str = JOBS_DB_PATH, jobs_dir: str = JOBS_DIR):
+        self.path = path
+        self.jobs_dir = jobs_dir
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._workers: List[threading.Thread] = []
+        self._gateway = None
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        os.makedirs(jobs_dir, exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                filename TEXT,
+                options TEXT NOT NULL,
+                status TEXT NOT NULL,
+                stage TEXT,
+                pages_done INTEGER NOT NULL DEFAULT 0,
+                pages_total INTEGER NOT NULL DEFAULT 0,
+                result TEXT NOT NULL DEFAULT '{}',
+                error TEXT,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs(status, created_at)")
+
+    def _pdf_path(self, job: str) -> str:
+        return os.path.join(self.jobs_dir, f"{job}.pdf")
+
+    # ------------------------------------------------------------------ producer side
+
+    def submit(self, data: bytes, filename: str, options: Optional[Dict] = None) -> str:
+        """Queue a PDF; an identical earlier job (queued, running or done) is reused"""
+        options = options or {}
+        job = job_id(data, options)
+        path = self._pdf_path(job)
+        if not os.path.exists(path):
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR IGNORE INTO jobs (id, filename, options, status, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (job, filename, json.dumps(options, sort_keys=True), QUEUED, now, now)
+            )
+            # A failed job is retried when the same document is submitted again
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, error = NULL, updated_at = ? WHERE id = ? AND status = ?",
+                (QUEUED, now, job, FAILED)
+            )
+        return job
+
+    def get(self, job: str) -> Optional[Dict]:
+        with self._lock:
+            cursor = self._conn.execute("SELECT * FROM jobs WHERE id = ?", (job,))
+            row = cursor.fetchone()
+            columns = [c[0] for c in cursor.description]
+        if row is None:
+            return None
+        record = dict(zip(columns, row))
+        record["options"] = json.loads(record["options"])
+        record["result"] = json.loads(record["result"])
+        return record
+
+    # ------------------------------------------------------------------ worker side
+
+    def _claim(self) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT id FROM jobs WHERE status = ? OR (status = ? AND updated_at < ?) "
+                    "ORDER BY created_at LIMIT 1",
+                    (QUEUED, RUNNING, now - STALE_SECONDS)
+                ).fetchone()
+                if row is not None:
+                    self._conn.execute("UPDATE jobs SET status = ?, updated_at = ? WHERE id = ?",
+                                       (RUNNING, now, row[0]))
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return row[0] if row is not None else None
+
+    def _update(self, job: str, **fields):
+        fields["updated_at"] = time.time()
+        if "result" in fields:
+            fields["result"] = json.dumps(fields["result"], ensure_ascii=False)
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        with self._lock:
+            self._conn.execute(f"UPDATE jobs SET {assignments} WHERE id = ?", (*fields.values(), job))
+
+    def _run(self, job: str):
+        record = self.get(job)
+        options, result = record["options"], record["result"]
+        path = self._pdf_path(job)
+
+        # Stages already in the result were finished by an earlier attempt
+        if "pages" not in result:
+            from pdfUsingOCR import extract_pages
+            self._update(job, stage="extract")
+            last = [0.0]
+
+            def progress(done: int, total: int):
+                # Throttle writes; the final page is always recorded
+                if done == total or time.time() - last[0] > 0.5:
+                    last[0] = time.time()
+                    self._update(job, pages_done=done, pages_total=total)
+
+            pages = extract_pages(path, progress=progress)
+            result["pages"] = [{"page": p["page"], "source": p["source"], "text": p["text"]} for p in pages]
+            self._update(job, result=result, pages_done=len(pages), pages_total=len(pages))
+
+        text = "".join(f"--- Page {p['page']} ---\n{p['text']}\n\n" for p in result["pages"])
+        if options.get("summarize", True) and "summary" not in result:
+            from pdfSummarize import DocumentSummarizer
+            self._update(job, stage="summarize")
+            summarizer = DocumentSummarizer(self._llm())
+            result["summary"] = summarizer.summarize_sync(text)
+            self._update(job, result=result)
+
+        if options.get("sections", True) and "sections" not in result:
+            self._update(job, stage="sections")
+            result["sections"] = _map_document([p["text"] for p in result["pages"]])["sections"]
+            self._update(job, result=result)
+
+    def _llm(self):
+        """One gateway (event-loop thread + connection pool) shared by every job"""
+        with self._lock:
+            if self._gateway is None:
+                from llmGateway import LLMGateway
+                from nyayaFunction import get_api_key
+                self._gateway = LLMGateway(api_key=get_api_key())
+            return self._gateway
+
+    @contextmanager
+    def _heartbeat(self, job: str):
+        """Keep updated_at fresh while a long stage runs, so the job is not reclaimed"""
+        done = threading.Event()
+
+        def beat():
+            while not done.wait(HEARTBEAT_SECONDS):
+                self._update(job)
+
+        thread = threading.Thread(target=beat, name=f"document-job-heartbeat-{job[:8]}", daemon=True)
+        thread.start()
+        try:
+            yield
+        finally:
+            done.set()
+            thread.join()
+
+    def work(self, job: str):
+        try:
+            with self._heartbeat(job):
+                self._run(job)
+            self._update(job, status=DONE, stage=None)
+        except Exception as e:
+            logger.error(f"Document job {job} failed: {e}")
+            self._update(job, status=FAILED, error=str(e))
+
+    def run_worker(self):
+        """Process jobs until stop() is called"""
+        while not self._stop.is_set():
+            job = self._claim()
+            if job is None:
+                self._stop.wait(POLL_SECONDS)
+                continue
+            self.work(job)
+
+    def start_workers(self, count: int = DOC_WORKERS):
+        for i in range(count):
+            worker = threading.Thread(target=self.run_worker, name=f"document-job-{i}", daemon=True)
+            worker.start()
+            self._workers.append(worker)
+
+    def stop(self):
+        self._stop.set()
+        for worker in self._workers:
+            worker.join()
+
+
+def _map_document(pages: List[str]) -> Dict:
+    """firMapping over the remote search service if configured, else the in-process system"""
+    from searchClient import SEARCH_SERVICE_URL, RemoteSearchClient
+    if SEARCH_SERVICE_URL:
+        return RemoteSearchClient(SEARCH_SERVICE_URL).map_document(pages)
+    from firMapping import map_document
+    from nyayaFunction import get_bns_system
+    system = get_bns_system()
+    if system is None:
+        raise RuntimeError("BNS Search System could not be initialized")
+    return map_document(system, [{"page": n + 1, "text": text} for n, text in enumerate(pages)])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run Document Intelligence job workers")
+    parser.add_argument("--workers", type=int, default=DOC_WORKERS, help="Worker threads")
+    parser.add_argument("--submit", nargs="+", help="Queue these PDFs and exit")
+    parser.add_argument("--status", help="Print one job's record")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    jobs = JobQueue()
+    if args.submit:
+        for path in args.submit:
+            with open(path, "rb") as f:
+                print(f"{jobs.submit(f.read(), os.path.basename(path))}  {path}")
+        return
+    if args.status:
+        print(json.dumps(jobs.get(args.status), indent=2, ensure_ascii=False))
+        return
+
+    jobs.start_workers(args.workers)
+    print(f"{args.workers} document worker(s) running on {jobs.path}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        jobs.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,200 @@
+# embeddingCache.py - persistent, memory-mappable corpus embeddings
+#
+# Prebuild at deploy time with:
+#   python embeddingCache.py
+import os
+import re
+import json
+import hashlib
+import logging
+import argparse
+import tempfile
+from typing import Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from bnsDataset import CACHE_DIR, FILE_PATH, SEARCH_TEXT_FIELDS, SEARCH_TEXT_VERSION
+from searchIndex import normalize
+
+logger = logging.getLogger(__name__)
+
+CACHE_FORMAT_VERSION = 2  # v2: rows are stored L2-normalized
+
+
+def text_sha1(text: str) -> str:
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+def search_text_recipe() -> str:
+    """Identifier of the text-combination recipe used to build embeddings"""
+    return f"v{SEARCH_TEXT_VERSION}:" + "+".join(SEARCH_TEXT_FIELDS)
+
+
+class EmbeddingCache:
+    """
+    L2-normalized corpus embeddings stored as a float32 .npy matrix plus a
+    JSON stamp.
+
+    The stamp records the dataset hash, model name and text recipe. When it
+    matches, the matrix is memory-mapped instead of re-encoded. When only the
+    dataset changed, rows whose combined text is unchanged are reused and only
+    the new or edited rows are sent through the encoder.
+    """
+
+    def __init__(self, model_name: str, cache_dir: str = CACHE_DIR, recipe: Optional[str] = None):
+        self.model_name = model_name
+        self.cache_dir = cache_dir
+        self.recipe = recipe or search_text_recipe()
+        slug = re.sub(r"[^A-Za-z0-9_.-]+", "_", model_name)
+        self.matrix_path = os.path.join(cache_dir, f"embeddings-{slug}.npy")
+        self.meta_path = os.path.join(cache_dir, f"embeddings-{slug}.json")
+
+    def _read_meta(self) -> Optional[Dict]:
+        try:
+            with open(self.meta_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _compatible(self, meta: Optional[Dict]) -> bool:
+        """True when cached vectors were produced by the same model and recipe"""
+        return (
+            meta is not None
+            and meta.get("format") == CACHE_FORMAT_VERSION
+            and meta.get("model") == self.model_name
+            and meta.get("recipe") == self.recipe
+        )
+
+    def load(self, dataset_hash: str, n_rows: Optional[int] = None) -> Optional[np.ndarray]:
+        """Memory-map the cached matrix if its stamp is still valid"""
+        meta = self._read_meta()
+        if not self._compatible(meta) or meta.get("dataset_hash") != dataset_hash:
+            return None
+        if n_rows is not None and meta.get("rows") != n_rows:
+            return None
+        try:
+            matrix = np.load(self.matrix_path, mmap_mode="r")
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable embedding cache {self.matrix_path}: {e}")
+            return None
+        if matrix.shape[0] != meta.get("rows"):
+            return None
+        return matrix
+
+    def build(self, texts: Sequence[str], encode: Callable[[List[str]], np.ndarray],
+              dataset_hash: str) -> np.ndarray:
+        """Encode texts, reusing unchanged rows from a previous cache, and persist"""
+        row_hashes = [text_sha1(text) for text in texts]
+
+        previous = {}
+        old_matrix = None
+        meta = self._read_meta()
+        if self._compatible(meta):
+            try:
+                old_matrix = np.load(self.matrix_path, mmap_mode="r")
+                if old_matrix.shape[0] == len(meta.get("row_hashes", [])):
+                    previous = {h: i for i, h in enumerate(meta["row_hashes"])}
+            except (OSError, ValueError):
+                old_matrix = None
+
+        stale = [i for i, h in enumerate(row_hashes) if h not in previous]
+        logger.info(f"Encoding {len(stale)} of {len(texts)} rows "
+                    f"({len(texts) - len(stale)} reused from cache)")
+
+        fresh = None
+        if stale:
+            fresh = normalize(encode([texts[i] for i in stale]))
+
+        if fresh is not None:
+            dim = fresh.shape[1]
+        elif old_matrix is not None:
+            dim = old_matrix.shape[1]
+        else:
+            dim = 0
+        matrix = np.empty((len(texts), dim), dtype=np.float32)
+        for i, h in enumerate(row_hashes):
+            if h in previous:
+                matrix[i] = old_matrix[previous[h]]
+        if fresh is not None:
+            matrix[stale] = fresh
+        del old_matrix
+
+        try:
+            self._save(matrix, {
+                "format": CACHE_FORMAT_VERSION,
+                "model": self.model_name,
+                "recipe": self.recipe,
+                "dataset_hash": dataset_hash,
+                "rows": len(texts),
+                "dim": dim,
+                "row_hashes": row_hashes,
+            })
+        except OSError as e:
+            # Read-only deployments still work, they just re-encode every start
+            logger.warning(f"Could not persist embedding cache: {e}")
+        return matrix
+
+    def _save(self, matrix: np.ndarray, meta: Dict):
+        """Write matrix and stamp atomically; the stamp goes last"""
+        os.makedirs(self.cache_dir, exist_ok=True)
+        # Drop the old stamp first so a crash can never pair it with a new matrix
+        if os.path.exists(self.meta_path):
+            os.remove(self.meta_path)
+
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".npy.tmp")
+        with os.fdopen(fd, "wb") as f:
+            np.save(f, matrix)
+        os.replace(tmp_path, self.matrix_path)
+
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".json.tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, self.meta_path)
+
+    def load_or_build(self, dataset_hash: str, texts_fn: Callable[[], Sequence[str]],
+                      encode: Callable[[List[str]], np.ndarray],
+                      n_rows: Optional[int] = None) -> np.ndarray:
+        """Return cached embeddings when valid, otherwise (re)build them"""
+        matrix = self.load(dataset_hash, n_rows)
+        if matrix is not None:
+            logger.info(f"Loaded {matrix.shape[0]} cached embeddings from {self.matrix_path}")
+            return matrix
+        return self.build(texts_fn(), encode, dataset_hash)
+
+
+def main():
+    from bnsDataset import load_corpus
+    from nyayaFunction import embedding_model_name
+    from queryEncoder import ENCODER_BACKEND, ENCODER_BACKENDS, load_encoder
+
+    parser = argparse.ArgumentParser(description="Prebuild the BNS corpus embedding cache")
+    parser.add_argument("--dataset", default=FILE_PATH, help="Path to bnsdataset.xlsx")
+    parser.add_argument("--model", default=embedding_model_name(),
+                        help="Sentence transformer model name (default follows NYAYA_QUERY_MODE)")
+    parser.add_argument("--backend", default=ENCODER_BACKEND, choices=ENCODER_BACKENDS, help="Encoder backend")
+    parser.add_argument("--cache-dir", default=CACHE_DIR, help="Where to write the cache")
+    parser.add_argument("--force", action="store_true", help="Re-encode every row")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    model = load_encoder(args.model, args.backend)
+    cache = EmbeddingCache(model.cache_name, args.cache_dir)
+    corpus = load_corpus(args.dataset)
+    dataset_hash = corpus.source_hash
+
+    if args.force:
+        for path in (cache.meta_path, cache.matrix_path):
+            if os.path.exists(path):
+                os.remove(path)
+    elif cache.load(dataset_hash, len(corpus)) is not None:
+        print(f"Embedding cache is up to date: {cache.matrix_path}")
+        return
+
+    matrix = cache.build(corpus.search_texts,
+                         lambda texts: model.encode(texts, show_progress_bar=True),
+                         dataset_hash)
+    print(f"Wrote {matrix.shape[0]} embeddings to {cache.matrix_path}")
+
+
+if __name__ == "__main__":
+    main()
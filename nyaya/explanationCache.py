@@ -0,0 +1,182 @@
+# explanationCache.py - durable cache of LLM section explanations
+#
+# Shared by every worker process through one SQLite file (WAL mode).
+#   python explanationCache.py --stats
+#   python explanationCache.py --pregenerate   # fill the cache for every section
+#   python explanationCache.py --clear
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import argparse
+import threading
+from typing import Dict, List, Optional
+
+from bnsDataset import CACHE_DIR
+from queryCache import hit_stats
+
+logger = logging.getLogger(__name__)
+
+EXPLANATION_DB_PATH = os.environ.get("NYAYA_EXPLANATION_DB", os.path.join(CACHE_DIR, "explanations.sqlite3"))
+DEFAULT_TTL_SECONDS = 90 * 24 * 3600
+DEFAULT_MAX_ENTRIES = 20000
+# Hits only record their access time in memory; it is written to the table with
+# the next put(), or by a hit once this long has passed, so reads stay read-only
+ACCESS_FLUSH_SECONDS = 300
+
+
+def explanation_key(section_id: str, fields: Dict[str, str], prompt_version: int,
+                    model: str, params: Dict) -> str:
+    """
+    Stable cache key. The section fields are hashed in as well so an edited
+    dataset row never serves an explanation of its old wording.
+    """
+    payload = json.dumps({
+        "section": section_id,
+        "fields": fields,
+        "prompt_version": prompt_version,
+        "model": model,
+        "params": params,
+    }, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ExplanationCache:
+    """SQLite key/value store with TTL + LRU size eviction and hit/miss counters"""
+
+    def __init__(self, path: str = EXPLANATION_DB_PATH, ttl_seconds: Optional[float] = DEFAULT_TTL_SECONDS,
+                 max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._accessed: Dict[str, float] = {}
+        self._flushed_at = time.time()
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS explanations (
+                key TEXT PRIMARY KEY,
+                section_id TEXT,
+                model TEXT,
+                explanation TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_explanations_accessed ON explanations(accessed_at)")
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT explanation, created_at FROM explanations WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None and self.ttl_seconds is not None and now - row[1] > self.ttl_seconds:
+                # Expired rows are deleted by the next put()
+                row = None
+            if row is None:
+                self.misses += 1
+                return None
+            self._accessed[key] = now
+            if now - self._flushed_at > ACCESS_FLUSH_SECONDS:
+                self._flush_accessed()
+                self._conn.commit()
+            self.hits += 1
+            return row[0]
+
+    def _flush_accessed(self):
+        if self._accessed:
+            self._conn.executemany("UPDATE explanations SET accessed_at = ? WHERE key = ?",
+                                   [(t, key) for key, t in self._accessed.items()])
+            self._accessed.clear()
+        self._flushed_at = time.time()
+
+    def put(self, key: str, explanation: str, section_id: str = None, model: str = None):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO explanations VALUES (?, ?, ?, ?, ?, ?)",
+                (key, section_id, model, explanation, now, now)
+            )
+            self._flush_accessed()
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        """Drop expired rows, then the least recently used ones above max_entries"""
+        if self.ttl_seconds is not None:
+            self._conn.execute("DELETE FROM explanations WHERE created_at < ?", (time.time() - self.ttl_seconds,))
+        count = self._conn.execute("SELECT COUNT(*) FROM explanations").fetchone()[0]
+        if count > self.max_entries:
+            self._conn.execute(
+                "DELETE FROM explanations WHERE key IN "
+                "(SELECT key FROM explanations ORDER BY accessed_at ASC LIMIT ?)",
+                (count - self.max_entries,)
+            )
+
+    def explanations(self) -> List[str]:
+        """Every unexpired cached explanation (used to pre-translate them)"""
+        cutoff = time.time() - self.ttl_seconds if self.ttl_seconds is not None else 0
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT explanation FROM explanations WHERE created_at >= ? ORDER BY section_id", (cutoff,)
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM explanations")
+            self._conn.commit()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM explanations").fetchone()[0]
+        return {"entries": entries, **hit_stats(self.hits, self.misses)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage the LLM explanation cache")
+    parser.add_argument("--pregenerate", action="store_true", help="Generate explanations for every section")
+    parser.add_argument("--delay", type=float, default=1.0, help="Seconds to wait between api calls")
+    parser.add_argument("--clear", action="store_true", help="Delete all cached explanations")
+    parser.add_argument("--stats", action="store_true", help="Print cache statistics")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+
+    if args.clear:
+        ExplanationCache().clear()
+        print("Explanation cache cleared")
+
+    if args.pregenerate:
+        from nyayaFunction import get_bns_system
+        system = get_bns_system()
+        if system is None:
+            raise SystemExit("BNS Search System could not be initialized")
+        if system.explanation_cache is None:
+            raise SystemExit(f"Explanation cache could not be opened at {EXPLANATION_DB_PATH}; nothing to pregenerate into")
+        total = len(system.dataset)
+        for row in range(total):
+            record = system.dataset.row(row)
+            before = system.explanation_cache.misses
+            system.explain_row(record)
+            print(f"[{row + 1}/{total}] section {record['Section_Number']}"
+                  f" {'generated' if system.explanation_cache.misses > before else 'cached'}")
+            if system.explanation_cache.misses > before and args.delay:
+                time.sleep(args.delay)
+        print(json.dumps(system.explanation_cache.stats(), indent=2))
+    elif args.stats:
+        print(json.dumps(ExplanationCache().stats(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
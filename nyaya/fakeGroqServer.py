@@ -0,0 +1,178 @@
+# fakeGroqServer.py - local stand-in for the Groq chat completions api
+#
+# Speaks just enough of POST /openai/v1/chat/completions (JSON and SSE
+# streaming) for the Groq SDK, with knobs for latency and failure injection.
+# Point the app at it with GROQ_BASE_URL=http://127.0.0.1:8765
+#   python fakeGroqServer.py --port 8765 --fail-first 2 --fail-status 429
+import json
+import time
+import asyncio
+import argparse
+import threading
+from typing import List, Optional
+
+REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 429: "Too Many Requests",
+           500: "Internal Server Error", 503: "Service Unavailable"}
+
+
+class FakeGroqServer:
+    """
+    Answers every completion with a canned reply split into word tokens.
+    The first fail_first requests get fail_status; every request is recorded.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, reply: str = None,
+                 token_delay: float = 0.0, first_token_delay: float = 0.0,
+                 fail_first: int = 0, fail_status: int = 503, retry_after: Optional[float] = None):
+        self.host = host
+        self.port = port
+        self.reply = reply or ("According to the Bharatiya Nyaya Sanhita (BNS), "
+                               "this is a canned explanation from the fake Groq server.")
+        self.token_delay = token_delay
+        self.first_token_delay = first_token_delay
+        self.fail_first = fail_first
+        self.fail_status = fail_status
+        self.retry_after = retry_after
+        self.requests: List[dict] = []
+        self._server = None
+        self._loop = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        self._server.close()
+        await self._server.wait_closed()
+
+    def start_in_thread(self) -> "FakeGroqServer":
+        """Run the server on its own loop in a daemon thread (handy from sync code)"""
+        ready = threading.Event()
+
+        def run():
+            self._loop = asyncio.new_event_loop()
+            self._loop.run_until_complete(self.start())
+            ready.set()
+            self._loop.run_forever()
+
+        threading.Thread(target=run, name="fake-groq", daemon=True).start()
+        ready.wait()
+        return self
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            request_line = await reader.readline()
+            if not request_line:
+                return
+            method, path, _ = request_line.decode("latin-1").split(" ", 2)
+            headers = {}
+            while True:
+                line = await reader.readline()
+                if line in (b"\r\n", b"\n", b""):
+                    break
+                name, _, value = line.decode("latin-1").partition(":")
+                headers[name.strip().lower()] = value.strip()
+            body = await reader.readexactly(int(headers.get("content-length", "0")))
+            payload = json.loads(body or b"{}")
+            self.requests.append({"method": method, "path": path, "body": payload})
+
+            if method != "POST" or not path.endswith("/chat/completions"):
+                await self._send_json(writer, 404, {"error": {"message": "not found"}})
+            elif len(self.requests) <= self.fail_first:
+                extra = {"retry-after": str(self.retry_after)} if self.retry_after is not None else {}
+                await self._send_json(writer, self.fail_status,
+                                      {"error": {"message": "injected failure", "type": "fake"}}, extra)
+            elif payload.get("stream"):
+                await self._send_stream(writer, payload)
+            else:
+                await self._send_json(writer, 200, self._completion(payload))
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    def _tokens(self) -> List[str]:
+        words = self.reply.split(" ")
+        return [word + (" " if i < len(words) - 1 else "") for i, word in enumerate(words)]
+
+    def _completion(self, payload: dict) -> dict:
+        return {
+            "id": f"chatcmpl-fake-{len(self.requests)}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": payload.get("model", "fake"),
+            "choices": [{"index": 0, "finish_reason": "stop",
+                         "message": {"role": "assistant", "content": self.reply}}],
+            "usage": {"prompt_tokens": 0, "completion_tokens": len(self._tokens()), "total_tokens": len(self._tokens())},
+        }
+
+    def _chunk(self, payload: dict, delta: dict, finish_reason=None) -> bytes:
+        chunk = {
+            "id": f"chatcmpl-fake-{len(self.requests)}",
+            "object": "chat.completion.chunk",
+            "created": int(time.time()),
+            "model": payload.get("model", "fake"),
+            "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+        }
+        return f"data: {json.dumps(chunk)}\n\n".encode("utf-8")
+
+    async def _send_json(self, writer, status: int, body: dict, extra_headers: dict = None):
+        data = json.dumps(body).encode("utf-8")
+        head = [f"HTTP/1.1 {status} {REASONS.get(status, 'Error')}", "Content-Type: application/json",
+                f"Content-Length: {len(data)}", "Connection: close"]
+        head += [f"{name}: {value}" for name, value in (extra_headers or {}).items()]
+        writer.write(("\r\n".join(head) + "\r\n\r\n").encode("latin-1") + data)
+        await writer.drain()
+
+    async def _send_stream(self, writer, payload: dict):
+        writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\n"
+                     b"Transfer-Encoding: chunked\r\nConnection: close\r\n\r\n")
+
+        async def send(data: bytes):
+            writer.write(f"{len(data):x}\r\n".encode("latin-1") + data + b"\r\n")
+            await writer.drain()
+
+        if self.first_token_delay:
+            await asyncio.sleep(self.first_token_delay)
+        await send(self._chunk(payload, {"role": "assistant", "content": ""}))
+        for token in self._tokens():
+            if self.token_delay:
+                await asyncio.sleep(self.token_delay)
+            await send(self._chunk(payload, {"content": token}))
+        await send(self._chunk(payload, {}, "stop"))
+        await send(b"data: [DONE]\n\n")
+        writer.write(b"0\r\n\r\n")
+        await writer.drain()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a fake Groq chat completions server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--token-delay", type=float, default=0.02, help="Seconds between streamed tokens")
+    parser.add_argument("--first-token-delay", type=float, default=0.2)
+    parser.add_argument("--fail-first", type=int, default=0, help="Fail this many requests first")
+    parser.add_argument("--fail-status", type=int, default=503)
+    args = parser.parse_args()
+
+    server = FakeGroqServer(args.host, args.port, token_delay=args.token_delay,
+                            first_token_delay=args.first_token_delay,
+                            fail_first=args.fail_first, fail_status=args.fail_status)
+
+    async def run():
+        await server.start()
+        print(f"Fake Groq server listening on {server.base_url}")
+        await asyncio.Event().wait()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,248 @@
+# firMapping.py - tag an FIR with the BNS sections it most likely invokes
+#
+# The extracted text is cut into incident sentences, all of them are embedded
+# in one batch and ranked against the BNSSearchSystem index (no LLM calls),
+# and the per-sentence hits are combined into one score per section:
+#   evidence e = (similarity - floor) / (1 - floor) / rank
+#   score      = mean of the section's MAX_EVIDENCE strongest e (missing = 0)
+# so a section backed by several sentences outranks one lucky match, while a
+# long FIR cannot push every section to the top by volume alone. Sections the
+# FIR cites explicitly ("u/s 61(2) of BNS") are marked and listed first.
+#   python firMapping.py ../dataset/fir/fir6.pdf
+#   python firMapping.py --benchmark          # every PDF in dataset/fir
+import os
+import re
+import glob
+import json
+import time
+import logging
+import argparse
+from typing import Dict, List, Optional, Union
+
+import numpy as np
+from pydantic import BaseModel
+
+from nyayaFunction import SIMILARITY_THRESHOLD
+
+logger = logging.getLogger(__name__)
+
+SEGMENT_TOP_K = 5
+MIN_SEGMENT_CHARS = 40
+MAX_SEGMENT_CHARS = 400
+MIN_LETTER_RATIO = 0.6       # OCR'd form boxes and tables are mostly digits and symbols
+MAX_SECTIONS = 10
+MAX_EVIDENCE = 3
+
+_PAGE_MARKER = re.compile(r"^--- Page (\d+) ---$", re.MULTILINE)
+_SENTENCE_END = re.compile(r"(?<=[.!?।॥])\s+(?=\S)|\n\s*\n")
+_CLAUSE_BREAK = re.compile(r"(?<=[,;:])\s+")
+_WHITESPACE = re.compile(r"\s+")
+# "61(2) of BNS", "u/s 303, 318(4) BNS", "Sections 115 & 351(2) of Bharatiya Nyaya Sanhita".
+# Every number is whole ((?!\d)), numbers are joined by a separator and a list
+# is at most MAX_CITED_NUMBERS long, so each position has one way to match and a
+# bounded amount of work: phone, Aadhaar, OCR digit runs and number tables fail
+# in linear time instead of backtracking through every way to split them.
+MAX_CITED_NUMBERS = 12
+_CITED_NUMBER = r"\d{1,3}(?!\d)(?:\s*\(\s*\d{1,2}\s*\))?"
+_CITATION = re.compile(
+    rf"\b({_CITED_NUMBER}(?:(?:\s*(?:,|&|/|\band\b)\s*|\s+){_CITED_NUMBER}){{0,{MAX_CITED_NUMBERS - 1}}})"
+    r"\s*(?:of\s+(?:the\s+)?)?(?:BNS|Bharatiya\s+Nyaya\s+Sanhita)\b",
+    re.IGNORECASE
+)
+_CITED_SECTION = re.compile(r"(\d{1,3})(?:\s*\(\s*(\d{1,2})\s*\))?")
+
+
+class DocumentMapRequest(BaseModel):
+    text: Optional[str] = None
+    pages: Optional[List[str]] = None
+    max_sections: int = MAX_SECTIONS
+
+
+def split_pages(text: str) -> List[Dict]:
+    """pdfUsingOCR.extract_text output back into {"page", "text"} dicts"""
+    markers = list(_PAGE_MARKER.finditer(text))
+    if not markers:
+        return [{"page": 1, "text": text}]
+    return [{"page": int(m.group(1)), "text": text[m.end():markers[i + 1].start() if i + 1 < len(markers) else len(text)]}
+            for i, m in enumerate(markers)]
+
+
+def _spans(text: str, pattern, start: int, end: int) -> List[tuple]:
+    """(start, end) pieces of text[start:end] between pattern matches, whitespace trimmed"""
+    spans, position = [], start
+    for match in pattern.finditer(text, start, end):
+        spans.append((position, match.start()))
+        position = match.end()
+    spans.append((position, end))
+    trimmed = []
+    for a, b in spans:
+        while a < b and text[a].isspace():
+            a += 1
+        while b > a and text[b - 1].isspace():
+            b -= 1
+        if b > a:
+            trimmed.append((a, b))
+    return trimmed
+
+
+def _is_prose(segment: str) -> bool:
+    letters = sum(c.isalpha() for c in segment)
+    return letters >= MIN_LETTER_RATIO * len(segment.replace(" ", ""))
+
+
+def segment_pages(pages: List[Dict]) -> List[Dict]:
+    """
+    Incident sentences with their location: {"page", "start", "end", "text"}.
+    Long sentences are cut at clause breaks, short ones are merged with the
+    next, and lines that are mostly form noise are dropped.
+    """
+    segments = []
+    for page in pages:
+        text = page["text"]
+        pieces = []
+        for a, b in _spans(text, _SENTENCE_END, 0, len(text)):
+            if b - a <= MAX_SEGMENT_CHARS:
+                pieces.append((a, b))
+                continue
+            for c, d in _spans(text, _CLAUSE_BREAK, a, b):
+                while d - c > MAX_SEGMENT_CHARS:
+                    cut = text.rfind(" ", c, c + MAX_SEGMENT_CHARS)
+                    cut = cut if cut > c else c + MAX_SEGMENT_CHARS
+                    pieces.append((c, cut))
+                    c = cut + 1
+                pieces.append((c, d))
+
+        start = None
+        for a, b in pieces:
+            start = a if start is None else start
+            if b - start < MIN_SEGMENT_CHARS:
+                continue
+            segment = _WHITESPACE.sub(" ", text[start:b])
+            if _is_prose(segment):
+                segments.append({"page": page["page"], "start": start, "end": b, "text": segment})
+            start = None
+    return segments
+
+
+def cited_sections(pages: List[Dict], system) -> List[Dict]:
+    """Sections the text names explicitly together with BNS"""
+    citations = []
+    for page in pages:
+        for match in _CITATION.finditer(page["text"]):
+            for number in _CITED_SECTION.finditer(match.group(1)):
+                section = int(number.group(1))
+                subsection = int(number.group(2)) if number.group(2) else None
+                row = system.dataset.sections.lookup(section, subsection)
+                if row is not None:
+                    citations.append({"row": row, "page": page["page"], "start": match.start(),
+                                      "end": match.end(), "text": _WHITESPACE.sub(" ", match.group(0))})
+    return citations
+
+
+def _subsection(value) -> Optional[int]:
+    return None if value is None or np.isnan(value) else int(value)
+
+
+def _evidence(span: Dict) -> Dict:
+    evidence = {"page": span["page"], "start": span["start"], "end": span["end"], "text": span["text"]}
+    if "similarity" in span:
+        evidence["similarity"] = round(span["similarity"], 4)
+    return evidence
+
+
+def map_document(system, source: Union[str, List[Dict]], max_sections: int = MAX_SECTIONS,
+                 floor: float = SIMILARITY_THRESHOLD) -> Dict:
+    """Ranked, deduplicated BNS sections for a document, each with its evidence spans"""
+    start_time = time.perf_counter()
+    pages = split_pages(source) if isinstance(source, str) else source
+    segments = segment_pages(pages)
+    indices, similarities = system.rank_passages([segment["text"] for segment in segments], SEGMENT_TOP_K)
+
+    sections: Dict[int, Dict] = {}
+
+    def add(row: int, strength: float, evidence: Dict):
+        section = int(system.dataset.section_numbers[row])
+        entry = sections.setdefault(section, {"rows": {}, "evidence": {}, "cited": False})
+        entry["rows"][row] = entry["rows"].get(row, 0.0) + strength
+        # One evidence span per segment, at its strongest
+        key = (evidence["page"], evidence["start"])
+        if key not in entry["evidence"] or entry["evidence"][key]["strength"] < strength:
+            entry["evidence"][key] = dict(evidence, strength=strength)
+
+    for i, segment in enumerate(segments):
+        for rank, (row, similarity) in enumerate(zip(indices[i], similarities[i])):
+            if row < 0 or similarity < floor:
+                continue
+            strength = (float(similarity) - floor) / (1.0 - floor) / (rank + 1)
+            add(int(row), strength, dict(segment, similarity=float(similarity)))
+
+    for citation in cited_sections(pages, system):
+        add(citation["row"], 1.0, citation)
+        sections[int(system.dataset.section_numbers[citation["row"]])]["cited"] = True
+
+    results = []
+    for section, entry in sections.items():
+        # The subsection with the most support stands for the section
+        row = max(entry["rows"], key=entry["rows"].get)
+        record = system.dataset.row(row)
+        evidence = sorted(entry["evidence"].values(), key=lambda e: -e["strength"])
+        results.append({
+            "section_number": section,
+            "subsection_number": _subsection(record["Subsection_Number"]),
+            "title": record["Title"],
+            "punishment": record["Punishment"],
+            "score": round(sum(e["strength"] for e in evidence[:MAX_EVIDENCE]) / MAX_EVIDENCE, 4),
+            "cited": entry["cited"],
+            "support": len(evidence),
+            "evidence": [_evidence(e) for e in evidence[:MAX_EVIDENCE]],
+        })
+    results.sort(key=lambda r: (-r["cited"], -r["score"]))
+    return {
+        "sections": results[:max_sections],
+        "segments": len(segments),
+        "pages": len(pages),
+        "seconds": round(time.perf_counter() - start_time, 4),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Map FIR PDFs or text files to BNS sections")
+    parser.add_argument("paths", nargs="*", help="PDF or extracted text files (default: dataset/fir/*.pdf)")
+    parser.add_argument("--max-sections", type=int, default=MAX_SECTIONS)
+    parser.add_argument("--json", action="store_true", help="Print the full mapping as JSON")
+    parser.add_argument("--benchmark", action="store_true", help="Only report mapping time per document")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+
+    from pdfUsingOCR import FIR_DIR, extract_pages
+    from nyayaFunction import get_bns_system
+
+    system = get_bns_system()
+    if system is None:
+        raise SystemExit("BNS Search System could not be initialized")
+    system.rank_passages(["warm up"])
+
+    times = []
+    for path in args.paths or sorted(glob.glob(os.path.join(FIR_DIR, "*.pdf"))):
+        if path.lower().endswith(".pdf"):
+            pages = extract_pages(path)
+        else:
+            with open(path, encoding="utf-8") as f:
+                pages = split_pages(f.read())
+        mapping = map_document(system, pages, args.max_sections)
+        times.append(mapping["seconds"])
+        if args.json:
+            print(json.dumps(dict(mapping, path=path), indent=2, ensure_ascii=False))
+            continue
+        print(f"{path}: {mapping['pages']} pages, {mapping['segments']} segments, {mapping['seconds'] * 1000:.0f} ms")
+        if not args.benchmark:
+            for s in mapping["sections"]:
+                print(f"  {s['score']:.3f}  BNS {s['section_number']:<4} {s['title']}"
+                      f"{'  (cited)' if s['cited'] else ''}  [{s['support']} spans]")
+    if times:
+        print(f"mapping ms: mean {np.mean(times) * 1000:.0f}, max {np.max(times) * 1000:.0f}")
+
+
+if __name__ == "__main__":
+    main()
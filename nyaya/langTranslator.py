@@ -1,13 +1,141 @@
-# langTranslator.py  — USE THIS NEW VERSION
+# langTranslator.py — sentence-aware, parallel translation
+#
+# Long text is split on paragraph and sentence boundaries into chunks no
+# larger than the backend's limit, the chunks are translated concurrently on
+# a shared bounded thread pool, and reassembled in order with the original
+# whitespace between them. Benchmark with a stub backend:
+#   python langTranslator.py --backend stub --latency 0.3
 
-from deep_translator import GoogleTranslator
+import re
+import time
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+MAX_WORKERS = 8
+
+# Sentence ends: latin punctuation plus the Devanagari danda / double danda
+_SENTENCE_END = re.compile(r'(?<=[.!?।॥])(\s+)')
+_PARAGRAPH_BREAK = re.compile(r'(\n\s*\n)')
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="translate")
+        return _pool
+
+
+class TranslationBackend:
+    """Interface for translation providers"""
+    max_chars = 5000
+
+    def translate(self, text, source_lang, target_lang):
+        raise NotImplementedError
+
+
+class GoogleBackend(TranslationBackend):
+    """Free Google Translate via deep_translator, one translator per language pair and thread"""
+    max_chars = 4500  # provider limit is 5000; leave headroom
 
-class MinimalIndianTranslator:
     def __init__(self):
-        self.chunk_size = 300
+        self._local = threading.local()
+
+    def _translator(self, source_lang, target_lang):
+        # GoogleTranslator keeps per-request state on the instance, so reuse is per thread
+        translators = getattr(self._local, "translators", None)
+        if translators is None:
+            translators = self._local.translators = {}
+        key = (source_lang, target_lang)
+        if key not in translators:
+            from deep_translator import GoogleTranslator
+            translators[key] = GoogleTranslator(source=source_lang, target=target_lang)
+        return translators[key]
+
+    def translate(self, text, source_lang, target_lang):
+        return self._translator(source_lang, target_lang).translate(text)
+
+
+class StubBackend(TranslationBackend):
+    """Offline stand-in for benchmarks: tags the text and sleeps like a network call"""
+
+    def __init__(self, latency=0.0, max_chars=4500):
+        self.latency = latency
+        self.max_chars = max_chars
+
+    def translate(self, text, source_lang, target_lang):
+        if self.latency:
+            time.sleep(self.latency)
+        return f"[{target_lang}] {text}"
+
+
+def _split_pieces(text, max_chars):
+    """Split into (piece, whitespace_after) pairs, each piece at most max_chars"""
+    pieces = []
+    for paragraph, paragraph_sep in _pairs(_PARAGRAPH_BREAK.split(text)):
+        for sentence, sentence_sep in _pairs(_SENTENCE_END.split(paragraph)):
+            if len(sentence) <= max_chars:
+                pieces.append((sentence, sentence_sep))
+                continue
+            # Over-long sentence: fall back to word boundaries, then hard slices
+            words = re.split(r'(\s+)', sentence)
+            for word, word_sep in _pairs(words):
+                if not word:
+                    # Leading whitespace of the sentence
+                    pieces.append(("", word_sep))
+                    continue
+                for start in range(0, len(word), max_chars):
+                    part = word[start:start + max_chars]
+                    last = start + max_chars >= len(word)
+                    pieces.append((part, word_sep if last else ""))
+            # Last word also carries the sentence's separator
+            piece, sep = pieces[-1]
+            pieces[-1] = (piece, sep + sentence_sep)
+        if pieces:
+            piece, sep = pieces[-1]
+            pieces[-1] = (piece, sep + paragraph_sep)
+    return pieces
+
+
+def _pairs(parts):
+    """[text, sep, text, sep, text] -> [(text, sep), ..., (text, '')]"""
+    parts = parts + [""] if len(parts) % 2 else parts
+    return [(parts[i], parts[i + 1]) for i in range(0, len(parts), 2)]
+
+
+def split_into_chunks(text, max_chars):
+    """
+    Pack sentences into chunks of at most max_chars. Returns (chunk, separator)
+    pairs where separator is the whitespace that followed the chunk.
+    """
+    chunks = []
+    current, current_sep = None, ""
+    for piece, sep in _split_pieces(text, max_chars):
+        if current is None:
+            current, current_sep = piece, sep
+            continue
+        candidate = current + current_sep + piece
+        if len(candidate) > max_chars:
+            chunks.append((current, current_sep))
+            current, current_sep = piece, sep
+        else:
+            current, current_sep = candidate, sep
+    if current is not None:
+        chunks.append((current, current_sep))
+    return chunks or [("", "")]
+
+
+class MinimalIndianTranslator:
+    def __init__(self, backend=None):
+        self.backend = backend or GoogleBackend()
+        self.chunk_size = self.backend.max_chars
 
     def set_chunk_size(self, size):
-        self.chunk_size = size
+        self.chunk_size = min(size, self.backend.max_chars)
 
     def translate(self, text, source_lang, target_lang):
         """
@@ -20,17 +148,78 @@ class MinimalIndianTranslator:
             if not text or not text.strip():
                 return text
 
-            # Auto chunking for long text
+            # Sentence-aware chunking for long text, translated concurrently
             if len(text) > self.chunk_size:
-                chunks = [text[i:i+self.chunk_size] for i in range(0, len(text), self.chunk_size)]
-                translated_chunks = [
-                    GoogleTranslator(source=source_lang, target=target_lang).translate(chunk)
-                    for chunk in chunks
-                ]
-                return " ".join(translated_chunks)
+                chunks = split_into_chunks(text, self.chunk_size)
+                translated_chunks = list(_get_pool().map(
+                    lambda chunk: self._translate_chunk(chunk[0], source_lang, target_lang), chunks
+                ))
+                return "".join(
+                    translated + sep for translated, (_, sep) in zip(translated_chunks, chunks)
+                )
 
-            return GoogleTranslator(source=source_lang, target=target_lang).translate(text)
+            return self.backend.translate(text, source_lang, target_lang)
 
         except Exception as e:
             print("Translation Error:", e)
             return text  # fallback to original text
+
+    def translate_batch(self, texts, source_lang, target_lang):
+        """
+        Translate several texts at once: the chunks of all of them go through
+        the pool together, so n short texts cost one round of latency, not n
+        """
+        if source_lang == target_lang:
+            return list(texts)
+        split = [split_into_chunks(text, self.chunk_size) if text and text.strip() else [(text or "", "")]
+                 for text in texts]
+        flat = [chunk for chunks in split for chunk, _ in chunks]
+        translated = iter(list(_get_pool().map(
+            lambda chunk: self._safe_chunk(chunk, source_lang, target_lang), flat
+        )))
+        return ["".join(next(translated) + sep for _, sep in chunks) for chunks in split]
+
+    def _safe_chunk(self, chunk, source_lang, target_lang):
+        try:
+            return self._translate_chunk(chunk, source_lang, target_lang)
+        except Exception as e:
+            print("Translation Error:", e)
+            return chunk  # fallback to original text
+
+    def _translate_chunk(self, chunk, source_lang, target_lang):
+        if not chunk.strip():
+            return chunk
+        return self.backend.translate(chunk, source_lang, target_lang) or chunk
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark chunked translation")
+    parser.add_argument("--backend", choices=["stub", "google"], default="stub")
+    parser.add_argument("--latency", type=float, default=0.3, help="Stub round-trip time in seconds")
+    parser.add_argument("--chars", type=int, default=20000, help="Length of the sample text")
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--target", default="hindi")
+    args = parser.parse_args()
+
+    sentence = "A person abets the doing of a thing who instigates any person to do that thing. "
+    text = (sentence * (args.chars // len(sentence) + 1))[:args.chars]
+    backend = StubBackend(args.latency) if args.backend == "stub" else GoogleBackend()
+    translator = MinimalIndianTranslator(backend)
+    translator.set_chunk_size(args.chunk_size)
+    chunks = split_into_chunks(text, translator.chunk_size)
+
+    start = time.perf_counter()
+    for chunk, _ in chunks:
+        translator._translate_chunk(chunk, "english", args.target)
+    serial = time.perf_counter() - start
+
+    start = time.perf_counter()
+    translator.translate(text, "english", args.target)
+    parallel = time.perf_counter() - start
+
+    print(f"{len(text)} chars in {len(chunks)} chunks: serial {serial:.2f}s, "
+          f"parallel {parallel:.2f}s ({serial / parallel:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
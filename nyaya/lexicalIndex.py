@@ -0,0 +1,174 @@
+# lexicalIndex.py - BM25 inverted index over the search text, and rank fusion
+#
+# Postings are stored CSR-style (one int32 doc id array + one float32 weight
+# array, sliced per term) with the BM25 term weight precomputed per posting,
+# so scoring a query is a handful of numpy slice-adds. The index is persisted
+# next to the embedding cache and rebuilt when the dataset or recipe changes.
+import os
+import re
+import json
+import logging
+import tempfile
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from bnsDataset import CACHE_DIR
+from searchIndex import _top_k
+
+logger = logging.getLogger(__name__)
+
+BM25_FORMAT_VERSION = 1
+TOKENIZER_VERSION = 1
+BM25_K1 = 1.5
+BM25_B = 0.75
+RRF_K = 60
+
+_TOKEN = re.compile(r"\w+")
+STOPWORDS = frozenset("""
+a an and are as at be by for from has have if in into is it its of on or such that the their
+then there these this to was were which who whom whose will with shall any being been
+""".split())
+
+
+def tokenize(text: str) -> List[str]:
+    return [token for token in _TOKEN.findall(text.lower()) if token not in STOPWORDS]
+
+
+class BM25Index:
+    """Okapi BM25 over a fixed set of documents"""
+
+    def __init__(self, vocabulary: Dict[str, int], offsets: np.ndarray, doc_ids: np.ndarray,
+                 weights: np.ndarray, n_docs: int):
+        self.vocabulary = vocabulary
+        self.offsets = offsets
+        self.doc_ids = doc_ids
+        self.weights = weights
+        self.n_docs = n_docs
+
+    def __len__(self) -> int:
+        return self.n_docs
+
+    @classmethod
+    def build(cls, texts: Sequence[str], k1: float = BM25_K1, b: float = BM25_B) -> "BM25Index":
+        counts: Dict[str, Dict[int, int]] = {}
+        lengths = np.zeros(len(texts), dtype=np.float32)
+        for doc, text in enumerate(texts):
+            tokens = tokenize(text)
+            lengths[doc] = len(tokens)
+            for token in tokens:
+                postings = counts.setdefault(token, {})
+                postings[doc] = postings.get(doc, 0) + 1
+
+        avg_length = float(lengths.mean()) if len(texts) and lengths.mean() > 0 else 1.0
+        terms = sorted(counts)
+        vocabulary = {term: i for i, term in enumerate(terms)}
+        offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+        doc_ids, weights = [], []
+        for i, term in enumerate(terms):
+            postings = counts[term]
+            docs = np.fromiter(sorted(postings), dtype=np.int32, count=len(postings))
+            tf = np.array([postings[doc] for doc in docs], dtype=np.float32)
+            # Lucene-style idf, always positive
+            idf = np.log(1.0 + (len(texts) - len(docs) + 0.5) / (len(docs) + 0.5))
+            norm = k1 * (1.0 - b + b * lengths[docs] / avg_length)
+            doc_ids.append(docs)
+            weights.append((idf * tf * (k1 + 1.0) / (tf + norm)).astype(np.float32))
+            offsets[i + 1] = offsets[i] + len(docs)
+
+        return cls(
+            vocabulary, offsets,
+            np.concatenate(doc_ids) if doc_ids else np.empty(0, dtype=np.int32),
+            np.concatenate(weights) if weights else np.empty(0, dtype=np.float32),
+            len(texts)
+        )
+
+    def scores(self, query: str) -> np.ndarray:
+        scores = np.zeros(self.n_docs, dtype=np.float32)
+        for token in tokenize(query):
+            term = self.vocabulary.get(token)
+            if term is None:
+                continue
+            start, end = self.offsets[term], self.offsets[term + 1]
+            # Doc ids within one posting list are unique, so fancy-index add is safe
+            scores[self.doc_ids[start:end]] += self.weights[start:end]
+        return scores
+
+    def search(self, query: str, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Top-k documents with a non-zero score, best first"""
+        scores = self.scores(query)
+        indices, values = _top_k(scores, k)
+        keep = values > 0
+        return indices[keep], values[keep]
+
+    # ------------------------------------------------------------------ persistence
+
+    def save(self, path: str):
+        terms = np.array(sorted(self.vocabulary, key=self.vocabulary.get), dtype=np.str_)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".npz.tmp")
+        with os.fdopen(fd, "wb") as f:
+            np.savez(f, terms=terms, offsets=self.offsets, doc_ids=self.doc_ids,
+                     weights=self.weights, n_docs=np.int64(self.n_docs))
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "BM25Index":
+        with np.load(path, allow_pickle=False) as data:
+            vocabulary = {str(term): i for i, term in enumerate(data["terms"])}
+            return cls(vocabulary, data["offsets"], data["doc_ids"], data["weights"], int(data["n_docs"]))
+
+
+def load_or_build_bm25(dataset_hash: str, recipe: str, texts_fn: Callable[[], Sequence[str]],
+                       cache_dir: str = CACHE_DIR) -> BM25Index:
+    """Load the persisted BM25 index when its stamp matches, otherwise rebuild it"""
+    index_path = os.path.join(cache_dir, "bm25.npz")
+    meta_path = os.path.join(cache_dir, "bm25.json")
+    meta = {
+        "format": BM25_FORMAT_VERSION,
+        "tokenizer": TOKENIZER_VERSION,
+        "k1": BM25_K1,
+        "b": BM25_B,
+        "recipe": recipe,
+        "dataset_hash": dataset_hash,
+    }
+    try:
+        with open(meta_path, "r", encoding="utf-8") as f:
+            if json.load(f) == meta:
+                index = BM25Index.load(index_path)
+                logger.info(f"Loaded BM25 index ({len(index.vocabulary)} terms) from {index_path}")
+                return index
+    except (OSError, ValueError, KeyError) as e:
+        logger.info(f"Rebuilding BM25 index: {e}")
+
+    index = BM25Index.build(texts_fn())
+    logger.info(f"Built BM25 index over {len(index)} documents ({len(index.vocabulary)} terms)")
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        if os.path.exists(meta_path):
+            os.remove(meta_path)
+        index.save(index_path)
+        fd, tmp_path = tempfile.mkstemp(dir=cache_dir, suffix=".json.tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, meta_path)
+    except OSError as e:
+        logger.warning(f"Could not persist BM25 index: {e}")
+    return index
+
+
+def reciprocal_rank_fusion(rankings: List[np.ndarray], k: int = RRF_K,
+                           weights: Optional[List[float]] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Fuse ranked lists of document ids: score(d) = sum_i w_i / (k + rank_i(d)).
+    Ids < 0 (index padding) are ignored. Returns ids and scores, best first;
+    ties keep the order of the first ranking.
+    """
+    scores: Dict[int, float] = {}
+    for i, ranking in enumerate(rankings):
+        weight = weights[i] if weights is not None else 1.0
+        for rank, doc in enumerate(ranking):
+            doc = int(doc)
+            if doc >= 0:
+                scores[doc] = scores.get(doc, 0.0) + weight / (k + rank + 1)
+    order = sorted(scores, key=scores.get, reverse=True)
+    return np.array(order, dtype=np.int64), np.array([scores[doc] for doc in order], dtype=np.float64)
@@ -0,0 +1,198 @@
+# llmGateway.py - asyncio gateway in front of the Groq chat completions api
+#
+# - at most max_concurrency upstream requests at a time
+# - per-chunk timeout, jittered exponential backoff on 429/5xx/timeouts
+# - concurrent callers with the same key share one upstream (streaming) call
+#
+# The gateway owns an event loop on a background thread, so synchronous code
+# (Streamlit, BNSSearchSystem) can use stream_sync()/complete_sync().
+import os
+import random
+import asyncio
+import logging
+import threading
+import queue
+from typing import AsyncIterator, Dict, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+GROQ_BASE_URL = os.environ.get("GROQ_BASE_URL")  # e.g. http://127.0.0.1:8765 for fakeGroqServer.py
+LLM_MAX_CONCURRENCY = int(os.environ.get("NYAYA_LLM_CONCURRENCY", "8"))
+LLM_TIMEOUT = float(os.environ.get("NYAYA_LLM_TIMEOUT", "30"))
+LLM_MAX_RETRIES = int(os.environ.get("NYAYA_LLM_MAX_RETRIES", "4"))
+
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+_DONE = object()
+
+
+def is_retryable(error: BaseException) -> bool:
+    """Timeouts, connection failures, rate limits and server errors are worth retrying"""
+    if isinstance(error, (asyncio.TimeoutError, ConnectionError)):
+        return True
+    status = getattr(error, "status_code", None)
+    if status is not None:
+        return status in RETRYABLE_STATUS
+    return type(error).__name__ in ("APIConnectionError", "APITimeoutError")
+
+
+def _retry_after(error: BaseException) -> Optional[float]:
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+class _Flight:
+    """One upstream call; every caller with the same key replays its tokens"""
+
+    def __init__(self):
+        self.tokens: List[str] = []
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self.changed = asyncio.Event()
+
+    def publish(self):
+        self.changed.set()
+        self.changed = asyncio.Event()
+
+
+class LLMGateway:
+    def __init__(self, api_key: str, base_url: Optional[str] = GROQ_BASE_URL,
+                 max_concurrency: int = LLM_MAX_CONCURRENCY, timeout: float = LLM_TIMEOUT,
+                 max_retries: int = LLM_MAX_RETRIES, backoff_base: float = 0.5, backoff_max: float = 8.0):
+        from groq import AsyncGroq
+
+        # Retries are handled here (with jitter and coalescing), not by the SDK
+        self.client = AsyncGroq(api_key=api_key, base_url=base_url, timeout=timeout, max_retries=0)
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.metrics = {"requests": 0, "upstream_calls": 0, "coalesced": 0, "retries": 0, "failures": 0}
+
+        self._flights: Dict[str, _Flight] = {}
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_lock = threading.Lock()
+
+    # ------------------------------------------------------------------ async api
+
+    async def stream(self, messages: List[Dict], model: str, key: Optional[str] = None,
+                     **params) -> AsyncIterator[str]:
+        """Yield completion tokens; callers sharing a key share one upstream call"""
+        self.metrics["requests"] += 1
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        flight = self._flights.get(key) if key is not None else None
+        if flight is not None:
+            self.metrics["coalesced"] += 1
+        else:
+            flight = _Flight()
+            if key is not None:
+                self._flights[key] = flight
+            asyncio.ensure_future(self._run_flight(flight, key, messages, model, params))
+
+        position = 0
+        while True:
+            while position < len(flight.tokens):
+                position += 1
+                yield flight.tokens[position - 1]
+            if flight.done:
+                if flight.error is not None:
+                    raise flight.error
+                return
+            await flight.changed.wait()
+
+    async def complete(self, messages: List[Dict], model: str, key: Optional[str] = None, **params) -> str:
+        parts = [token async for token in self.stream(messages, model, key=key, **params)]
+        return "".join(parts).strip()
+
+    async def _run_flight(self, flight: _Flight, key: Optional[str], messages: List[Dict],
+                          model: str, params: Dict):
+        try:
+            async with self._semaphore:
+                await self._call_with_retries(flight, messages, model, params)
+        except BaseException as e:
+            flight.error = e
+            self.metrics["failures"] += 1
+            logger.error(f"LLM request failed: {e}")
+        finally:
+            flight.done = True
+            if key is not None and self._flights.get(key) is flight:
+                del self._flights[key]
+            flight.publish()
+
+    async def _call_with_retries(self, flight: _Flight, messages: List[Dict], model: str, params: Dict):
+        attempt = 0
+        while True:
+            try:
+                self.metrics["upstream_calls"] += 1
+                completion = await asyncio.wait_for(
+                    self.client.chat.completions.create(model=model, messages=messages, stream=True, **params),
+                    self.timeout
+                )
+                chunks = completion.__aiter__()
+                while True:
+                    try:
+                        chunk = await asyncio.wait_for(chunks.__anext__(), self.timeout)
+                    except StopAsyncIteration:
+                        return
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        flight.tokens.append(chunk.choices[0].delta.content)
+                        flight.publish()
+            except Exception as e:
+                # Tokens already handed to callers cannot be taken back, so only
+                # a call that failed before producing output is retried
+                if flight.tokens or attempt >= self.max_retries or not is_retryable(e):
+                    raise
+                delay = _retry_after(e)
+                if delay is None:
+                    # Full jitter: uniform in [0, min(cap, base * 2^attempt)]
+                    delay = random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+                attempt += 1
+                self.metrics["retries"] += 1
+                logger.warning(f"LLM request failed ({e}); retry {attempt}/{self.max_retries} in {delay:.2f}s")
+                await asyncio.sleep(delay)
+
+    # ------------------------------------------------------------------ sync bridge
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        with self._loop_lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                threading.Thread(target=self._loop.run_forever, name="llm-gateway", daemon=True).start()
+            return self._loop
+
+    def stream_sync(self, messages: List[Dict], model: str, key: Optional[str] = None,
+                    **params) -> Iterator[str]:
+        """Blocking iterator over stream() for synchronous callers"""
+        loop = self._ensure_loop()
+        tokens: "queue.Queue" = queue.Queue()
+
+        async def pump():
+            try:
+                async for token in self.stream(messages, model, key=key, **params):
+                    tokens.put(token)
+                tokens.put(_DONE)
+            except BaseException as e:
+                tokens.put(e)
+
+        asyncio.run_coroutine_threadsafe(pump(), loop)
+        while True:
+            item = tokens.get()
+            if item is _DONE:
+                return
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+
+    def complete_sync(self, messages: List[Dict], model: str, key: Optional[str] = None, **params) -> str:
+        return "".join(self.stream_sync(messages, model, key=key, **params)).strip()
+
+    def run_sync(self, coroutine):
+        """Run a coroutine that uses this gateway on its loop and wait for the result"""
+        return asyncio.run_coroutine_threadsafe(coroutine, self._ensure_loop()).result()
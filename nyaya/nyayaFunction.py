@@ -1,14 +1,22 @@
 from pydantic import BaseModel
 import pandas as pd
-from sentence_transformers import SentenceTransformer, util
 import numpy as np
-from groq import Groq
 import re
 import logging
-from typing import Dict, List, Optional, Union
+from typing import Dict, Iterator, List, Optional, Tuple, Union
 import time
-from functools import lru_cache
 import os
+import threading
+
+from bnsDataset import PROJECT_ROOT, FILE_PATH, REQUIRED_COLUMNS, SEARCH_TEXT_COLUMN, load_corpus, subsection_key
+from embeddingCache import EmbeddingCache, search_text_recipe
+from lexicalIndex import load_or_build_bm25, reciprocal_rank_fusion, RRF_K
+from queryEncoder import ENCODER_BACKEND, load_encoder
+from queryCache import QueryCache, normalize_query
+from reranker import RERANK_ENABLED, RERANK_CANDIDATES, CrossEncoderReranker
+from searchIndex import build_index
+from explanationCache import ExplanationCache, explanation_key
+from llmGateway import LLMGateway
 
 
 
@@ -17,75 +25,127 @@ logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 # Configuration
-import streamlit as st
+# A smaller distilled model (e.g. all-MiniLM-L6-v2) can be swapped in here
+MODEL_NAME = os.getenv("NYAYA_MODEL_NAME", 'all-MiniLM-L12-v2')
 
+# Query path: "translate" sends non-English queries through the translator and
+# embeds them with the English MODEL_NAME; "multilingual" embeds queries in the
+# languages below directly with a multilingual model (corpus embeddings are
+# built with the same model, so the two modes use separate embedding caches).
+QUERY_MODE = os.getenv("NYAYA_QUERY_MODE", "translate")
+MULTILINGUAL_MODEL_NAME = os.getenv("NYAYA_MULTILINGUAL_MODEL", "paraphrase-multilingual-MiniLM-L12-v2")
+# Client languages covered by the multilingual model's training data; the
+# others are still translated to English first
+MULTILINGUAL_QUERY_LANGUAGES = {"english", "hindi", "marathi", "gujarati", "urdu"}
+SIMILARITY_THRESHOLD = 0.3  # Minimum similarity score for matches
+TOP_K_MATCHES = 3  # Number of top matches to consider
 
-api_key = st.secrets["GROQ_API_KEY"]
+# LLM explanation settings. Bump PROMPT_TEMPLATE_VERSION whenever the prompt
+# template changes so cached explanations are regenerated.
+LLM_MODEL = "llama-3.1-8b-instant"
+LLM_PARAMS = {
+    "temperature": 0.7,  # Reduced for more consistent responses
+    "max_tokens": 1024,
+    "top_p": 0.9,
+}
+PROMPT_TEMPLATE_VERSION = 1
+SYSTEM_PROMPT = "You are a legal expert who explains Indian laws in simple, clear language for the general public."
 
-# Always get project root correctly on Streamlit Cloud
-PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+# Section references, most specific first. Group 1 is the section and the
+# optional later group the subsection ("section 103(2)", "s. 318 sub 4").
+_SUBSECTION = r'(?:\s*\(\s*(\d+)\s*\)|\s+(?:sub-?section|sub|ss|clause|cl)\.?\s*\(?(\d+)\)?)?'
+SECTION_PATTERNS = [
+    r'(?:\bsection|\bsec\.?|\bs\.|\bu/s\.?|§)\s*(\d+)' + _SUBSECTION,
+    r'\b(\d{1,3})\s*\(\s*(\d+)\s*\)',  # bare "103(2)"
+    r'\b(\d{1,3})\b'  # standalone numbers
+]
 
-FILE_PATH = os.path.join(PROJECT_ROOT, "dataset", "bnsdataset.xlsx")
+# Vector index backend: "exact" (dot product + argpartition) or "ivf" (approximate;
+# corpora under searchIndex.IVF_MIN_ROWS rows use exact, n_lists is capped at sqrt(rows))
+INDEX_BACKEND = os.getenv("NYAYA_INDEX_BACKEND", "exact")
+INDEX_PARAMS = {
+    "ivf": {
+        "n_lists": int(os.getenv("NYAYA_IVF_LISTS", "256")),  # more lists = smaller scans
+        "n_probe": int(os.getenv("NYAYA_IVF_PROBE", "8")),    # more probes = higher recall
+    },
+}
 
+# Retrieval: "hybrid" fuses BM25 and dense rankings with reciprocal rank
+# fusion, "dense" uses cosine similarity only. HYBRID_CANDIDATES hits are
+# taken from each ranking before fusing.
+RETRIEVAL_MODE = os.getenv("NYAYA_RETRIEVAL", "hybrid")
+HYBRID_CANDIDATES = int(os.getenv("NYAYA_HYBRID_CANDIDATES", "20"))
 
-print("DEBUG PROJECT_ROOT:", PROJECT_ROOT)
-print("DEBUG FILE_PATH:", FILE_PATH)
-print("DEBUG EXISTS:", os.path.exists(FILE_PATH))
 
-df = pd.read_excel(FILE_PATH)
+def embedding_model_name(query_mode: str = QUERY_MODE) -> str:
+    """Sentence embedding model used for both the corpus and the queries"""
+    if query_mode == "multilingual":
+        return MULTILINGUAL_MODEL_NAME
+    if query_mode != "translate":
+        raise ValueError(f"Unknown query mode: {query_mode}")
+    return MODEL_NAME
 
 
-MODEL_NAME = 'all-MiniLM-L12-v2'
-SIMILARITY_THRESHOLD = 0.3  # Minimum similarity score for matches
-TOP_K_MATCHES = 3  # Number of top matches to consider
+def translates_query(language: str, query_mode: str = QUERY_MODE) -> bool:
+    """True when a query in this language must be translated to English before searching"""
+    language = language.lower()
+    if language == "english":
+        return False
+    return query_mode != "multilingual" or language not in MULTILINGUAL_QUERY_LANGUAGES
+
+
+def get_api_key() -> Optional[str]:
+    """Read the Groq api key from Streamlit secrets, falling back to the environment"""
+    try:
+        import streamlit as st
+        return st.secrets["GROQ_API_KEY"]
+    except Exception:
+        return os.getenv("GROQ_API_KEY")
 
 class QueryRequest(BaseModel):
     query: str
     include_alternatives: bool = False
     similarity_threshold: float = SIMILARITY_THRESHOLD
+    explain: bool = True
+
+class BatchQueryRequest(BaseModel):
+    queries: List[str]
+    include_alternatives: bool = False
+    similarity_threshold: float = SIMILARITY_THRESHOLD
+    explain: bool = False
 
 class BNSSearchSystem:
-    def __init__(self, file_path: str, api_key: str):
+    def __init__(self, file_path: str, api_key: str, query_mode: str = QUERY_MODE):
         self.file_path = file_path
         self.api_key = api_key
+        self.query_mode = query_mode
+        self.model_name = embedding_model_name(query_mode)
         self.dataset = None
+        self.dataset_hash = None
         self.model = None
         self.embeddings = None
+        self.index = None
+        self.lexical_index = None
+        self.reranker = None
+        self.query_cache = QueryCache()
         self.client = None
-        self.required_columns = [
-            'Section_Number', 'Subsection_Number', 'Title', 'Content', 
-            'Explanation', 'Exception', 'Illustrations', 'Punishment', 'Cross_References'
-        ]
+        self.explanation_cache = None
+        self.required_columns = list(REQUIRED_COLUMNS)
         
         # Initialize system
         self._load_dataset()
         self._initialize_model()
         self._initialize_groq_client()
+        self._initialize_explanation_cache()
         self._create_embeddings()
+        self._create_lexical_index()
+        self._initialize_reranker()
     
     def _load_dataset(self):
-        """Load and validate dataset"""
+        """Load the compiled corpus, recompiling it from the spreadsheet if stale"""
         try:
-            logger.info(f"Loading dataset from {self.file_path}")
-            self.dataset = pd.read_excel(self.file_path)
-            
-            # Handle missing values more intelligently
-            self.dataset = self.dataset.fillna({
-                'Content': 'No content available',
-                'Explanation': 'No explanation available',
-                'Exception': 'No exceptions mentioned',
-                'Illustrations': 'No illustrations provided',
-                'Punishment': 'No punishment specified',
-                'Cross_References': 'No cross references',
-                'Title': 'Untitled section'
-            })
-            
-            # Validate required columns
-            missing_columns = [col for col in self.required_columns if col not in self.dataset.columns]
-            if missing_columns:
-                raise ValueError(f"Missing required columns: {missing_columns}")
-            
-            logger.info(f"Dataset loaded successfully with {len(self.dataset)} rows")
+            self.dataset = load_corpus(self.file_path)
+            self.dataset_hash = self.dataset.source_hash
             
         except Exception as e:
             logger.error(f"Error loading dataset: {e}")
@@ -94,72 +154,223 @@ class BNSSearchSystem:
     def _initialize_model(self):
         """Initialize sentence transformer model"""
         try:
-            logger.info(f"Loading sentence transformer model: {MODEL_NAME}")
-            self.model = SentenceTransformer(MODEL_NAME)
+            logger.info(f"Loading sentence transformer model: {self.model_name} ({ENCODER_BACKEND} backend)")
+            self.model = load_encoder(self.model_name, ENCODER_BACKEND)
             logger.info("Model loaded successfully")
         except Exception as e:
             logger.error(f"Error loading model: {e}")
             raise
     
     def _initialize_groq_client(self):
-        """Initialize Groq client"""
+        """Initialize the async Groq gateway (concurrency limit, retries, request coalescing)"""
         try:
-            self.client = Groq(api_key=self.api_key)
+            self.client = LLMGateway(api_key=self.api_key)
             logger.info("Groq client initialized successfully")
         except Exception as e:
             logger.error(f"Error initializing Groq client: {e}")
             raise
     
+    def _initialize_explanation_cache(self):
+        """Open the persistent explanation cache (optional: runs uncached if unavailable)"""
+        try:
+            self.explanation_cache = ExplanationCache()
+            logger.info(f"Explanation cache opened at {self.explanation_cache.path}")
+        except Exception as e:
+            logger.warning(f"Explanation cache unavailable, explanations will not be cached: {e}")
+            self.explanation_cache = None
+    
+    def reopen_process_resources(self):
+        """Re-create the SQLite connection and the Groq client in a forked worker process"""
+        self._initialize_explanation_cache()
+        self._initialize_groq_client()
+    
     def _create_embeddings(self):
-        """Create embeddings for all content"""
+        """Load cached embeddings or create them for changed content"""
         try:
             logger.info("Creating embeddings for dataset...")
             
-            # Combine multiple fields for better matching
-            combined_text = []
-            for _, row in self.dataset.iterrows():
-                text_parts = [
-                    str(row['Title']),
-                    str(row['Content']),
-                    str(row['Explanation']),
-                    str(row['Illustrations'])
-                ]
-                combined = " ".join([part for part in text_parts if part and part != 'nan'])
-                combined_text.append(combined)
+            cache = EmbeddingCache(self.model.cache_name)
+            self.embeddings = cache.load_or_build(
+                self.dataset_hash,
+                lambda: self.dataset.search_texts,
+                lambda texts: self.model.encode(texts, show_progress_bar=True),
+                n_rows=len(self.dataset)
+            )
+            logger.info(f"Created embeddings for {len(self.embeddings)} entries")
             
-            self.embeddings = self.model.encode(combined_text, show_progress_bar=True)
-            logger.info(f"Created embeddings for {len(combined_text)} entries")
+            self.index = build_index(self.embeddings, INDEX_BACKEND, normalized=True,
+                                     params=INDEX_PARAMS.get(INDEX_BACKEND))
             
         except Exception as e:
             logger.error(f"Error creating embeddings: {e}")
             raise
     
-    def _extract_section_number(self, query: str) -> Optional[str]:
-        """Extract section number from query if present"""
-        # Match patterns like "Section 123", "sec 123", "123", etc.
-        patterns = [
-            r'section\s+(\d+)',
-            r'sec\s+(\d+)',
-            r'§\s*(\d+)',
-            r'\b(\d{1,3})\b'  # standalone numbers
-        ]
+    def _create_lexical_index(self):
+        """Load or build the BM25 index over the same text as the embeddings"""
+        if RETRIEVAL_MODE != "hybrid":
+            return
+        try:
+            self.lexical_index = load_or_build_bm25(self.dataset_hash, search_text_recipe(),
+                                                    lambda: self.dataset.search_texts)
+        except Exception as e:
+            logger.warning(f"BM25 index unavailable, using dense retrieval only: {e}")
+            self.lexical_index = None
+    
+    def _initialize_reranker(self):
+        """Load the optional cross-encoder (NYAYA_RERANK=1); search works without it"""
+        if not RERANK_ENABLED:
+            return
+        try:
+            self.reranker = CrossEncoderReranker()
+        except Exception as e:
+            logger.warning(f"Cross-encoder re-ranker unavailable: {e}")
+            self.reranker = None
+    
+    def _encode_queries(self, user_queries: List[str], keys: List[str], batch_size: int = 32) -> np.ndarray:
+        """Normalized query vectors; cached ones skip the encoder"""
+        vectors: List[Optional[np.ndarray]] = [self.query_cache.embeddings.get(key) for key in keys]
+        missing = [i for i, vector in enumerate(vectors) if vector is None]
+        if missing:
+            encoded = np.atleast_2d(self.model.encode(
+                [user_queries[i] for i in missing], batch_size=batch_size, normalize_embeddings=True
+            ))
+            for i, vector in zip(missing, encoded):
+                vector = np.array(vector, dtype=np.float32)
+                vector.flags.writeable = False
+                self.query_cache.embeddings.put(keys[i], vector)
+                vectors[i] = vector
+        return np.stack(vectors)
+    
+    def _rank(self, user_queries: List[str], batch_size: int = 32,
+              k: int = TOP_K_MATCHES) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Ranked rows and similarities per query, served from the query cache when
+        the normalized query was seen before. Duplicates within a batch are
+        encoded and retrieved once.
+        """
+        keys = [normalize_query(user_query) for user_query in user_queries]
+        top_indices = np.full((len(user_queries), k), -1, dtype=np.int64)
+        top_similarities = np.full((len(user_queries), k), -np.inf, dtype=np.float32)
+        
+        pending: Dict[str, List[int]] = {}
+        for pos, key in enumerate(keys):
+            cached = self.query_cache.results.get((key, k))
+            if cached is not None:
+                top_indices[pos], top_similarities[pos] = cached
+            else:
+                pending.setdefault(key, []).append(pos)
         
-        for pattern in patterns:
+        if pending:
+            pending_keys = list(pending)
+            queries = [user_queries[pending[key][0]] for key in pending_keys]
+            indices, similarities = self._retrieve(
+                queries, self._encode_queries(queries, pending_keys, batch_size), k
+            )
+            for row, key in enumerate(pending_keys):
+                result = (indices[row].copy(), similarities[row].copy())
+                for array in result:
+                    array.flags.writeable = False
+                self.query_cache.results.put((key, k), result)
+                top_indices[pending[key]] = indices[row]
+                top_similarities[pending[key]] = similarities[row]
+        return top_indices, top_similarities
+    
+    def cache_stats(self) -> Dict:
+        """Hit rates of the query and explanation caches"""
+        stats = {"query": self.query_cache.stats()}
+        if self.explanation_cache is not None:
+            stats["explanation"] = self.explanation_cache.stats()
+        return stats
+    
+    def rank_passages(self, passages: List[str], k: int = TOP_K_MATCHES,
+                      batch_size: int = 64) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Ranked rows and similarities for many document passages in one batch.
+        Unlike _rank this skips the query cache (passages rarely repeat and would
+        evict real queries) and the cross-encoder, whose budget is per query.
+        """
+        if not passages:
+            return np.empty((0, k), dtype=np.int64), np.empty((0, k), dtype=np.float32)
+        embeddings = np.atleast_2d(self.model.encode(passages, batch_size=batch_size, normalize_embeddings=True))
+        return self._retrieve(passages, np.asarray(embeddings, dtype=np.float32), k, rerank=False)
+    
+    def _retrieve(self, user_queries: List[str], query_embeddings: np.ndarray,
+                  k: int = TOP_K_MATCHES, rerank: bool = True) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Ranked rows and their cosine similarities for each query. In hybrid mode
+        the dense and BM25 candidate lists are merged by reciprocal rank fusion;
+        with a re-ranker the shortlist is then re-ordered by the cross-encoder.
+        """
+        query_embeddings = np.atleast_2d(query_embeddings)
+        reranker = self.reranker if rerank else None
+        if self.lexical_index is None and reranker is None:
+            return self.index.search_batch(query_embeddings, k)
+        
+        shortlist = k if reranker is None else max(k, RERANK_CANDIDATES)
+        if self.lexical_index is not None:
+            dense_indices, _ = self.index.search_batch(query_embeddings, max(shortlist, HYBRID_CANDIDATES))
+        else:
+            dense_indices, _ = self.index.search_batch(query_embeddings, shortlist)
+        
+        top_indices = np.full((len(user_queries), k), -1, dtype=np.int64)
+        top_similarities = np.full((len(user_queries), k), -np.inf, dtype=np.float32)
+        for row, user_query in enumerate(user_queries):
+            candidates = dense_indices[row][dense_indices[row] >= 0]
+            if self.lexical_index is not None:
+                lexical_indices, _ = self.lexical_index.search(user_query, max(shortlist, HYBRID_CANDIDATES))
+                candidates, _ = reciprocal_rank_fusion([candidates, lexical_indices], k=RRF_K)
+            candidates = candidates[:shortlist]
+            if reranker is not None and len(candidates) > 1:
+                passages = [self.dataset.text(SEARCH_TEXT_COLUMN, int(i)) for i in candidates]
+                candidates, _ = reranker.rerank(user_query, candidates, passages)
+            candidates = candidates[:k]
+            top_indices[row, :len(candidates)] = candidates
+            top_similarities[row, :len(candidates)] = self.embeddings[candidates] @ query_embeddings[row]
+        return top_indices, top_similarities
+    
+    def _extract_section_number(self, query: str) -> Optional[Tuple[int, Optional[int]]]:
+        """Extract (section, subsection) from query if present"""
+        # Match patterns like "Section 103(2)", "s. 318 sub 4", "u/s 302", "sec 123", "123", etc.
+        for pattern in SECTION_PATTERNS:
             match = re.search(pattern, query.lower())
             if match:
-                return match.group(1)
+                groups = [g for g in match.groups() if g is not None]
+                subsection = int(groups[1]) if len(groups) > 1 else None
+                return int(groups[0]), subsection
         return None
     
-    def _search_by_section_number(self, section_num: str) -> Optional[pd.Series]:
-        """Search for exact section number match"""
-        try:
-            section_num = int(section_num)
-            matches = self.dataset[self.dataset['Section_Number'] == section_num]
-            if not matches.empty:
-                return matches.iloc[0]
-        except (ValueError, IndexError):
-            pass
-        return None
+    def _search_by_section_number(self, section_num: int, subsection_num: Optional[int] = None) -> Optional[Dict]:
+        """Search for exact section (and subsection) number match"""
+        row = self.dataset.sections.lookup(section_num, subsection_num)
+        if row is None:
+            return None
+        return self.dataset.row(row)
+    
+    def _exact_match(self, user_query: str) -> Optional[Tuple[Dict, str]]:
+        """Resolve a section reference in the query to its row and match type"""
+        reference = self._extract_section_number(user_query)
+        if reference is None:
+            return None
+        section_num, subsection_num = reference
+        matched_row = self._search_by_section_number(section_num, subsection_num)
+        if matched_row is None:
+            return None
+        if subsection_num is not None and \
+                subsection_key(section_num, matched_row['Subsection_Number']) == subsection_num:
+            return matched_row, "Exact Subsection Match"
+        return matched_row, "Exact Section Match"
+    
+    def list_subsections(self, section_num: int) -> List[Dict]:
+        """All subsections of a section, ordered by subsection number"""
+        subsections = []
+        for subsection, row in self.dataset.sections.subsections(section_num):
+            subsections.append({
+                "section_number": section_num,
+                "subsection": subsection,
+                "subsection_number": self._convert_numpy(self.dataset.subsection_numbers[row]),
+                "title": self.dataset.text('Title', row)
+            })
+        return subsections
     
     def _convert_numpy(self, obj):
         """Convert numpy objects to native Python types"""
@@ -171,18 +382,60 @@ class BNSSearchSystem:
             return None
         return obj
     
-    @lru_cache(maxsize=100)
-    def _generate_response_cached(self, title: str, content: str, explanation: str, 
+    def _section_id(self, section_number, subsection_number) -> str:
+        return f"{self._convert_numpy(section_number)}:{self._convert_numpy(subsection_number)}"
+    
+    def explain_row(self, matched_row: Dict) -> str:
+        """LLM explanation of a dataset row (served from the explanation cache when possible)"""
+        return self._generate_response_cached(
+            self._section_id(matched_row['Section_Number'], matched_row['Subsection_Number']),
+            str(matched_row['Title']),
+            str(matched_row['Content']),
+            str(matched_row['Explanation']),
+            str(matched_row['Exception']),
+            str(matched_row['Illustrations']),
+            str(matched_row['Punishment'])
+        )
+    
+    def _generate_response_cached(self, section_id: str, title: str, content: str, explanation: str, 
                                  exception: str, illustrations: str, punishment: str) -> str:
         """Cached version of response generation to avoid repeated api calls"""
-        return self._generate_human_like_response_internal(
-            title, content, explanation, exception, illustrations, punishment
-        )
+        return "".join(self._generate_response_stream(
+            section_id, title, content, explanation, exception, illustrations, punishment
+        )).strip()
     
-    def _generate_human_like_response_internal(self, title: str, content: str, explanation: str,
-                                             exception: str, illustrations: str, punishment: str) -> str:
-        """Generate human-like response using Groq api"""
-        prompt = f"""Based on the following legal information from the Bharatiya Nyaya Sanhita (BNS), create a comprehensive and clear explanation for the general public:
+    def _generate_response_stream(self, section_id: str, title: str, content: str, explanation: str,
+                                  exception: str, illustrations: str, punishment: str) -> Iterator[str]:
+        """
+        Yield the explanation as it is generated. A cached explanation is yielded
+        in one piece; a fresh one is cached once the stream completes.
+        """
+        prompt = self._build_prompt(title, content, explanation, exception, illustrations, punishment)
+        key = explanation_key(section_id, {"prompt": prompt}, PROMPT_TEMPLATE_VERSION, LLM_MODEL, LLM_PARAMS)
+        if self.explanation_cache is not None:
+            cached = self.explanation_cache.get(key)
+            if cached is not None:
+                yield cached
+                return
+        
+        parts = []
+        try:
+            for token in self._stream_explanation(prompt, key):
+                parts.append(token)
+                yield token
+        except Exception as e:
+            # Errors are returned but never cached
+            logger.error(f"Error generating response: {e}")
+            yield f"Error generating explanation. Please try again later. (Error: {str(e)})"
+            return
+        
+        if self.explanation_cache is not None:
+            self.explanation_cache.put(key, "".join(parts).strip(), section_id, LLM_MODEL)
+    
+    def _build_prompt(self, title: str, content: str, explanation: str,
+                      exception: str, illustrations: str, punishment: str) -> str:
+        """Fill the explanation prompt template (bump PROMPT_TEMPLATE_VERSION on changes)"""
+        return f"""Based on the following legal information from the Bharatiya Nyaya Sanhita (BNS), create a comprehensive and clear explanation for the general public:
 
 Title: {title}
 Content: {content}
@@ -201,106 +454,180 @@ Instructions:
 7. Make it flow as a cohesive paragraph
 
 Please provide a detailed, human-readable explanation:"""
-
-        try:
-            completion = self.client.chat.completions.create(
-                model="llama-3.1-8b-instant",
-                messages=[
-                    {"role": "system", "content": "You are a legal expert who explains Indian laws in simple, clear language for the general public."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.7,  # Reduced for more consistent responses
-                max_tokens=1024,
-                top_p=0.9,
-                stream=True,
-                stop=None
-            )
-            
-            response_text = ""
-            for chunk in completion:
-                if chunk.choices[0].delta.content:
-                    response_text += chunk.choices[0].delta.content
-            
-            return response_text.strip()
-            
-        except Exception as e:
-            logger.error(f"Error generating response: {e}")
-            return f"Error generating explanation. Please try again later. (Error: {str(e)})"
+    
+    def _request_explanation(self, prompt: str, key: Optional[str] = None) -> str:
+        """Call the Groq api; raises on failure"""
+        return "".join(self._stream_explanation(prompt, key)).strip()
+    
+    def _stream_explanation(self, prompt: str, key: Optional[str] = None) -> Iterator[str]:
+        """
+        Yield explanation tokens from the Groq api as they arrive; raises on failure.
+        Concurrent calls with the same key share one upstream request.
+        """
+        yield from self.client.stream_sync(
+            [
+                {"role": "system", "content": SYSTEM_PROMPT},
+                {"role": "user", "content": prompt}
+            ],
+            LLM_MODEL,
+            key=key,
+            **LLM_PARAMS
+        )
     
     def search(self, user_query: str, include_alternatives: bool = False, 
-               similarity_threshold: float = SIMILARITY_THRESHOLD) -> Dict:
+               similarity_threshold: float = SIMILARITY_THRESHOLD, explain: bool = True) -> Dict:
         """Enhanced search with multiple matching strategies"""
         try:
             logger.info(f"Processing query: {user_query}")
             
             # Strategy 1: Try exact section number match first
-            section_num = self._extract_section_number(user_query)
-            if section_num:
-                exact_match = self._search_by_section_number(section_num)
-                if exact_match is not None:
-                    logger.info(f"Found exact section match: {section_num}")
-                    return self._format_response(exact_match, "Exact Section Match")
+            exact_match = self._exact_match(user_query)
+            if exact_match is not None:
+                matched_row, match_type = exact_match
+                logger.info(f"Found {match_type.lower()}: {matched_row['Section_Number']}")
+                return self._format_response(matched_row, match_type, explain=explain)
             
-            # Strategy 2: Semantic similarity search
-            query_embedding = self.model.encode(user_query)
-            similarities = util.cos_sim(query_embedding, self.embeddings)[0].numpy()
+            # Strategy 2: Semantic similarity search (repeated queries come from the query cache)
+            top_indices, top_similarities = self._rank([user_query])
             
-            # Get top matches
-            top_indices = np.argsort(similarities)[::-1][:TOP_K_MATCHES]
-            top_similarities = similarities[top_indices]
+            return self._semantic_response(top_indices[0], top_similarities[0],
+                                           include_alternatives, similarity_threshold, explain)
             
-            # Check if best match meets threshold
-            best_similarity = top_similarities[0]
-            if best_similarity < similarity_threshold:
-                return {
-                    "status": "no_match",
-                    "message": f"No relevant sections found with similarity > {similarity_threshold:.2f}. Best match similarity: {best_similarity:.2f}",
-                    "suggestion": "Try rephrasing your query or using more specific legal terms."
-                }
-            
-            # Get best match
-            best_match_idx = top_indices[0]
-            matched_row = self.dataset.iloc[best_match_idx]
+        except Exception as e:
+            logger.error(f"Error in search: {e}")
+            return {
+                "status": "error",
+                "message": f"An error occurred while processing your query: {str(e)}"
+            }
+    
+    def _semantic_response(self, top_indices: np.ndarray, top_similarities: np.ndarray,
+                           include_alternatives: bool, similarity_threshold: float,
+                           explain: bool = True) -> Dict:
+        """Turn ranked index hits into a search response"""
+        # The best match is the first row (in ranking order) that meets the
+        # threshold. With hybrid retrieval the fused ranking need not be sorted
+        # by similarity, so the fused top-1 may itself fall below it.
+        passing = [i for i in range(len(top_indices))
+                   if top_indices[i] >= 0 and top_similarities[i] >= similarity_threshold]
+        if not passing:
+            valid = top_similarities[top_indices >= 0]
+            best_similarity = float(np.max(valid)) if len(valid) else 0.0
+            return {
+                "status": "no_match",
+                "message": f"No relevant sections found with similarity > {similarity_threshold:.2f}. Best match similarity: {best_similarity:.2f}",
+                "suggestion": "Try rephrasing your query or using more specific legal terms."
+            }
+        
+        # Get best match
+        best = passing[0]
+        matched_row = self.dataset.row(int(top_indices[best]))
+        
+        response = self._format_response(matched_row, "Semantic Match", top_similarities[best], explain)
+        
+        # Add alternative matches if requested
+        if include_alternatives and len(passing) > 1:
+            alternatives = []
+            for i in passing[1:3]:  # Up to 2 alternatives
+                alt_row = self.dataset.row(int(top_indices[i]))
+                alternatives.append({
+                    "section_number": self._convert_numpy(alt_row['Section_Number']),
+                    "title": alt_row['Title'],
+                    "similarity_score": float(top_similarities[i])
+                })
             
-            response = self._format_response(matched_row, "Semantic Match", best_similarity)
+            if alternatives:
+                response["alternatives"] = alternatives
+        
+        return response
+    
+    def search_batch(self, user_queries: List[str], include_alternatives: bool = False,
+                     similarity_threshold: float = SIMILARITY_THRESHOLD,
+                     explain: bool = False, batch_size: int = 64) -> List[Dict]:
+        """
+        Search many queries at once: section numbers are resolved first, the rest
+        are encoded in one batched forward pass and scored with one matrix product.
+        With explain=False the LLM explanation is skipped (see explain_response).
+        """
+        results: List[Optional[Dict]] = [None] * len(user_queries)
+        try:
+            # Strategy 1: exact section number matches
+            semantic_positions = []
+            for pos, user_query in enumerate(user_queries):
+                exact_match = self._exact_match(user_query)
+                if exact_match is not None:
+                    matched_row, match_type = exact_match
+                    results[pos] = self._format_response(matched_row, match_type, explain=explain)
+                else:
+                    semantic_positions.append(pos)
             
-            # Add alternative matches if requested
-            if include_alternatives and len(top_indices) > 1:
-                alternatives = []
-                for i in range(1, min(len(top_indices), 3)):  # Up to 2 alternatives
-                    if top_similarities[i] >= similarity_threshold:
-                        alt_row = self.dataset.iloc[top_indices[i]]
-                        alternatives.append({
-                            "section_number": self._convert_numpy(alt_row['Section_Number']),
-                            "title": alt_row['Title'],
-                            "similarity_score": float(top_similarities[i])
-                        })
-                
-                if alternatives:
-                    response["alternatives"] = alternatives
+            # Strategy 2: one batched encode + one matrix multiply for the rest
+            if semantic_positions:
+                top_indices, top_similarities = self._rank(
+                    [user_queries[pos] for pos in semantic_positions], batch_size=batch_size
+                )
+                for row, pos in enumerate(semantic_positions):
+                    results[pos] = self._semantic_response(
+                        top_indices[row], top_similarities[row],
+                        include_alternatives, similarity_threshold, explain
+                    )
             
-            return response
+            logger.info(f"Processed batch of {len(user_queries)} queries "
+                        f"({len(user_queries) - len(semantic_positions)} exact section matches)")
+            return results
             
         except Exception as e:
-            logger.error(f"Error in search: {e}")
-            return {
+            logger.error(f"Error in batch search: {e}")
+            error = {
                 "status": "error",
                 "message": f"An error occurred while processing your query: {str(e)}"
             }
+            return [result if result is not None else dict(error) for result in results]
+    
+    def explain_response(self, response: Dict) -> Dict:
+        """Fill in the LLM explanation of a response produced with explain=False"""
+        for _ in self.explain_response_stream(response):
+            pass
+        return response
+    
+    def explain_response_stream(self, response: Dict) -> Iterator[str]:
+        """Yield explanation tokens for a pending response, then store the full text in it"""
+        if response.get("status") != "success" or not response.get("explanation_pending"):
+            return
+        parts = []
+        for token in self._generate_response_stream(
+            self._section_id(response['section_number'], response['subsection_number']),
+            str(response['title']),
+            str(response['content']),
+            str(response['original_explanation']),
+            str(response['exception']),
+            str(response['illustrations']),
+            str(response['punishment'])
+        ):
+            parts.append(token)
+            yield token
+        response["explanation"] = "".join(parts).strip()
+        del response["explanation_pending"]
     
-    def _format_response(self, matched_row: pd.Series, match_type: str, 
-                        similarity_score: float = None) -> Dict:
+    def search_stream(self, user_query: str, include_alternatives: bool = False,
+                      similarity_threshold: float = SIMILARITY_THRESHOLD) -> Iterator[Union[Dict, str]]:
+        """
+        Yield the structured response (without the LLM explanation) first, then
+        the explanation tokens as they arrive. Once the generator is exhausted the
+        response dict also carries the full explanation.
+        """
+        response = self.search(user_query, include_alternatives, similarity_threshold, explain=False)
+        yield response
+        yield from self.explain_response_stream(response)
+    
+    def _format_response(self, matched_row: Dict, match_type: str, 
+                        similarity_score: float = None, explain: bool = True) -> Dict:
         """Format the response in a consistent structure"""
         try:
-            # Generate human-like explanation
-            human_explanation = self._generate_response_cached(
-                str(matched_row['Title']),
-                str(matched_row['Content']),
-                str(matched_row['Explanation']),
-                str(matched_row['Exception']),
-                str(matched_row['Illustrations']),
-                str(matched_row['Punishment'])
-            )
+            # Generate human-like explanation (or defer it and show the source text)
+            if explain:
+                human_explanation = self.explain_row(matched_row)
+            else:
+                human_explanation = matched_row['Explanation']
             
             response = {
                 "status": "success",
@@ -321,6 +648,9 @@ Please provide a detailed, human-readable explanation:"""
             if similarity_score is not None:
                 response["similarity_score"] = float(similarity_score)
             
+            if not explain:
+                response["explanation_pending"] = True
+            
             return response
             
         except Exception as e:
@@ -330,22 +660,87 @@ Please provide a detailed, human-readable explanation:"""
                 "message": f"Error formatting response: {str(e)}"
             }
 
-# Initialize the system
-try:
-    bns_system = BNSSearchSystem(FILE_PATH, api_key)
+# ============================================================================
+# Shared instance: built lazily, once per process, and reused by every session
+# ============================================================================
+_bns_system = None
+_init_error = None
+_init_lock = threading.Lock()
+_warmup_thread = None
+
+
+def get_bns_system() -> Optional[BNSSearchSystem]:
+    """Return the shared search system, building it on first use (thread-safe)"""
+    global _bns_system, _init_error
+    if _bns_system is not None:
+        return _bns_system
+    with _init_lock:
+        if _bns_system is None and _init_error is None:
+            try:
+                _bns_system = BNSSearchSystem(FILE_PATH, get_api_key())
+                logger.info("BNS Search System initialized successfully")
+            except Exception as e:
+                logger.error(f"Failed to initialize BNS Search System: {e}")
+                _init_error = e
+    return _bns_system
+
+
+def warm_up() -> threading.Thread:
+    """Start building the shared search system in a background thread"""
+    global _warmup_thread
+    with _init_lock:
+        if _warmup_thread is None:
+            _warmup_thread = threading.Thread(target=get_bns_system, name="bns-warmup", daemon=True)
+            _warmup_thread.start()
+        return _warmup_thread
+
+
+def is_ready() -> bool:
+    return _bns_system is not None
 
-    logger.info("BNS Search System initialized successfully")
-except Exception as e:
-    logger.error(f"Failed to initialize BNS Search System: {e}")
-    bns_system = None
 
 def modelRun(user_query: str, include_alternatives: bool = False, 
-             similarity_threshold: float = SIMILARITY_THRESHOLD) -> Dict:
+             similarity_threshold: float = SIMILARITY_THRESHOLD, wait: bool = False) -> Dict:
     """Main function to run the model with improved features"""
-    if bns_system is None:
+    system = _bns_system
+    if system is None and _init_error is None:
+        if not wait:
+            warm_up()
+            return {
+                "status": "warming_up",
+                "message": "The legal search engine is still warming up. Please try again in a few seconds."
+            }
+        system = get_bns_system()
+
+    if system is None:
         return {
             "status": "error",
             "message": "BNS Search System not initialized. Please check the dataset file and api key."
         }
     
-    return bns_system.search(user_query, include_alternatives, similarity_threshold)
+    return system.search(user_query, include_alternatives, similarity_threshold)
+
+
+def modelRun_stream(user_query: str, include_alternatives: bool = False,
+                    similarity_threshold: float = SIMILARITY_THRESHOLD) -> Iterator[Union[Dict, str]]:
+    """Streaming modelRun: yields the response dict first, then explanation tokens"""
+    system = _bns_system
+    if system is None:
+        yield modelRun(user_query, include_alternatives, similarity_threshold)
+        return
+    
+    yield from system.search_stream(user_query, include_alternatives, similarity_threshold)
+
+
+def modelRun_batch(user_queries: List[str], include_alternatives: bool = False,
+                   similarity_threshold: float = SIMILARITY_THRESHOLD,
+                   explain: bool = False) -> List[Dict]:
+    """Run many queries through one batched encode; blocks until the engine is ready"""
+    system = get_bns_system()
+    if system is None:
+        return [{
+            "status": "error",
+            "message": "BNS Search System not initialized. Please check the dataset file and api key."
+        } for _ in user_queries]
+    
+    return system.search_batch(user_queries, include_alternatives, similarity_threshold, explain)
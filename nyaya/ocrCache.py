@@ -0,0 +1,135 @@
+# ocrCache.py - page-level OCR results keyed on rendered page content
+#
+# The key hashes a page's rendered grayscale samples together with the DPI,
+# the tesseract language packs and the OCR engine + version, so the same page
+# uploaded again (or inside a lightly edited FIR) is never OCR'd twice.
+# Shared by every OCR worker process through one SQLite file (WAL mode) and
+# trimmed least-recently-used first once it grows past NYAYA_OCR_CACHE_MB.
+#   python ocrCache.py --stats
+#   python ocrCache.py --clear
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import argparse
+import threading
+from typing import Dict, Optional
+
+from bnsDataset import CACHE_DIR
+from queryCache import hit_stats
+
+OCR_CACHE_PATH = os.environ.get("NYAYA_OCR_CACHE", os.path.join(CACHE_DIR, "ocr.sqlite3"))
+OCR_CACHE_MAX_BYTES = int(float(os.environ.get("NYAYA_OCR_CACHE_MB", "256")) * 1024 * 1024)
+# Hits only record their access time in memory; it is written to the table with
+# the next put(), or by a hit once this long has passed, so reads stay read-only
+ACCESS_FLUSH_SECONDS = 300
+
+
+def ocr_page_key(samples: bytes, width: int, height: int, dpi: int,
+                 languages: str, engine: str, engine_version: str) -> str:
+    digest = hashlib.sha256(f"{width}x{height}|{dpi}|{languages}|{engine}|{engine_version}|".encode("utf-8"))
+    digest.update(samples)
+    return digest.hexdigest()
+
+
+class OcrCache:
+    """SQLite key/value store with size-bounded LRU eviction and hit/miss counters"""
+
+    def __init__(self, path: str = OCR_CACHE_PATH, max_bytes: int = OCR_CACHE_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._accessed: Dict[str, float] = {}
+        self._flushed_at = time.time()
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS pages (
+                key TEXT PRIMARY KEY,
+                text TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_pages_accessed ON pages(accessed_at)")
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute("SELECT text FROM pages WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            now = time.time()
+            self._accessed[key] = now
+            if now - self._flushed_at > ACCESS_FLUSH_SECONDS:
+                self._flush_accessed()
+                self._conn.commit()
+            self.hits += 1
+            return row[0]
+
+    def _flush_accessed(self):
+        if self._accessed:
+            self._conn.executemany("UPDATE pages SET accessed_at = ? WHERE key = ?",
+                                   [(t, key) for key, t in self._accessed.items()])
+            self._accessed.clear()
+        self._flushed_at = time.time()
+
+    def put(self, key: str, text: str):
+        now = time.time()
+        size = len(key) + len(text.encode("utf-8"))
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?)", (key, text, size, now, now))
+            self._flush_accessed()
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        """Drop the least recently used pages until the stored text fits in max_bytes"""
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM pages").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        excess = total - self.max_bytes
+        freed = 0
+        victims = []
+        for key, size in self._conn.execute("SELECT key, size FROM pages ORDER BY accessed_at ASC"):
+            victims.append((key,))
+            freed += size
+            if freed >= excess:
+                break
+        self._conn.executemany("DELETE FROM pages WHERE key = ?", victims)
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM pages")
+            self._conn.commit()
+            self._conn.execute("VACUUM")
+
+    def stats(self) -> Dict:
+        with self._lock:
+            entries, size = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM pages").fetchone()
+        return {"entries": entries, "bytes": size, "max_bytes": self.max_bytes, **hit_stats(self.hits, self.misses)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage the page-level OCR cache")
+    parser.add_argument("--clear", action="store_true", help="Delete all cached pages")
+    parser.add_argument("--stats", action="store_true", help="Print cache statistics")
+    args = parser.parse_args()
+
+    if args.clear:
+        OcrCache().clear()
+        print("OCR cache cleared")
+    if args.stats:
+        print(json.dumps(OcrCache().stats(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,36 +1,188 @@
-import requests
+# pdfSummarize.py - map-reduce summaries of long case documents
+#
+# The extracted text (pdfUsingOCR.py output, "--- Page n ---" separated) is
+# split on page, then paragraph, then line boundaries into chunks that fit a
+# token budget. Every chunk is summarized concurrently through llmGateway.py
+# (one pooled connection, bounded concurrency, retries with backoff), and the
+# partial summaries are merged, hierarchically if they are still too long
+# for one request.
+#   python pdfSummarize.py ../dataset/fir/fir6.pdf
+#   python pdfSummarize.py ../logs/out_text.txt --chunk-tokens 3000
 import os
-from dotenv import load_dotenv
-
-api_url = "https://api.groq.com/openai/v1/chat/completions"
-
-
-load_dotenv()
-api_key = os.getenv("GROQ_API_KEY")
-model = "meta-llama/llama-4-scout-17b-16e-instruct"
-file_path = "E:/Shashank Singh/Nyaya/logs/out_text.txt"
-
-def call_groq_summary(prompt):
-    headers = {
-        "Content-Type": "application/json",
-        "Authorization": f"Bearer {api_key}"
-    }
-    data = {
-        "model": MODEL,
-        "messages": [
-            {"role": "user", "content": f"Read the following legal case document and summarize it in clear, factual bullet points. Use plain language that can be understood by a common person. Do not include legal jargon, interpretations, or formatting like asterisks or emojis. Give final output no prompt from your side. Just provide the facts clearly, section by section:\n\n{prompt}"}
-        ]
-    }
-    response = requests.post(API_URL, headers=headers, json=data)
-    if response.status_code == 200:
-        return response.json()["choices"][0]["message"]["content"].strip()
-    else:
-        print("Error:", response.status_code, response.text)
-        return "[ERROR]"
-
-with open(FILE_PATH, "r", encoding="utf-8") as f:
-    text = f.read()
-
-summary = call_groq_summary(text)
-summaryFinal = summary.replace("*", "")
-print(summaryFinal)
+import re
+import sys
+import time
+import asyncio
+import logging
+import argparse
+from typing import List
+
+from llmGateway import LLMGateway
+
+logger = logging.getLogger(__name__)
+
+try:
+    from dotenv import load_dotenv
+    load_dotenv()
+except ImportError:
+    pass
+
+SUMMARY_MODEL = os.getenv("NYAYA_SUMMARY_MODEL", "meta-llama/llama-4-scout-17b-16e-instruct")
+# Input budget per request; the prompt and the reply need room as well
+CHUNK_TOKENS = int(os.getenv("NYAYA_SUMMARY_CHUNK_TOKENS", "6000"))
+CHARS_PER_TOKEN = 4
+# Each reduce level at least halves the partial summaries, so this is only hit
+# by documents with ~2^MAX_REDUCE_LEVELS chunks
+MAX_REDUCE_LEVELS = 8
+
+SUMMARY_PROMPT = (
+    "Read the following legal case document and summarize it in clear, factual bullet points. "
+    "Use plain language that can be understood by a common person. Do not include legal jargon, "
+    "interpretations, or formatting like asterisks or emojis. Give final output no prompt from your side. "
+    "Just provide the facts clearly, section by section:\n\n{text}"
+)
+CHUNK_PROMPT = (
+    "The following is part {part} of {parts} of a legal case document. Summarize the facts it contains "
+    "in clear, factual bullet points in plain language. Keep names, dates, places, amounts and section "
+    "numbers exactly. Do not add interpretations, formatting like asterisks or emojis, or any text other "
+    "than the bullet points:\n\n{text}"
+)
+MERGE_PROMPT = (
+    "The following are bullet-point summaries of consecutive parts of one legal case document. "
+    "Combine them into a single summary in clear, factual bullet points, section by section, in plain "
+    "language. Remove repetition, keep names, dates, places, amounts and section numbers exactly, and do "
+    "not add interpretations, formatting like asterisks or emojis, or any text other than the summary:\n\n{text}"
+)
+
+_PAGE_BREAK = re.compile(r"(?=^--- Page \d+ ---$)", re.MULTILINE)
+_PAGE_MARKER = re.compile(r"^--- Page \d+ ---$", re.MULTILINE)
+_PARAGRAPH_BREAK = re.compile(r"\n\s*\n")
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def _pieces(text: str, max_tokens: int) -> List[str]:
+    """Split text into pieces under max_tokens, preferring the coarsest boundary"""
+    if estimate_tokens(text) <= max_tokens:
+        return [text]
+    for pattern in (_PAGE_BREAK, _PARAGRAPH_BREAK, re.compile("\n")):
+        parts = [part for part in pattern.split(text) if part.strip()]
+        if len(parts) > 1:
+            return [piece for part in parts for piece in _pieces(part, max_tokens)]
+    # One enormous line: cut it on the last space before the budget
+    limit = max_tokens * CHARS_PER_TOKEN
+    cut = text.rfind(" ", 0, limit)
+    cut = cut if cut > 0 else limit
+    return [text[:cut]] + _pieces(text[cut:].lstrip(), max_tokens)
+
+
+def _blank(text: str) -> bool:
+    """No text besides whitespace and page markers (e.g. scanned pages without OCR)"""
+    return not _PAGE_MARKER.sub("", text).strip()
+
+
+def split_chunks(text: str, max_tokens: int = CHUNK_TOKENS) -> List[str]:
+    """Pack page/paragraph pieces greedily into chunks of at most max_tokens; [] for blank text"""
+    chunks, current, current_tokens = [], [], 0
+    if _blank(text):
+        return chunks
+    for piece in _pieces(text.strip(), max_tokens):
+        if _blank(piece):
+            continue
+        tokens = estimate_tokens(piece)
+        if current and current_tokens + tokens > max_tokens:
+            chunks.append("\n\n".join(current))
+            current, current_tokens = [], 0
+        current.append(piece.strip())
+        current_tokens += tokens
+    if current:
+        chunks.append("\n\n".join(current))
+    return chunks
+
+
+def _clean(summary: str) -> str:
+    return summary.replace("*", "").strip()
+
+
+class DocumentSummarizer:
+    """Map-reduce summarization over one LLMGateway"""
+
+    def __init__(self, gateway: LLMGateway, model: str = SUMMARY_MODEL, chunk_tokens: int = CHUNK_TOKENS):
+        self.gateway = gateway
+        self.model = model
+        self.chunk_tokens = chunk_tokens
+        self.stats = {"chunks": 0, "requests": 0, "levels": 0}
+
+    async def _ask(self, prompt: str) -> str:
+        self.stats["requests"] += 1
+        return _clean(await self.gateway.complete([{"role": "user", "content": prompt}], self.model))
+
+    async def summarize(self, text: str) -> str:
+        chunks = split_chunks(text, self.chunk_tokens)
+        self.stats["chunks"] = len(chunks)
+        if not chunks:
+            return ""
+        if len(chunks) == 1:
+            return await self._ask(SUMMARY_PROMPT.format(text=chunks[0]))
+
+        # Map: every chunk at once; the gateway bounds how many are in flight
+        partials = await asyncio.gather(*(
+            self._ask(CHUNK_PROMPT.format(part=i + 1, parts=len(chunks), text=chunk))
+            for i, chunk in enumerate(chunks)
+        ))
+        self.stats["levels"] = 1
+
+        # Reduce: merge neighbouring summaries until they fit a single request
+        while True:
+            if len(partials) == 1:
+                # A merged summary that alone exceeds the budget; merging it again would not shrink it
+                return partials[0]
+            if self.stats["levels"] >= MAX_REDUCE_LEVELS:
+                raise RuntimeError(f"Summaries did not converge after {MAX_REDUCE_LEVELS} merge levels "
+                                   f"({len(partials)} left); raise the chunk size")
+            groups = split_chunks("\n\n".join(partials), self.chunk_tokens)
+            if len(groups) == 1:
+                return await self._ask(MERGE_PROMPT.format(text=groups[0]))
+            if len(groups) >= len(partials):
+                # Summaries are not shrinking; merge pairwise so the loop terminates
+                groups = ["\n\n".join(partials[i:i + 2]) for i in range(0, len(partials), 2)]
+            self.stats["levels"] += 1
+            partials = await asyncio.gather(*(self._ask(MERGE_PROMPT.format(text=group)) for group in groups))
+
+    def summarize_sync(self, text: str) -> str:
+        return self.gateway.run_sync(self.summarize(text))
+
+
+def load_text(path: str) -> str:
+    if path.lower().endswith(".pdf"):
+        from pdfUsingOCR import extract_text
+        return extract_text(path)
+    with open(path, "r", encoding="utf-8") as f:
+        return f.read()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Summarize a case document (PDF or extracted text)")
+    parser.add_argument("path", help="PDF, or a text file written by pdfUsingOCR.py")
+    parser.add_argument("--model", default=SUMMARY_MODEL)
+    parser.add_argument("--chunk-tokens", type=int, default=CHUNK_TOKENS)
+    parser.add_argument("--api-key", default=os.getenv("GROQ_API_KEY"))
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    if not args.api_key:
+        raise SystemExit("Set GROQ_API_KEY (or pass --api-key)")
+
+    text = load_text(args.path)
+    summarizer = DocumentSummarizer(LLMGateway(api_key=args.api_key), args.model, args.chunk_tokens)
+    start = time.perf_counter()
+    summary = summarizer.summarize_sync(text)
+    print(summary)
+    print(f"\n[{summarizer.stats['chunks']} chunks, {summarizer.stats['requests']} requests, "
+          f"{time.perf_counter() - start:.1f}s]", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,59 +1,313 @@
+# pdfUsingOCR.py - page-level PDF text extraction
+#
+# extract_pages(source) takes a path or the raw bytes of a PDF and returns one
+# {"page", "text", "source", "seconds"} dict per page. Pages that carry a
+# native text layer (born-digital FIRs) are read directly; scanned pages are
+# rendered to grayscale and OCR'd. OCR pages are spread over a process pool,
+# and pixmap samples go straight to the OCR engine without a PNG round trip.
+# OCR results are cached per page on the rendered content (ocrCache.py), so
+# a re-uploaded FIR only costs rendering and hashing.
+#   python pdfUsingOCR.py ../dataset/fir/fir1.pdf --out fir1.txt
+#   python pdfUsingOCR.py --benchmark                 # pages/sec on dataset/fir
+import os
+import sys
+import glob
+import time
+import tempfile
 import platform
+import argparse
+import threading
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
 from pathlib import Path
-import pytesseract
+from typing import Callable, Dict, List, Optional, Sequence, Union
+
 try:
-    import fitz 
+    import fitz
 except ImportError:
     print("PyMuPDF not found. Install it with: pip install PyMuPDF")
-    exit(1)
-from PIL import Image
-import io
+    sys.exit(1)
+
+from bnsDataset import PROJECT_ROOT
+from ocrCache import OcrCache, ocr_page_key
+
+FIR_DIR = os.path.join(PROJECT_ROOT, "dataset", "fir")
+OCR_DPI = int(os.getenv("NYAYA_OCR_DPI", "144"))            # 2x the PDF's 72 dpi
+OCR_LANGUAGES = os.getenv("NYAYA_OCR_LANG", "eng")          # tesseract language packs, e.g. "eng+hin"
+OCR_ENGINE = os.getenv("NYAYA_OCR_ENGINE", "auto")          # auto | tesserocr | pytesseract
+OCR_WORKERS = int(os.getenv("NYAYA_OCR_WORKERS", str(os.cpu_count() or 1)))
+OCR_CACHE_ENABLED = os.getenv("NYAYA_OCR_CACHE_ENABLED", "1") == "1"
+PAGES_PER_TASK = 2
+# A page with fewer native characters than this is treated as scanned
+MIN_TEXT_CHARS = 25
 
 if platform.system() == "Windows":
-    pytesseract.pytesseract.tesseract_cmd = (
-        r"C:\Program Files\Tesseract-OCR\tesseract.exe"
-    )
-    out_directory = Path("E:/Shashank SinghNyaya/logs").expanduser()
+    TESSERACT_CMD = os.getenv("NYAYA_TESSERACT_CMD", r"C:\Program Files\Tesseract-OCR\tesseract.exe")
 else:
-    out_directory = Path("~").expanduser()
+    TESSERACT_CMD = os.getenv("NYAYA_TESSERACT_CMD")
 
-PDF_file = Path("E:/Shashank Singh/Nyaya/dataset/fir/fir1.pdf")
-text_file = out_directory / Path("pdfTextExtractor.txt")
+PdfSource = Union[str, Path, bytes]
 
-def main():
-    if not PDF_file.exists():
-        print(f"Error: PDF file '{PDF_file}' not found!")
-        return
-    
+
+# ---------------------------------------------------------------------------- OCR engines
+
+class _TesserocrEngine:
+    """Tesseract's C API: the model stays loaded and raw samples are passed by pointer"""
+
+    name = "tesserocr"
+
+    def __init__(self, languages: str):
+        import tesserocr
+        self.api = tesserocr.PyTessBaseAPI(lang=languages)
+        self.version = tesserocr.tesseract_version().split()[1]
+
+    def recognize(self, samples: bytes, width: int, height: int, dpi: int) -> str:
+        self.api.SetImageBytes(samples, width, height, 1, width)
+        self.api.SetSourceResolution(dpi)
+        return self.api.GetUTF8Text()
+
+
+class _PytesseractEngine:
+    """tesseract CLI; the grayscale samples are wrapped in a PIL image without re-encoding"""
+
+    name = "pytesseract"
+
+    def __init__(self, languages: str):
+        import pytesseract
+        if TESSERACT_CMD:
+            pytesseract.pytesseract.tesseract_cmd = TESSERACT_CMD
+        self.pytesseract = pytesseract
+        self.languages = languages
+        self.version = str(pytesseract.get_tesseract_version())
+
+    def recognize(self, samples: bytes, width: int, height: int, dpi: int) -> str:
+        from PIL import Image
+        image = Image.frombuffer("L", (width, height), samples, "raw", "L", 0, 1)
+        return self.pytesseract.image_to_string(image, lang=self.languages, config=f"--dpi {dpi}")
+
+
+def load_ocr_engine(engine: str = OCR_ENGINE, languages: str = OCR_LANGUAGES):
+    if engine in ("auto", "tesserocr"):
+        try:
+            return _TesserocrEngine(languages)
+        except ImportError:
+            if engine == "tesserocr":
+                raise
+    return _PytesseractEngine(languages)
+
+
+# ---------------------------------------------------------------------------- page extraction
+
+# Per-process state, so a pool worker opens each document and OCR engine once
+_worker_document = None
+_worker_engines: Dict[tuple, object] = {}
+_worker_cache = None
+
+
+def _open(path: str):
+    global _worker_document
+    stat = os.stat(path)
+    key = (path, stat.st_mtime_ns, stat.st_size)
+    if _worker_document is None or _worker_document[0] != key:
+        if _worker_document is not None:
+            _worker_document[1].close()
+        _worker_document = (key, fitz.open(path))
+    return _worker_document[1]
+
+
+def _engine(engine: str, languages: str):
+    key = (engine, languages)
+    if key not in _worker_engines:
+        _worker_engines[key] = load_ocr_engine(engine, languages)
+    return _worker_engines[key]
+
+
+def _cache() -> OcrCache:
+    # SQLite connections must not cross a fork, so each process opens its own
+    global _worker_cache
+    if _worker_cache is None or _worker_cache[0] != os.getpid():
+        _worker_cache = (os.getpid(), OcrCache())
+    return _worker_cache[1]
+
+
+def render_page(page, dpi: int = OCR_DPI):
+    """Grayscale pixmap of a page; .samples is the raw 8-bit buffer"""
+    return page.get_pixmap(dpi=dpi, colorspace=fitz.csGRAY, alpha=False)
+
+
+def _ocr_page(document, page_num: int, dpi: int, engine: str, languages: str, use_cache: bool) -> Dict:
+    start = time.perf_counter()
+    pix = render_page(document[page_num], dpi)
+    ocr = _engine(engine, languages)
+    key = None
+    if use_cache:
+        key = ocr_page_key(pix.samples, pix.width, pix.height, dpi, languages, ocr.name, ocr.version)
+        text = _cache().get(key)
+        if text is not None:
+            return {"page": page_num + 1, "text": text, "source": "cache", "seconds": time.perf_counter() - start}
+    text = ocr.recognize(pix.samples, pix.width, pix.height, dpi)
+    text = text.replace("-\n", "").strip()
+    if key is not None:
+        _cache().put(key, text)
+    return {"page": page_num + 1, "text": text, "source": "ocr", "seconds": time.perf_counter() - start}
+
+
+def _ocr_task(path: str, page_nums: Sequence[int], dpi: int, engine: str, languages: str,
+              use_cache: bool) -> List[Dict]:
     try:
-        pdf_document = fitz.open(PDF_file)
-        page_count = len(pdf_document)
-        print(f"Converting {page_count} pages...")
-        
-        with open(text_file, "w", encoding='utf-8') as output_file:
-            for page_num in range(page_count):
-                print(f"Processing page {page_num + 1}/{page_count}")
-                
-                page = pdf_document[page_num]
-                
-                mat = fitz.Matrix(2.0, 2.0)  
-                pix = page.get_pixmap(matrix=mat)
-                img_data = pix.tobytes("png")
-                
-                image = Image.open(io.BytesIO(img_data))
-                
-                # Run OCR
-                text = pytesseract.image_to_string(image)
-                text = text.replace("-\n", "")
-                
-                # Write to file
-                output_file.write(f"--- Page {page_num + 1} ---\n")
-                output_file.write(text + "\n\n")
-        
-        pdf_document.close()
-        
+        document = _open(path)
+        return [_ocr_page(document, n, dpi, engine, languages, use_cache) for n in page_nums]
     except Exception as e:
-        print(f"Error: {e}")
+        # Engine errors (e.g. TesseractNotFoundError) need not survive pickling;
+        # one that doesn't would break the whole pool, so send back a plain one
+        raise RuntimeError(f"OCR of pages {[n + 1 for n in page_nums]} failed: {type(e).__name__}: {e}") from None
+
+
+_pool = None
+_pool_workers = 0
+_pool_lock = threading.Lock()
+
+
+def _get_pool(workers: int) -> ProcessPoolExecutor:
+    global _pool, _pool_workers
+    with _pool_lock:
+        # A crashed worker leaves the pool broken for good; start a fresh one
+        if _pool is None or _pool_workers != workers or getattr(_pool, "_broken", False):
+            if _pool is not None:
+                _pool.shutdown(wait=False)
+            _pool = ProcessPoolExecutor(max_workers=workers)
+            _pool_workers = workers
+        return _pool
+
+
+def _drop_pool(pool: ProcessPoolExecutor):
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False)
+
+
+def extract_pages(source: PdfSource, workers: Optional[int] = None, dpi: int = OCR_DPI,
+                  engine: str = OCR_ENGINE, languages: str = OCR_LANGUAGES,
+                  force_ocr: bool = False, use_cache: bool = OCR_CACHE_ENABLED,
+                  progress: Optional[Callable[[int, int], None]] = None) -> List[Dict]:
+    """
+    Text of every page of a PDF (path or bytes), in page order; source is text,
+    ocr or cache. progress(pages_done, page_count) is called as pages finish.
+    """
+    workers = OCR_WORKERS if workers is None else max(1, workers)
+    tmp_path = None
+    if isinstance(source, (bytes, bytearray)):
+        # Workers open the file themselves; a temp file is cheaper than pickling the bytes per task
+        fd, tmp_path = tempfile.mkstemp(suffix=".pdf")
+        with os.fdopen(fd, "wb") as f:
+            f.write(source)
+        path = tmp_path
+    else:
+        path = str(source)
+
+    try:
+        pages, scanned = [], []
+        with fitz.open(path) as document:
+            page_count = len(document)
+            for n, page in enumerate(document):
+                start = time.perf_counter()
+                text = "" if force_ocr else page.get_text().strip()
+                if len(text) >= MIN_TEXT_CHARS:
+                    pages.append({"page": n + 1, "text": text, "source": "text",
+                                  "seconds": time.perf_counter() - start})
+                else:
+                    scanned.append(n)
+            if progress is not None:
+                progress(len(pages), page_count)
+            # Only scanned pages are worth shipping to the pool
+            if workers == 1 or len(scanned) <= 1:
+                for n in scanned:
+                    pages.append(_ocr_page(document, n, dpi, engine, languages, use_cache))
+                    if progress is not None:
+                        progress(len(pages), page_count)
+                scanned = []
+
+        if scanned:
+            tasks = [scanned[i:i + PAGES_PER_TASK] for i in range(0, len(scanned), PAGES_PER_TASK)]
+            pool = _get_pool(workers)
+            try:
+                futures = [pool.submit(_ocr_task, path, task, dpi, engine, languages, use_cache) for task in tasks]
+                for future in as_completed(futures):
+                    pages += future.result()
+                    if progress is not None:
+                        progress(len(pages), page_count)
+            except BrokenProcessPool as e:
+                # This document fails; the next one gets a new pool
+                _drop_pool(pool)
+                raise RuntimeError(f"OCR worker process died: {e}") from None
+    finally:
+        if tmp_path is not None:
+            os.remove(tmp_path)
+    return sorted(pages, key=lambda p: p["page"])
+
+
+def extract_text(source: PdfSource, **kwargs) -> str:
+    """Whole document as text, with the '--- Page n ---' separators"""
+    return "".join(f"--- Page {p['page']} ---\n{p['text']}\n\n" for p in extract_pages(source, **kwargs))
+
+
+# ---------------------------------------------------------------------------- CLI
+
+def _timed(paths: List[str], **kwargs):
+    start = time.perf_counter()
+    pages = []
+    for path in paths:
+        pages += extract_pages(path, **kwargs)
+    return pages, time.perf_counter() - start
+
+
+def benchmark(paths: List[str], workers_list: List[int], use_cache: bool = True, **kwargs):
+    """Cold pages/sec per worker count, then a re-run served from the OCR cache"""
+    runs = [(f"{workers} workers", dict(workers=workers, use_cache=False)) for workers in workers_list]
+    if use_cache:
+        _timed(paths, workers=workers_list[-1], use_cache=True, **kwargs)
+        runs.append(("cached", dict(workers=workers_list[-1], use_cache=True)))
+    print(f"{'run':<12}{'pages':>7}{'text':>7}{'ocr':>6}{'cache':>7}{'seconds':>10}{'pages/s':>10}")
+    for label, options in runs:
+        pages, elapsed = _timed(paths, **options, **kwargs)
+        counts = {source: sum(p["source"] == source for p in pages) for source in ("text", "ocr", "cache")}
+        print(f"{label:<12}{len(pages):>7}{counts['text']:>7}{counts['ocr']:>6}{counts['cache']:>7}"
+              f"{elapsed:>10.2f}{len(pages) / elapsed:>10.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Extract text from PDFs, OCR'ing scanned pages")
+    parser.add_argument("pdfs", nargs="*", help="PDF files (default: dataset/fir/*.pdf)")
+    parser.add_argument("--out", help="Write the text here instead of stdout (single PDF)")
+    parser.add_argument("--workers", type=int, default=OCR_WORKERS)
+    parser.add_argument("--dpi", type=int, default=OCR_DPI)
+    parser.add_argument("--lang", default=OCR_LANGUAGES, help="Tesseract language packs, e.g. eng+hin")
+    parser.add_argument("--engine", default=OCR_ENGINE, choices=["auto", "tesserocr", "pytesseract"])
+    parser.add_argument("--force-ocr", action="store_true", help="OCR every page, ignoring text layers")
+    parser.add_argument("--no-cache", action="store_true", help="Don't read or write the OCR cache")
+    parser.add_argument("--benchmark", action="store_true", help="Report pages/sec at 1 and --workers processes")
+    args = parser.parse_args()
+
+    paths = args.pdfs or sorted(glob.glob(os.path.join(FIR_DIR, "*.pdf")))
+    options = dict(dpi=args.dpi, engine=args.engine, languages=args.lang, force_ocr=args.force_ocr)
+    if args.benchmark:
+        benchmark(paths, sorted({1, args.workers}), use_cache=not args.no_cache, **options)
+        return
+    options["use_cache"] = not args.no_cache
+
+    for path in paths:
+        if not Path(path).exists():
+            print(f"Error: PDF file '{path}' not found!")
+            continue
+        text = extract_text(path, workers=args.workers, **options)
+        if args.out and len(paths) == 1:
+            with open(args.out, "w", encoding="utf-8") as output_file:
+                output_file.write(text)
+        else:
+            print(text)
+
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
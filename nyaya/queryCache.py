@@ -0,0 +1,84 @@
+# queryCache.py - in-process LRU caches for repeated queries
+#
+# Queries are keyed on a normalized form (Unicode NFKC, case folded,
+# punctuation and runs of whitespace collapsed), so "Punishment for theft?"
+# and "punishment  for theft" share one entry. Two caches are kept per search
+# system: the query vectors and the ranked retrieval result (row ids and
+# similarities). LLM explanations live in explanationCache.py.
+import os
+import re
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import Dict, Hashable, Optional
+
+QUERY_CACHE_SIZE = int(os.getenv("NYAYA_QUERY_CACHE_SIZE", "4096"))
+
+_PUNCTUATION = re.compile(r"[^\w\s]+")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def hit_stats(hits: int, misses: int) -> Dict:
+    """Counters plus hit rate, the common part of every cache's stats()"""
+    lookups = hits + misses
+    return {"hits": hits, "misses": misses, "hit_rate": hits / lookups if lookups else 0.0}
+
+
+def normalize_query(query: str) -> str:
+    """Cache key for a query: 'What is Section 303?' -> 'what is section 303'"""
+    query = unicodedata.normalize("NFKC", query).casefold()
+    query = _PUNCTUATION.sub(" ", query)
+    return _WHITESPACE.sub(" ", query).strip()
+
+
+class LRUCache:
+    """Thread-safe bounded mapping with hit/miss counters"""
+
+    def __init__(self, max_entries: int = QUERY_CACHE_SIZE):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Hashable, object]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[object]:
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: Hashable, value: object):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict:
+        return {"entries": len(self._entries), **hit_stats(self.hits, self.misses)}
+
+
+class QueryCache:
+    """Query vectors and ranked retrieval results, both keyed on the normalized query"""
+
+    def __init__(self, max_entries: int = QUERY_CACHE_SIZE):
+        self.embeddings = LRUCache(max_entries)
+        self.results = LRUCache(max_entries)
+
+    def clear(self):
+        self.embeddings.clear()
+        self.results.clear()
+
+    def stats(self) -> Dict:
+        return {"embeddings": self.embeddings.stats(), "results": self.results.stats()}
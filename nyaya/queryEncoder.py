@@ -0,0 +1,259 @@
+# queryEncoder.py - selectable sentence encoder backends
+#
+#   torch      sentence_transformers.SentenceTransformer (the original path)
+#   onnx       the model's ONNX export on onnxruntime + a fast tokenizer,
+#              no torch import at all
+#   onnx-int8  the same export, dynamically quantized to int8 once and kept
+#              in the cache directory
+#
+# All backends expose encode() with the SentenceTransformer arguments used in
+# this repo. Compare startup, RSS, latency and retrieval agreement with:
+#   python queryEncoder.py --backends torch onnx onnx-int8
+import os
+import re
+import sys
+import json
+import time
+import logging
+import argparse
+import subprocess
+import tempfile
+from typing import Dict, List, Sequence, Union
+
+import numpy as np
+
+from bnsDataset import CACHE_DIR
+from searchIndex import normalize
+
+logger = logging.getLogger(__name__)
+
+ENCODER_BACKEND = os.getenv("NYAYA_ENCODER_BACKEND", "torch")
+ENCODER_BACKENDS = ["torch", "onnx", "onnx-int8"]
+ONNX_DIR = os.path.join(CACHE_DIR, "onnx")
+ONNX_THREADS = int(os.getenv("NYAYA_ONNX_THREADS", "0"))  # 0 = onnxruntime default
+
+# Fixed query set for the benchmark's equivalence check
+BENCHMARK_QUERIES = [
+    "What is the punishment for murder?",
+    "someone is following a woman and watching her online",
+    "husband's family harassing wife for dowry and she died",
+    "culpable homicide not amounting to murder",
+    "causing death by negligence",
+    "abetment of a crime that was not committed",
+    "criminal conspiracy to commit an offence",
+    "kidnapping a child from lawful guardianship",
+    "outraging the modesty of a woman",
+    "voluntarily causing grievous hurt with a weapon",
+    "miscarriage caused without the woman's consent",
+    "selling a minor for prostitution",
+    "sexual harassment at the workplace",
+    "exposing and abandoning a child under twelve",
+    "attempt to commit suicide",
+    "acid attack on a person",
+    "cruelty by husband or relatives",
+    "rape of a woman under sixteen",
+    "wrongful restraint and confinement",
+    "hiding the birth of a child by secretly disposing of the body",
+]
+
+
+def _repo_id(model_name: str) -> str:
+    # Same shorthand as SentenceTransformer: bare names live under sentence-transformers/
+    return model_name if "/" in model_name or os.path.isdir(model_name) else f"sentence-transformers/{model_name}"
+
+
+def _model_file(model_name: str, filename: str) -> str:
+    if os.path.isdir(model_name):
+        return os.path.join(model_name, filename)
+    from huggingface_hub import hf_hub_download
+    return hf_hub_download(_repo_id(model_name), filename)
+
+
+class TorchEncoder:
+    """The SentenceTransformer model itself"""
+
+    def __init__(self, model_name: str):
+        from sentence_transformers import SentenceTransformer
+        self.model = SentenceTransformer(model_name)
+        self.cache_name = model_name
+
+    def encode(self, sentences: Union[str, Sequence[str]], batch_size: int = 32,
+               normalize_embeddings: bool = False, show_progress_bar: bool = False) -> np.ndarray:
+        return self.model.encode(sentences, batch_size=batch_size, normalize_embeddings=normalize_embeddings,
+                                 show_progress_bar=show_progress_bar)
+
+
+class OnnxEncoder:
+    """Mean-pooled transformer on onnxruntime, matching the SentenceTransformer output"""
+
+    def __init__(self, model_name: str, quantized: bool = False, onnx_dir: str = ONNX_DIR):
+        import onnxruntime
+        from tokenizers import Tokenizer
+
+        path = _model_file(model_name, "onnx/model.onnx")
+        if quantized:
+            path = self._quantized(model_name, path, onnx_dir)
+        # Embeddings from the int8 model differ slightly, so they get their own cache
+        self.cache_name = f"{model_name}-int8" if quantized else model_name
+
+        options = onnxruntime.SessionOptions()
+        options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if ONNX_THREADS:
+            options.intra_op_num_threads = ONNX_THREADS
+        self.session = onnxruntime.InferenceSession(path, options, providers=["CPUExecutionProvider"])
+        self.input_names = {i.name for i in self.session.get_inputs()}
+
+        try:
+            with open(_model_file(model_name, "sentence_bert_config.json"), encoding="utf-8") as f:
+                max_length = json.load(f).get("max_seq_length", 256)
+        except Exception:
+            max_length = 256
+        self.tokenizer = Tokenizer.from_file(_model_file(model_name, "tokenizer.json"))
+        self.tokenizer.enable_truncation(max_length=max_length)
+        self.tokenizer.enable_padding(pad_id=self.tokenizer.token_to_id("[PAD]") or 0)
+
+    @staticmethod
+    def _quantized(model_name: str, fp32_path: str, onnx_dir: str) -> str:
+        """Quantize the weights to int8 once (dynamic activation quantization at run time)"""
+        slug = re.sub(r"[^A-Za-z0-9_.-]+", "_", model_name)
+        int8_path = os.path.join(onnx_dir, f"{slug}-int8.onnx")
+        if not os.path.exists(int8_path):
+            from onnxruntime.quantization import QuantType, quantize_dynamic
+
+            os.makedirs(onnx_dir, exist_ok=True)
+            logger.info(f"Quantizing {fp32_path} to {int8_path}")
+            fd, tmp_path = tempfile.mkstemp(dir=onnx_dir, suffix=".onnx.tmp")
+            os.close(fd)
+            try:
+                quantize_dynamic(fp32_path, tmp_path, weight_type=QuantType.QInt8)
+                os.replace(tmp_path, int8_path)
+            finally:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+        return int8_path
+
+    def _encode_batch(self, texts: List[str]) -> np.ndarray:
+        encodings = self.tokenizer.encode_batch(texts)
+        inputs = {
+            "input_ids": np.array([e.ids for e in encodings], dtype=np.int64),
+            "attention_mask": np.array([e.attention_mask for e in encodings], dtype=np.int64),
+            "token_type_ids": np.array([e.type_ids for e in encodings], dtype=np.int64),
+        }
+        hidden = self.session.run(None, {k: v for k, v in inputs.items() if k in self.input_names})[0]
+        mask = inputs["attention_mask"][:, :, None].astype(np.float32)
+        return (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+
+    def encode(self, sentences: Union[str, Sequence[str]], batch_size: int = 32,
+               normalize_embeddings: bool = False, show_progress_bar: bool = False) -> np.ndarray:
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+        # Sort by length so each batch pads to a similar size, as SentenceTransformer does
+        order = np.argsort([-len(text) for text in texts], kind="stable")
+        batches = [self._encode_batch([texts[i] for i in order[start:start + batch_size]])
+                   for start in range(0, len(texts), batch_size)]
+        if not batches:
+            return np.empty((0, 0), dtype=np.float32)
+        embeddings = np.empty((len(texts), batches[0].shape[1]), dtype=np.float32)
+        embeddings[order] = np.concatenate(batches)
+        if normalize_embeddings:
+            embeddings = normalize(embeddings)
+        return embeddings[0] if single else embeddings
+
+
+def load_encoder(model_name: str, backend: str = ENCODER_BACKEND):
+    """Build the sentence encoder for a backend name"""
+    if backend == "torch":
+        return TorchEncoder(model_name)
+    if backend == "onnx":
+        return OnnxEncoder(model_name)
+    if backend == "onnx-int8":
+        return OnnxEncoder(model_name, quantized=True)
+    raise ValueError(f"Unknown encoder backend: {backend}")
+
+
+# ---------------------------------------------------------------------- benchmark
+
+def _peak_rss_mb() -> float:
+    # Unix only (the benchmark runs there); ru_maxrss is KiB on Linux, bytes on macOS
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _run_worker(model_name: str, backend: str, k: int) -> Dict:
+    """Measure one backend in this (fresh) process"""
+    from bnsDataset import load_corpus
+    from searchIndex import ExactIndex
+
+    start = time.perf_counter()
+    encoder = load_encoder(model_name, backend)
+    startup = time.perf_counter() - start
+
+    corpus = load_corpus()
+    start = time.perf_counter()
+    index = ExactIndex(encoder.encode(corpus.search_texts, normalize_embeddings=True), normalized=True)
+    corpus_seconds = time.perf_counter() - start
+
+    encoder.encode(BENCHMARK_QUERIES[0], normalize_embeddings=True)
+    latencies, rankings = [], []
+    for query in BENCHMARK_QUERIES:
+        start = time.perf_counter()
+        embedding = encoder.encode(query, normalize_embeddings=True)
+        latencies.append((time.perf_counter() - start) * 1000)
+        rankings.append([int(i) for i in index.search(embedding, k)[0]])
+
+    return {
+        "backend": backend,
+        "startup_s": startup,
+        "corpus_encode_s": corpus_seconds,
+        "query_ms_p50": float(np.percentile(latencies, 50)),
+        "query_ms_p95": float(np.percentile(latencies, 95)),
+        "peak_rss_mb": _peak_rss_mb(),
+        "rankings": rankings,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark sentence encoder backends")
+    parser.add_argument("--model", default=None, help="Model name (default: the search system's model)")
+    parser.add_argument("--backends", nargs="+", default=ENCODER_BACKENDS, choices=ENCODER_BACKENDS)
+    parser.add_argument("--k", type=int, default=3)
+    parser.add_argument("--worker", choices=ENCODER_BACKENDS, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    if args.model is None:
+        from nyayaFunction import MODEL_NAME
+        args.model = MODEL_NAME
+
+    if args.worker:
+        print(json.dumps(_run_worker(args.model, args.worker, args.k)))
+        return
+
+    # Each backend runs in its own process so startup and RSS are not shared
+    results = []
+    for backend in args.backends:
+        proc = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--worker", backend, "--model", args.model, "--k", str(args.k)],
+            capture_output=True, text=True
+        )
+        if proc.returncode != 0:
+            print(f"{backend}: failed\n{proc.stderr.strip()[-2000:]}")
+            continue
+        results.append(json.loads(proc.stdout.strip().splitlines()[-1]))
+    if not results:
+        return
+
+    baseline = results[0]
+    print(f"model {args.model}, {len(BENCHMARK_QUERIES)} queries, baseline {baseline['backend']}")
+    print(f"{'backend':<11}{'startup s':>10}{'rss MB':>9}{'p50 ms':>9}{'p95 ms':>9}{'top1 same':>11}{f'top{args.k} overlap':>14}")
+    for result in results:
+        pairs = list(zip(baseline["rankings"], result["rankings"]))
+        top1 = np.mean([a[:1] == b[:1] for a, b in pairs])
+        overlap = np.mean([len(set(a) & set(b)) / max(len(a), 1) for a, b in pairs])
+        print(f"{result['backend']:<11}{result['startup_s']:>10.2f}{result['peak_rss_mb']:>9.0f}"
+              f"{result['query_ms_p50']:>9.2f}{result['query_ms_p95']:>9.2f}{top1:>11.2f}{overlap:>14.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+# queryEval.py - translate-first vs multilingual query embedding
+#
+# Measures per-query latency and top-k section accuracy of both query paths:
+#   translate:    query -> translator -> English model -> index
+#   multilingual: query -> multilingual model -> index
+#                 (languages the model doesn't cover are still translated)
+# Queries are the section titles in each language, taken from the
+# pre-translated corpus (sectionTranslations.py) or translated live, or a
+# JSONL file of {"query": ..., "language": ..., "section": ...} lines.
+#   python queryEval.py --languages hindi marathi tamil --k 3
+#   python queryEval.py --queries my_queries.jsonl --json
+import json
+import time
+import logging
+import argparse
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from bnsDataset import FILE_PATH, load_corpus
+from embeddingCache import EmbeddingCache
+from searchIndex import build_index
+from queryEncoder import ENCODER_BACKEND, load_encoder
+from sectionTranslations import TARGET_LANGUAGES, TranslationStore
+from nyayaFunction import INDEX_BACKEND, INDEX_PARAMS, embedding_model_name, translates_query
+
+logger = logging.getLogger(__name__)
+
+QUERY_MODES = ["translate", "multilingual"]
+
+
+def load_queries(path: str) -> List[Dict]:
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def title_queries(corpus, languages: List[str], store: TranslationStore, translator) -> List[Dict]:
+    """One query per distinct section title and language"""
+    queries = []
+    seen = set()
+    titles = corpus.column('Title')
+    for row, title in enumerate(titles):
+        section = int(corpus.section_numbers[row])
+        if (section, title) in seen:
+            continue
+        seen.add((section, title))
+        for language in languages:
+            query = store.get(title, language) or translator.translate(title, "english", language)
+            if query and query != title:
+                queries.append({"query": query, "language": language, "section": section, "english": title})
+    return queries
+
+
+class Retriever:
+    """Encoder + vector index for one embedding model (no LLM client)"""
+
+    def __init__(self, corpus, model_name: str):
+        self.corpus = corpus
+        self.model_name = model_name
+        self.model = load_encoder(model_name, ENCODER_BACKEND)
+        embeddings = EmbeddingCache(self.model.cache_name).load_or_build(
+            corpus.source_hash,
+            lambda: corpus.search_texts,
+            lambda texts: self.model.encode(texts, show_progress_bar=True),
+            n_rows=len(corpus)
+        )
+        self.index = build_index(embeddings, INDEX_BACKEND, normalized=True,
+                                 params=INDEX_PARAMS.get(INDEX_BACKEND))
+
+    def top_sections(self, query: str, k: int) -> List[int]:
+        embedding = self.model.encode(query, normalize_embeddings=True)
+        indices, _ = self.index.search(embedding, k)
+        return [int(self.corpus.section_numbers[i]) for i in indices if i >= 0]
+
+
+def evaluate(queries: List[Dict], retriever: Retriever, query_mode: str, translator, k: int) -> Dict:
+    """Run every query through one path; latency includes the translation round trip"""
+    retriever.top_sections("warm up", k)
+
+    latencies, translate_times = [], []
+    top1, topk, translated = 0, 0, 0
+    per_language: Dict[str, List[int]] = {}
+    for item in queries:
+        start = time.perf_counter()
+        query = item["query"]
+        if translates_query(item["language"], query_mode):
+            query = translator.translate(query, item["language"], "english")
+            translated += 1
+            translate_times.append(time.perf_counter() - start)
+        sections = retriever.top_sections(query, k)
+        latencies.append(time.perf_counter() - start)
+
+        hit = item["section"] in sections
+        top1 += bool(sections) and sections[0] == item["section"]
+        topk += hit
+        counts = per_language.setdefault(item["language"], [0, 0])
+        counts[0] += hit
+        counts[1] += 1
+
+    latencies_ms = np.array(latencies) * 1000
+    n = max(len(queries), 1)
+    return {
+        "mode": query_mode,
+        "model": retriever.model_name,
+        "queries": len(queries),
+        "translated": translated,
+        "top1_accuracy": top1 / n,
+        f"top{k}_accuracy": topk / n,
+        "latency_ms_mean": float(latencies_ms.mean()) if len(latencies_ms) else 0.0,
+        "latency_ms_p50": float(np.percentile(latencies_ms, 50)) if len(latencies_ms) else 0.0,
+        "latency_ms_p95": float(np.percentile(latencies_ms, 95)) if len(latencies_ms) else 0.0,
+        "translate_ms_mean": float(np.mean(translate_times) * 1000) if translate_times else 0.0,
+        f"top{k}_by_language": {language: hits / total for language, (hits, total) in per_language.items()},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare translate-first and multilingual query embedding")
+    parser.add_argument("--dataset", default=FILE_PATH, help="Path to bnsdataset.xlsx")
+    parser.add_argument("--queries", help="JSONL file of {query, language, section}")
+    parser.add_argument("--languages", nargs="+", default=TARGET_LANGUAGES, choices=TARGET_LANGUAGES)
+    parser.add_argument("--modes", nargs="+", default=QUERY_MODES, choices=QUERY_MODES)
+    parser.add_argument("--k", type=int, default=3)
+    parser.add_argument("--limit", type=int, help="Evaluate at most this many queries")
+    parser.add_argument("--json", action="store_true", help="Print raw results as JSON")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+
+    from langTranslator import MinimalIndianTranslator
+
+    corpus = load_corpus(args.dataset)
+    translator = MinimalIndianTranslator()
+    if args.queries:
+        queries = load_queries(args.queries)
+    else:
+        queries = title_queries(corpus, args.languages, TranslationStore(), translator)
+    queries = queries[:args.limit] if args.limit else queries
+    print(f"{len(queries)} queries")
+
+    results = []
+    for mode in args.modes:
+        retriever = Retriever(corpus, embedding_model_name(mode))
+        results.append(evaluate(queries, retriever, mode, translator, args.k))
+
+    if args.json:
+        print(json.dumps(results, indent=2, ensure_ascii=False))
+        return
+    print(f"{'mode':<14}{'model':<40}{'top1':>7}{f'top{args.k}':>7}{'mean ms':>10}{'p95 ms':>10}{'translated':>12}")
+    for result in results:
+        print(f"{result['mode']:<14}{result['model']:<40}{result['top1_accuracy']:>7.3f}"
+              f"{result[f'top{args.k}_accuracy']:>7.3f}{result['latency_ms_mean']:>10.1f}"
+              f"{result['latency_ms_p95']:>10.1f}{result['translated']:>12}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+# reranker.py - optional cross-encoder re-ranking of retrieval candidates
+#
+# The bi-encoder (+ BM25) shortlist is re-scored by a small cross-encoder that
+# reads query and section together. Only the top candidates are scored, in
+# batches, and scoring stops once the latency budget is spent: unscored
+# candidates keep their retrieval order behind the scored ones.
+#
+# Backends: "onnx" runs a quantized ONNX export with onnxruntime (if both the
+# package and the export are available), "torch" uses sentence_transformers'
+# CrossEncoder; "auto" tries them in that order.
+import os
+import time
+import logging
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+RERANK_ENABLED = os.getenv("NYAYA_RERANK", "0") == "1"
+RERANK_MODEL = os.getenv("NYAYA_RERANK_MODEL", "cross-encoder/ms-marco-MiniLM-L-6-v2")
+RERANK_BACKEND = os.getenv("NYAYA_RERANK_BACKEND", "auto")
+RERANK_ONNX_FILE = os.getenv("NYAYA_RERANK_ONNX_FILE", "onnx/model_qint8_avx512.onnx")
+RERANK_CANDIDATES = int(os.getenv("NYAYA_RERANK_CANDIDATES", "10"))
+RERANK_BUDGET_MS = float(os.getenv("NYAYA_RERANK_BUDGET_MS", "60"))
+RERANK_BATCH_SIZE = 8
+RERANK_MAX_LENGTH = 256
+
+
+class _TorchCrossEncoder:
+    def __init__(self, model_name: str, max_length: int):
+        from sentence_transformers import CrossEncoder
+        self.model = CrossEncoder(model_name, max_length=max_length, device="cpu")
+
+    def score(self, pairs: List[Tuple[str, str]]) -> np.ndarray:
+        return np.asarray(self.model.predict(pairs, batch_size=len(pairs), show_progress_bar=False),
+                          dtype=np.float32).reshape(len(pairs))
+
+
+class _OnnxCrossEncoder:
+    def __init__(self, model_name: str, max_length: int, onnx_file: str = RERANK_ONNX_FILE):
+        import onnxruntime
+        from huggingface_hub import hf_hub_download
+        from transformers import AutoTokenizer
+
+        path = onnx_file if os.path.exists(onnx_file) else hf_hub_download(model_name, onnx_file)
+        options = onnxruntime.SessionOptions()
+        options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = onnxruntime.InferenceSession(path, options, providers=["CPUExecutionProvider"])
+        self.input_names = {i.name for i in self.session.get_inputs()}
+        self.tokenizer = AutoTokenizer.from_pretrained(model_name)
+        self.max_length = max_length
+
+    def score(self, pairs: List[Tuple[str, str]]) -> np.ndarray:
+        encoded = self.tokenizer([q for q, _ in pairs], [p for _, p in pairs], padding=True,
+                                 truncation=True, max_length=self.max_length, return_tensors="np")
+        feeds = {name: value.astype(np.int64) for name, value in encoded.items() if name in self.input_names}
+        logits = self.session.run(None, feeds)[0]
+        return np.asarray(logits, dtype=np.float32).reshape(len(pairs), -1)[:, 0]
+
+
+class CrossEncoderReranker:
+    """Budgeted, batched cross-encoder re-scoring of a candidate list"""
+
+    def __init__(self, model_name: str = RERANK_MODEL, backend: str = RERANK_BACKEND,
+                 budget_ms: float = RERANK_BUDGET_MS, batch_size: int = RERANK_BATCH_SIZE,
+                 max_length: int = RERANK_MAX_LENGTH):
+        self.model_name = model_name
+        self.budget_ms = budget_ms
+        self.batch_size = batch_size
+        self.metrics = {"queries": 0, "pairs_scored": 0, "budget_exhausted": 0}
+        # Running estimate of the cost of one pair, used to size the next batch
+        self._ms_per_pair: Optional[float] = None
+
+        self.backend, self.encoder = self._load(model_name, backend, max_length)
+        logger.info(f"Cross-encoder {model_name} loaded ({self.backend} backend)")
+
+    @staticmethod
+    def _load(model_name: str, backend: str, max_length: int):
+        if backend in ("auto", "onnx"):
+            try:
+                return "onnx", _OnnxCrossEncoder(model_name, max_length)
+            except Exception as e:
+                if backend == "onnx":
+                    raise
+                logger.info(f"ONNX cross-encoder unavailable ({e}), using torch")
+        if backend not in ("auto", "torch"):
+            raise ValueError(f"Unknown re-ranker backend: {backend}")
+        return "torch", _TorchCrossEncoder(model_name, max_length)
+
+    def rerank(self, query: str, candidates: Sequence[int],
+               passages: Sequence[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Reorder candidates (row ids, best first) by cross-encoder score.
+        Returns (row ids, scores); rows left unscored by the budget get -inf
+        and stay behind the scored ones in their original order.
+        """
+        self.metrics["queries"] += 1
+        candidates = np.asarray(candidates, dtype=np.int64)
+        scores = np.full(len(candidates), -np.inf, dtype=np.float32)
+        start = time.perf_counter()
+        done = 0
+        while done < len(candidates):
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            remaining_ms = self.budget_ms - elapsed_ms
+            batch = self.batch_size
+            if self._ms_per_pair:
+                batch = min(batch, int(remaining_ms / self._ms_per_pair))
+            # The first batch always runs, so a slow model still re-ranks the head
+            if done and batch <= 0:
+                self.metrics["budget_exhausted"] += 1
+                break
+            batch = max(batch, 1)
+            pairs = [(query, passages[i]) for i in range(done, min(done + batch, len(candidates)))]
+            batch_start = time.perf_counter()
+            scores[done:done + len(pairs)] = self.encoder.score(pairs)
+            cost = (time.perf_counter() - batch_start) * 1000 / len(pairs)
+            self._ms_per_pair = cost if self._ms_per_pair is None else 0.8 * self._ms_per_pair + 0.2 * cost
+            done += len(pairs)
+            self.metrics["pairs_scored"] += len(pairs)
+
+        order = np.argsort(-scores, kind="stable")
+        return candidates[order], scores[order]
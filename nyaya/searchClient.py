@@ -0,0 +1,108 @@
+# searchClient.py - client for searchService.py
+#
+# Mirrors the in-process modelRun api, so the Streamlit app can switch to a
+# remote search service by setting NYAYA_SEARCH_URL (e.g. http://127.0.0.1:8600).
+import os
+import json
+import logging
+from typing import Dict, Iterator, List, Optional, Union
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+SEARCH_SERVICE_URL = os.environ.get("NYAYA_SEARCH_URL")
+SEARCH_TIMEOUT = float(os.environ.get("NYAYA_SEARCH_TIMEOUT", "60"))
+
+
+class RemoteSearchClient:
+    """Keeps one pooled HTTP session to the search service"""
+
+    def __init__(self, base_url: str = SEARCH_SERVICE_URL, timeout: float = SEARCH_TIMEOUT):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.session = requests.Session()
+
+    def _error(self, e: Exception) -> Dict:
+        logger.error(f"Search service request failed: {e}")
+        return {"status": "error", "message": f"Search service unavailable: {e}"}
+
+    def _post(self, path: str, payload: Dict, **kwargs) -> requests.Response:
+        response = self.session.post(f"{self.base_url}{path}", json=payload, timeout=self.timeout, **kwargs)
+        response.raise_for_status()
+        return response
+
+    def search(self, query: str, include_alternatives: bool = False,
+               similarity_threshold: Optional[float] = None, explain: bool = True) -> Dict:
+        payload = {"query": query, "include_alternatives": include_alternatives, "explain": explain}
+        if similarity_threshold is not None:
+            payload["similarity_threshold"] = similarity_threshold
+        try:
+            return self._post("/search", payload).json()
+        except requests.RequestException as e:
+            return self._error(e)
+
+    def search_stream(self, query: str, include_alternatives: bool = False,
+                      similarity_threshold: Optional[float] = None) -> Iterator[Union[Dict, str]]:
+        """Same shape as modelRun_stream: the response dict first, then explanation tokens"""
+        payload = {"query": query, "include_alternatives": include_alternatives}
+        if similarity_threshold is not None:
+            payload["similarity_threshold"] = similarity_threshold
+        try:
+            response = self._post("/search/stream", payload, stream=True)
+        except requests.RequestException as e:
+            yield self._error(e)
+            return
+        with response:
+            result = None
+            tokens = []
+            for line in response.iter_lines(decode_unicode=True):
+                if not line:
+                    continue
+                item = json.loads(line)
+                if "response" in item:
+                    result = item["response"]
+                    yield result
+                elif "error" in item:
+                    # The service failed after the stream had started
+                    logger.error(f"Search service stream failed: {item['error']}")
+                    if result is None:
+                        yield {"status": "error", "message": f"Search service error: {item['error']}"}
+                    break
+                else:
+                    tokens.append(item["token"])
+                    yield item["token"]
+            # Like the local stream, the dict ends up carrying the full explanation
+            if isinstance(result, dict) and result.pop("explanation_pending", False):
+                result["explanation"] = "".join(tokens).strip()
+
+    def search_batch(self, queries: List[str], include_alternatives: bool = False,
+                     similarity_threshold: Optional[float] = None, explain: bool = False) -> List[Dict]:
+        payload = {"queries": queries, "include_alternatives": include_alternatives, "explain": explain}
+        if similarity_threshold is not None:
+            payload["similarity_threshold"] = similarity_threshold
+        try:
+            return self._post("/search/batch", payload).json()["results"]
+        except requests.RequestException as e:
+            return [self._error(e) for _ in queries]
+
+    def map_document(self, pages: List[str], max_sections: Optional[int] = None) -> Dict:
+        """BNS sections for a whole document (one text per page), see firMapping.map_document"""
+        payload = {"pages": pages}
+        if max_sections is not None:
+            payload["max_sections"] = max_sections
+        return self._post("/documents/map", payload).json()
+
+    def section(self, section: int, subsection: Optional[int] = None) -> Optional[Dict]:
+        path = f"/sections/{section}" + (f"/{subsection}" if subsection is not None else "")
+        response = self.session.get(f"{self.base_url}{path}", timeout=self.timeout)
+        if response.status_code == 404:
+            return None
+        response.raise_for_status()
+        return response.json()
+
+    def health(self) -> Dict:
+        return self.session.get(f"{self.base_url}/health", timeout=self.timeout).json()
+
+    def metrics(self) -> Dict:
+        return self.session.get(f"{self.base_url}/metrics", timeout=self.timeout).json()
@@ -0,0 +1,180 @@
+# searchIndex.py - vector index backends for BNSSearchSystem
+#
+# Both backends expect L2-normalized float32 vectors, so cosine similarity is
+# a plain dot product. Pick one with build_index(vectors, backend=...).
+import logging
+from typing import Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Below this many vectors an exact scan is already fast and clustering only
+# costs recall, so an "ivf" request builds an ExactIndex instead
+IVF_MIN_ROWS = 5000
+
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    """L2-normalize rows (or a single vector) as float32"""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def _top_k(scores: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Positions and values of the k largest scores, best first"""
+    k = min(k, len(scores))
+    if k <= 0:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+    if k < len(scores):
+        part = np.argpartition(scores, -k)[-k:]
+    else:
+        part = np.arange(len(scores))
+    order = part[np.argsort(scores[part])[::-1]]
+    return order, scores[order]
+
+
+def _top_k_rows(scores: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Row-wise top-k of a (n_queries, n_vectors) score matrix, best first.
+    Always (n_queries, k); with fewer than k vectors the tail is -1 / -inf.
+    """
+    k = max(k, 0)
+    indices = np.full((scores.shape[0], k), -1, dtype=np.int64)
+    values = np.full((scores.shape[0], k), -np.inf, dtype=np.float32)
+    found = min(k, scores.shape[1])
+    if found == 0:
+        return indices, values
+    if found < scores.shape[1]:
+        part = np.argpartition(scores, -found, axis=1)[:, -found:]
+    else:
+        part = np.tile(np.arange(scores.shape[1]), (scores.shape[0], 1))
+    part_scores = np.take_along_axis(scores, part, axis=1)
+    order = np.argsort(part_scores, axis=1)[:, ::-1]
+    indices[:, :found] = np.take_along_axis(part, order, axis=1)
+    values[:, :found] = np.take_along_axis(part_scores, order, axis=1)
+    return indices, values
+
+
+class ExactIndex:
+    """Brute-force inner product over all vectors"""
+
+    def __init__(self, vectors: np.ndarray, normalized: bool = False):
+        # A pre-normalized float32 matrix (e.g. a memmap) is used without copying
+        if normalized and vectors.dtype == np.float32:
+            self.vectors = vectors
+        else:
+            self.vectors = normalize(vectors)
+
+    def __len__(self) -> int:
+        return self.vectors.shape[0]
+
+    def search(self, query: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        scores = self.vectors @ normalize(query)
+        return _top_k(scores, k)
+
+    def search_batch(self, queries: np.ndarray, k: int,
+                     chunk: int = 1024) -> Tuple[np.ndarray, np.ndarray]:
+        """Score queries with one matrix product per chunk; returns (n_queries, k) arrays"""
+        queries = normalize(queries)
+        if len(queries) <= chunk:
+            return _top_k_rows(queries @ self.vectors.T, k)
+        parts = [_top_k_rows(queries[start:start + chunk] @ self.vectors.T, k)
+                 for start in range(0, len(queries), chunk)]
+        return np.concatenate([p[0] for p in parts]), np.concatenate([p[1] for p in parts])
+
+
+class IVFIndex:
+    """
+    Inverted-file index: vectors are clustered with spherical k-means and a
+    query is only scored against the n_probe closest clusters. Raising n_probe
+    trades latency for recall; n_probe == n_lists is an exact search.
+    """
+
+    def __init__(self, vectors: np.ndarray, normalized: bool = False, n_lists: int = 256,
+                 n_probe: int = 8, train_size: int = 50000, n_iter: int = 10, seed: int = 0):
+        self.vectors = vectors if normalized and vectors.dtype == np.float32 else normalize(vectors)
+        n = self.vectors.shape[0]
+        # ~sqrt(n) lists keeps clusters populated (n_lists close to n leaves them empty or singletons)
+        self.n_lists = max(1, min(n_lists, int(np.sqrt(n)), train_size))
+        self.n_probe = max(1, min(n_probe, self.n_lists))
+
+        rng = np.random.default_rng(seed)
+        train = self.vectors
+        if n > train_size:
+            train = self.vectors[np.sort(rng.choice(n, train_size, replace=False))]
+        self.centroids = self._kmeans(np.asarray(train), n_iter, rng)
+
+        assignments = self._assign(self.vectors)
+        self.list_rows = np.argsort(assignments, kind='stable')
+        self.list_offsets = np.zeros(self.n_lists + 1, dtype=np.int64)
+        self.list_offsets[1:] = np.cumsum(np.bincount(assignments, minlength=self.n_lists))
+        logger.info(f"Built IVF index: {n} vectors in {self.n_lists} lists, n_probe={self.n_probe}")
+
+    def __len__(self) -> int:
+        return self.vectors.shape[0]
+
+    def _assign(self, vectors: np.ndarray, chunk: int = 65536) -> np.ndarray:
+        """Nearest centroid for each vector, in chunks to bound memory"""
+        out = np.empty(vectors.shape[0], dtype=np.int64)
+        for start in range(0, vectors.shape[0], chunk):
+            block = np.asarray(vectors[start:start + chunk])
+            out[start:start + chunk] = np.argmax(block @ self.centroids.T, axis=1)
+        return out
+
+    def _kmeans(self, train: np.ndarray, n_iter: int, rng) -> np.ndarray:
+        centroids = train[rng.choice(train.shape[0], self.n_lists, replace=False)].copy()
+        for _ in range(n_iter):
+            self.centroids = centroids
+            labels = self._assign(train)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, labels, train)
+            counts = np.bincount(labels, minlength=self.n_lists)
+            empty = counts == 0
+            # Re-seed empty clusters with random training points
+            sums[empty] = train[rng.choice(train.shape[0], int(empty.sum()))]
+            centroids = normalize(sums)
+        return centroids
+
+    def search(self, query: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        query = normalize(query)
+        probes, _ = _top_k(self.centroids @ query, self.n_probe)
+        candidates = np.concatenate([
+            self.list_rows[self.list_offsets[p]:self.list_offsets[p + 1]] for p in probes
+        ])
+        if len(candidates) == 0:
+            return _top_k(np.empty(0, dtype=np.float32), k)
+        positions, scores = _top_k(np.asarray(self.vectors[candidates]) @ query, k)
+        return candidates[positions], scores
+
+    def search_batch(self, queries: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Probe lists per query; rows with fewer than k candidates are padded with -1"""
+        queries = normalize(queries)
+        k = max(k, 0)
+        indices = np.full((len(queries), k), -1, dtype=np.int64)
+        scores = np.full((len(queries), k), -np.inf, dtype=np.float32)
+        for row, query in enumerate(queries):
+            found, found_scores = self.search(query, k)
+            indices[row, :len(found)] = found
+            scores[row, :len(found)] = found_scores
+        return indices, scores
+
+
+INDEX_BACKENDS = {
+    "exact": ExactIndex,
+    "ivf": IVFIndex,
+}
+
+
+def build_index(vectors: np.ndarray, backend: str = "exact", normalized: bool = False,
+                params: Optional[dict] = None):
+    """Create the configured index backend over the corpus vectors"""
+    try:
+        index_cls = INDEX_BACKENDS[backend]
+    except KeyError:
+        raise ValueError(f"Unknown index backend '{backend}'. Choose from: {sorted(INDEX_BACKENDS)}")
+    if index_cls is IVFIndex and vectors.shape[0] < IVF_MIN_ROWS:
+        logger.info(f"{vectors.shape[0]} vectors is below IVF_MIN_ROWS={IVF_MIN_ROWS}; using the exact index")
+        return ExactIndex(vectors, normalized=normalized)
+    return index_cls(vectors, normalized=normalized, **(params or {}))
@@ -0,0 +1,398 @@
+# searchService.py - HTTP api around BNSSearchSystem
+#
+# Routes (JSON in, JSON out):
+#   GET  /health
+#   GET  /metrics
+#   POST /search           QueryRequest
+#   POST /search/stream    QueryRequest -> NDJSON: {"response": ...} then {"token": ...} lines
+#   POST /search/batch     BatchQueryRequest
+#   GET  /sections/<n>     section (first row) and its subsections
+#   GET  /sections/<n>/<subsection>
+#   POST /documents/map    DocumentMapRequest -> BNS sections with evidence (firMapping.py)
+#
+# The parent process builds the search system once and forks the workers, so
+# the model weights are shared copy-on-write and the corpus and embeddings
+# (memory-mapped .npy files) are shared through the page cache. Each worker
+# runs its own asyncio loop on the inherited listening socket.
+#   python searchService.py --port 8600 --workers 4
+import os
+import sys
+import json
+import time
+import socket
+import signal
+import asyncio
+import logging
+import argparse
+import subprocess
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from pydantic import BaseModel, ValidationError
+
+from bnsDataset import FILE_PATH
+from nyayaFunction import BNSSearchSystem, QueryRequest, BatchQueryRequest, get_api_key
+from firMapping import DocumentMapRequest, map_document
+from queryEncoder import ENCODER_BACKEND
+
+logger = logging.getLogger(__name__)
+
+SERVICE_HOST = os.getenv("NYAYA_SEARCH_HOST", "127.0.0.1")
+SERVICE_PORT = int(os.getenv("NYAYA_SEARCH_PORT", "8600"))
+SERVICE_WORKERS = int(os.getenv("NYAYA_SEARCH_WORKERS", "2"))
+WORKER_THREADS = int(os.getenv("NYAYA_SEARCH_THREADS", "4"))
+KEEPALIVE_TIMEOUT = 75.0
+MAX_BODY_BYTES = 1 << 20
+MAX_BATCH_SIZE = 256
+
+REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+           413: "Payload Too Large", 422: "Unprocessable Entity", 500: "Internal Server Error"}
+LATENCY_BUCKETS_MS = [5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000]
+ROUTES = ["health", "metrics", "search", "search_stream", "search_batch", "sections", "map_document", "not_found"]
+
+
+class HTTPError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+class SharedCounters:
+    """Counters in shared memory, created before fork and summed over all workers"""
+
+    def __init__(self):
+        self.names = ["requests", "errors", "in_flight"]
+        for route in ROUTES:
+            self.names += [f"{route}.requests", f"{route}.errors", f"{route}.latency_ms_total"]
+        self.names += [f"latency_ms_le_{bucket}" for bucket in LATENCY_BUCKETS_MS] + ["latency_ms_le_inf"]
+        self._slots = {name: i for i, name in enumerate(self.names)}
+        self._values = multiprocessing.Array("d", len(self.names))
+
+    def add(self, name: str, value: float = 1.0):
+        with self._values.get_lock():
+            self._values[self._slots[name]] += value
+
+    def observe(self, route: str, latency_ms: float, error: bool):
+        with self._values.get_lock():
+            for name, value in ((f"{route}.requests", 1), ("requests", 1),
+                                (f"{route}.latency_ms_total", latency_ms)):
+                self._values[self._slots[name]] += value
+            if error:
+                self._values[self._slots[f"{route}.errors"]] += 1
+                self._values[self._slots["errors"]] += 1
+            bucket = next((b for b in LATENCY_BUCKETS_MS if latency_ms <= b), "inf")
+            self._values[self._slots[f"latency_ms_le_{bucket}"]] += 1
+
+    def snapshot(self) -> Dict[str, float]:
+        with self._values.get_lock():
+            return {name: self._values[i] for name, i in self._slots.items()}
+
+
+class SearchService:
+    """Routes requests to a BNSSearchSystem; blocking work runs on a thread pool"""
+
+    def __init__(self, system: BNSSearchSystem, counters: SharedCounters, threads: int = WORKER_THREADS):
+        self.system = system
+        self.counters = counters
+        self.executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="search")
+        self.started = time.time()
+
+    # ------------------------------------------------------------------ routing
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                request = await self._read_request(reader, writer)
+                if request is None:
+                    return
+                method, path, headers, body = request
+                keep_alive = headers.get("connection", "").lower() != "close"
+                await self._dispatch(writer, method, path, body, keep_alive)
+                if not keep_alive:
+                    return
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.TimeoutError):
+            pass
+        except asyncio.CancelledError:
+            # Worker shutting down with idle keep-alive connections
+            pass
+        finally:
+            writer.close()
+
+    async def _read_request(self, reader, writer) -> Optional[Tuple[str, str, Dict[str, str], bytes]]:
+        request_line = await asyncio.wait_for(reader.readline(), KEEPALIVE_TIMEOUT)
+        if not request_line:
+            return None
+        try:
+            method, path, _ = request_line.decode("latin-1").split(" ", 2)
+        except ValueError:
+            await self._send_json(writer, 400, {"error": "malformed request line"}, keep_alive=False)
+            return None
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+        try:
+            length = int(headers.get("content-length", "0") or 0)
+        except ValueError:
+            length = -1
+        if length < 0:
+            await self._send_json(writer, 400, {"error": "invalid Content-Length"}, keep_alive=False)
+            return None
+        if length > MAX_BODY_BYTES:
+            await self._send_json(writer, 413, {"error": "request body too large"}, keep_alive=False)
+            return None
+        body = await reader.readexactly(length) if length else b""
+        return method, path.split("?", 1)[0], headers, body
+
+    async def _dispatch(self, writer, method: str, path: str, body: bytes, keep_alive: bool):
+        route = "not_found"
+        start = time.perf_counter()
+        status = 500
+        self.counters.add("in_flight")
+        try:
+            parts = [part for part in path.split("/") if part]
+            if parts == ["health"]:
+                route = "health"
+                self._require(method, "GET")
+                status = await self._send_json(writer, 200, self._health(), keep_alive)
+            elif parts == ["metrics"]:
+                route = "metrics"
+                self._require(method, "GET")
+                status = await self._send_json(writer, 200, self._metrics(), keep_alive)
+            elif parts == ["search"]:
+                route = "search"
+                self._require(method, "POST")
+                request = self._parse(QueryRequest, body)
+                response = await self._run(self.system.search, request.query, request.include_alternatives,
+                                           request.similarity_threshold, request.explain)
+                status = await self._send_json(writer, 200, response, keep_alive)
+            elif parts == ["search", "stream"]:
+                route = "search_stream"
+                self._require(method, "POST")
+                request = self._parse(QueryRequest, body)
+                stream = self.system.search_stream(request.query, request.include_alternatives,
+                                                   request.similarity_threshold)
+                status = await self._send_stream(writer, stream, keep_alive)
+            elif parts == ["search", "batch"]:
+                route = "search_batch"
+                self._require(method, "POST")
+                request = self._parse(BatchQueryRequest, body)
+                if len(request.queries) > MAX_BATCH_SIZE:
+                    raise HTTPError(413, f"at most {MAX_BATCH_SIZE} queries per batch")
+                results = await self._run(self.system.search_batch, request.queries, request.include_alternatives,
+                                          request.similarity_threshold, request.explain)
+                status = await self._send_json(writer, 200, {"results": results}, keep_alive)
+            elif len(parts) in (2, 3) and parts[0] == "sections":
+                route = "sections"
+                self._require(method, "GET")
+                status = await self._send_json(writer, 200, self._section(parts[1:]), keep_alive)
+            elif parts == ["documents", "map"]:
+                route = "map_document"
+                self._require(method, "POST")
+                request = self._parse(DocumentMapRequest, body)
+                if request.pages is not None:
+                    source = [{"page": n + 1, "text": text} for n, text in enumerate(request.pages)]
+                elif request.text is not None:
+                    source = request.text
+                else:
+                    raise HTTPError(422, "pass text or pages")
+                mapping = await self._run(map_document, self.system, source, request.max_sections)
+                status = await self._send_json(writer, 200, mapping, keep_alive)
+            else:
+                raise HTTPError(404, f"no route for {path}")
+        except HTTPError as e:
+            status = await self._send_json(writer, e.status, {"error": str(e)}, keep_alive)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            raise
+        except Exception as e:
+            logger.exception(f"Error handling {method} {path}")
+            status = await self._send_json(writer, 500, {"error": f"internal error: {e}"}, keep_alive)
+        finally:
+            self.counters.add("in_flight", -1)
+            self.counters.observe(route, (time.perf_counter() - start) * 1000, status >= 400)
+
+    @staticmethod
+    def _require(method: str, expected: str):
+        if method != expected:
+            raise HTTPError(405, f"use {expected}")
+
+    @staticmethod
+    def _parse(model, body: bytes) -> BaseModel:
+        try:
+            return model(**json.loads(body or b"{}"))
+        except json.JSONDecodeError as e:
+            raise HTTPError(400, f"invalid JSON: {e}")
+        except (ValidationError, TypeError) as e:
+            raise HTTPError(422, str(e))
+
+    async def _run(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.executor, fn, *args)
+
+    # ------------------------------------------------------------------ handlers
+
+    def _health(self) -> Dict:
+        return {"status": "ok", "worker": os.getpid(), "rows": len(self.system.dataset),
+                "uptime_s": round(time.time() - self.started, 1)}
+
+    def _metrics(self) -> Dict:
+        worker = {"pid": os.getpid(), "caches": self.system.cache_stats()}
+        if self.system.client is not None:
+            worker["llm"] = dict(self.system.client.metrics)
+        return {"service": self.counters.snapshot(), "worker": worker}
+
+    def _section(self, parts: List[str]) -> Dict:
+        try:
+            section = int(parts[0])
+            subsection = int(parts[1]) if len(parts) > 1 else None
+        except ValueError:
+            raise HTTPError(400, "section and subsection must be integers")
+        row = self.system._search_by_section_number(section, subsection)
+        if row is None:
+            raise HTTPError(404, f"section {section} not found")
+        response = self.system._format_response(row, "Exact Section Match", explain=False)
+        response["subsections"] = self.system.list_subsections(section)
+        return response
+
+    # ------------------------------------------------------------------ responses
+
+    async def _send_json(self, writer, status: int, body, keep_alive: bool = True) -> int:
+        data = json.dumps(body, ensure_ascii=False, default=str).encode("utf-8")
+        head = [f"HTTP/1.1 {status} {REASONS.get(status, 'Error')}", "Content-Type: application/json",
+                f"Content-Length: {len(data)}", f"Connection: {'keep-alive' if keep_alive else 'close'}"]
+        writer.write(("\r\n".join(head) + "\r\n\r\n").encode("latin-1") + data)
+        await writer.drain()
+        return status
+
+    async def _send_stream(self, writer, stream: Iterator, keep_alive: bool) -> int:
+        """
+        NDJSON over chunked encoding; the generator is advanced on the thread pool.
+        The 200 header is already out when the generator fails, so the error is
+        sent as a final {"error": ...} line and the body is still terminated.
+        """
+        writer.write(("HTTP/1.1 200 OK\r\nContent-Type: application/x-ndjson\r\nTransfer-Encoding: chunked\r\n"
+                      f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n").encode("latin-1"))
+        done = object()
+        first = True
+        status = 200
+        while True:
+            try:
+                item = await self._run(next, stream, done)
+            except Exception as e:
+                logger.exception("Error while streaming a search response")
+                item, status = done, 500
+                self._write_chunk(writer, {"error": f"internal error: {e}"})
+            if item is done:
+                break
+            self._write_chunk(writer, {"response": item} if first else {"token": item})
+            first = False
+            await writer.drain()
+        writer.write(b"0\r\n\r\n")
+        await writer.drain()
+        return status
+
+    @staticmethod
+    def _write_chunk(writer, line: Dict):
+        data = (json.dumps(line, ensure_ascii=False, default=str) + "\n").encode("utf-8")
+        writer.write(f"{len(data):x}\r\n".encode("latin-1") + data + b"\r\n")
+
+
+# ---------------------------------------------------------------------- processes
+
+def _serve(sock: socket.socket, system: BNSSearchSystem, counters: SharedCounters, threads: int):
+    """Worker main: one asyncio loop accepting on the shared socket"""
+    system.reopen_process_resources()
+    service = SearchService(system, counters, threads)
+
+    async def run():
+        server = await asyncio.start_server(service.handle, sock=sock)
+        loop = asyncio.get_running_loop()
+        stop = asyncio.Event()
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            loop.add_signal_handler(signum, stop.set)
+        async with server:
+            await stop.wait()
+
+    asyncio.run(run())
+
+
+def serve(host: str = SERVICE_HOST, port: int = SERVICE_PORT, workers: int = SERVICE_WORKERS,
+          threads: int = WORKER_THREADS):
+    """Build the search system once, then pre-fork workers that share it"""
+    sock = socket.create_server((host, port), backlog=1024)
+    sock.setblocking(False)
+    if workers > 1 and ENCODER_BACKEND == "torch":
+        # torch's thread pool does not survive fork, so the parent must never run
+        # the encoder: build a stale embedding cache in a separate process first
+        subprocess.run([sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), "embeddingCache.py")],
+                       check=True)
+    system = BNSSearchSystem(FILE_PATH, get_api_key())
+    counters = SharedCounters()
+    logger.info(f"Search service listening on http://{host}:{port} with {workers} workers")
+
+    if workers <= 1 or not hasattr(os, "fork"):
+        _serve(sock, system, counters, threads)
+        return
+
+    children = set()
+
+    def spawn():
+        pid = os.fork()
+        if pid == 0:
+            code = 0
+            try:
+                _serve(sock, system, counters, threads)
+            except BaseException:
+                logger.exception("Worker crashed")
+                code = 1
+            finally:
+                os._exit(code)
+        children.add(pid)
+
+    for _ in range(workers):
+        spawn()
+
+    stopping = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    # Supervise: replace workers that die until asked to stop
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        except InterruptedError:
+            continue
+        children.discard(pid)
+        if not stopping:
+            logger.warning(f"Worker {pid} exited with status {status}, restarting")
+            spawn()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve BNS search over HTTP")
+    parser.add_argument("--host", default=SERVICE_HOST)
+    parser.add_argument("--port", type=int, default=SERVICE_PORT)
+    parser.add_argument("--workers", type=int, default=SERVICE_WORKERS, help="Pre-forked worker processes")
+    parser.add_argument("--threads", type=int, default=WORKER_THREADS, help="Search threads per worker")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    serve(args.host, args.port, args.workers, args.threads)
+
+
+if __name__ == "__main__":
+    main()
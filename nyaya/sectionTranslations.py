@@ -0,0 +1,238 @@
+# sectionTranslations.py - offline translations of the BNS corpus
+#
+# The section fields, cached LLM explanations and the fixed labels of the
+# answer card are a finite set of English strings, so they are translated
+# ahead of time into every supported language and stored next to the dataset
+# (one JSON file per language, keyed by the hash of the English text).
+# At query time those parts are lookups; only unseen text is translated live.
+#   python sectionTranslations.py                      # all languages
+#   python sectionTranslations.py --languages hindi tamil --skip-explanations
+import os
+import json
+import hashlib
+import logging
+import argparse
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional
+
+from bnsDataset import PROJECT_ROOT, FILE_PATH, load_corpus
+from queryCache import hit_stats
+
+logger = logging.getLogger(__name__)
+
+TRANSLATIONS_DIR = os.environ.get("NYAYA_TRANSLATIONS_DIR", os.path.join(PROJECT_ROOT, "dataset", "translations"))
+TRANSLATIONS_FORMAT_VERSION = 1
+
+# Every language offered by client.py except English
+TARGET_LANGUAGES = [
+    "hindi", "tamil", "telugu", "bengali", "gujarati", "kannada",
+    "malayalam", "marathi", "punjabi", "urdu"
+]
+
+# Section fields that appear in an answer
+STATIC_FIELDS = ['Title', 'Content', 'Explanation', 'Punishment', 'Cross_References']
+
+# Fixed strings of the answer card in client.py
+UI_STRINGS = [
+    "Legal Information", "Section", "Subsection", "Detailed Explanation", "Punishment",
+    "Cross References", "Source: Bharatiya Nyaya Sanhita (BNS)",
+    "No explanation available.", "No punishment specified.", "None specified."
+]
+
+
+def text_key(text: str) -> str:
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+def _useful(text) -> bool:
+    text = str(text).strip()
+    return bool(text) and text.lower() != "nan"
+
+
+class TranslationStore:
+    """Per-language {sha1(english): translation} maps, loaded lazily from disk"""
+
+    def __init__(self, directory: str = TRANSLATIONS_DIR):
+        self.directory = directory
+        self.hits = 0
+        self.misses = 0
+        self._languages: Dict[str, Dict[str, str]] = {}
+        self._lock = threading.Lock()
+
+    def _path(self, language: str) -> str:
+        return os.path.join(self.directory, f"{language}.json")
+
+    def _load(self, language: str) -> Dict[str, str]:
+        language = language.lower()
+        with self._lock:
+            texts = self._languages.get(language)
+            if texts is None:
+                texts = {}
+                try:
+                    with open(self._path(language), encoding="utf-8") as f:
+                        data = json.load(f)
+                    if data.get("format") == TRANSLATIONS_FORMAT_VERSION:
+                        texts = data.get("texts", {})
+                except FileNotFoundError:
+                    pass
+                except (OSError, ValueError) as e:
+                    logger.warning(f"Ignoring unreadable translations for {language}: {e}")
+                self._languages[language] = texts
+            return texts
+
+    def get(self, text: str, language: str) -> Optional[str]:
+        translated = self._load(language).get(text_key(text))
+        if translated is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return translated
+
+    def put(self, text: str, language: str, translated: str):
+        texts = self._load(language)
+        with self._lock:
+            texts[text_key(text)] = translated
+
+    def save(self, language: str, dataset_hash: str = None):
+        """Write one language atomically"""
+        texts = self._load(language)
+        os.makedirs(self.directory, exist_ok=True)
+        with self._lock:
+            payload = {
+                "format": TRANSLATIONS_FORMAT_VERSION,
+                "language": language.lower(),
+                "dataset_hash": dataset_hash,
+                "texts": dict(texts),
+            }
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(payload, f, ensure_ascii=False, indent=1, sort_keys=True)
+            os.chmod(tmp_path, 0o644)
+            os.replace(tmp_path, self._path(language))
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    def stats(self) -> Dict:
+        return {
+            "languages": {language: len(texts) for language, texts in self._languages.items()},
+            **hit_stats(self.hits, self.misses),
+        }
+
+
+# Shared by every session in the process
+SHARED_TRANSLATION_STORE = TranslationStore()
+
+
+class PretranslatedTranslator:
+    """Serves English -> X from the offline store and falls back to live translation"""
+
+    def __init__(self, translator, store: TranslationStore = SHARED_TRANSLATION_STORE):
+        self.translator = translator
+        self.store = store
+
+    def __getattr__(self, name):
+        return getattr(self.translator, name)
+
+    def pretranslated(self, text, source_lang, target_lang):
+        """The stored translation, or None when only live translation would have it"""
+        if source_lang == target_lang or not text or not text.strip():
+            return text
+        if source_lang.lower() != "english":
+            return None
+        return self.store.get(text, target_lang)
+
+    def translate(self, text, source_lang, target_lang):
+        translated = self.pretranslated(text, source_lang, target_lang)
+        if translated is not None:
+            return translated
+        return self.translator.translate(text, source_lang, target_lang)
+
+    def translate_batch(self, texts, source_lang, target_lang):
+        """Stored texts from the store, the rest in one batch to the wrapped translator"""
+        results = [self.pretranslated(text, source_lang, target_lang) for text in texts]
+        missing = [i for i, result in enumerate(results) if result is None]
+        if missing:
+            batch = [texts[i] for i in missing]
+            if hasattr(self.translator, "translate_batch"):
+                translated = self.translator.translate_batch(batch, source_lang, target_lang)
+            else:
+                translated = [self.translator.translate(text, source_lang, target_lang) for text in batch]
+            for i, value in zip(missing, translated):
+                results[i] = value
+        return results
+
+
+def collect_texts(corpus, explanations: Iterable[str] = ()) -> List[str]:
+    """Unique English strings to pre-translate, in a stable order"""
+    texts = list(UI_STRINGS)
+    for column in STATIC_FIELDS:
+        texts.extend(corpus.column(column))
+    texts.extend(explanations)
+    seen = set()
+    unique = []
+    for text in texts:
+        text = str(text)
+        if _useful(text) and text not in seen:
+            seen.add(text)
+            unique.append(text)
+    return unique
+
+
+def build_translations(texts: List[str], languages: List[str], translator,
+                       store: TranslationStore = SHARED_TRANSLATION_STORE,
+                       dataset_hash: str = None, workers: int = 4, save_every: int = 50) -> Dict[str, int]:
+    """
+    Translate every text not yet in the store. Progress is saved every
+    save_every strings, so an interrupted run resumes where it stopped.
+    """
+    translated_counts = {}
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="pretranslate") as pool:
+        for language in languages:
+            missing = [text for text in texts if store.get(text, language) is None]
+            logger.info(f"{language}: {len(texts) - len(missing)} cached, {len(missing)} to translate")
+            done = 0
+            for start in range(0, len(missing), save_every):
+                batch = missing[start:start + save_every]
+                results = pool.map(lambda text: translator.translate(text, "english", language), batch)
+                for text, translated in zip(batch, results):
+                    # The translator returns the input unchanged when it fails; retry those next run
+                    if translated and translated != text:
+                        store.put(text, language, translated)
+                        done += 1
+                store.save(language, dataset_hash)
+            translated_counts[language] = done
+    return translated_counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pre-translate the BNS corpus into the supported languages")
+    parser.add_argument("--languages", nargs="+", default=TARGET_LANGUAGES, choices=TARGET_LANGUAGES)
+    parser.add_argument("--dataset", default=FILE_PATH, help="Path to bnsdataset.xlsx")
+    parser.add_argument("--out", default=TRANSLATIONS_DIR, help="Output directory")
+    parser.add_argument("--skip-explanations", action="store_true", help="Don't translate cached LLM explanations")
+    parser.add_argument("--workers", type=int, default=4, help="Concurrent translation requests")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+
+    from langTranslator import MinimalIndianTranslator
+
+    corpus = load_corpus(args.dataset)
+    explanations = []
+    if not args.skip_explanations:
+        from explanationCache import ExplanationCache
+        explanations = ExplanationCache().explanations()
+    texts = collect_texts(corpus, explanations)
+    print(f"{len(texts)} unique strings ({len(explanations)} cached explanations)")
+
+    counts = build_translations(texts, args.languages, MinimalIndianTranslator(), TranslationStore(args.out),
+                                dataset_hash=corpus.source_hash, workers=args.workers)
+    print(json.dumps(counts, indent=2))
+
+
+if __name__ == "__main__":
+    main()
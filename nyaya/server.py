@@ -1,91 +1,214 @@
 # server.py - Run this first
-import socket
-import threading
+#
+# asyncio chat server for the Inbox. The wire format is newline-delimited
+# JSON in both directions:
+#   client -> server   {"username": "...", "room": "lobby"}   (first line)
+#                      {"message": "..."}
+#                      {"join": "other-room"}
+#   server -> client   {"sender": ..., "message": ..., "timestamp": ..., "room": ...}
+# Every client has a bounded send queue drained by its own writer task, so a
+# broadcast never waits on a slow reader; a client whose queue overflows is
+# disconnected. Load test with chatLoadTest.py.
 import json
+import asyncio
+import logging
+import argparse
 from datetime import datetime
+from typing import Dict, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_ROOM = "lobby"
+SEND_QUEUE_SIZE = 256
+MAX_LINE_BYTES = 64 * 1024
+
+
+class _Client:
+    def __init__(self, writer: asyncio.StreamWriter, queue_size: int):
+        self.writer = writer
+        self.username = None
+        self.room = None
+        self.queue: "asyncio.Queue[Optional[bytes]]" = asyncio.Queue(maxsize=queue_size)
+        self.sender: Optional[asyncio.Task] = None
+
 
 class ChatServer:
-    def __init__(self, host='127.0.0.1', port=8051):
+    def __init__(self, host='127.0.0.1', port=8051, queue_size=SEND_QUEUE_SIZE, max_line=MAX_LINE_BYTES):
         self.host = host
         self.port = port
-        self.server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        self.server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-        self.server_socket.bind((self.host, self.port))
-        self.clients = []
-        self.usernames = {}
-        
-    def start(self):
-        self.server_socket.listen(2)  # Only allowing 2 connections
+        self.queue_size = queue_size
+        self.max_line = max_line
+        self.rooms: Dict[str, Set[_Client]] = {}
+        self.stats = {"connections": 0, "messages_in": 0, "messages_out": 0, "slow_disconnects": 0}
+        self._server = None
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle, self.host, self.port,
+                                                  limit=self.max_line, backlog=4096)
+        self.port = self._server.sockets[0].getsockname()[1]
         print(f"Server started on {self.host}:{self.port}")
-        
-        while len(self.clients) < 2:
-            client_socket, address = self.server_socket.accept()
-            print(f"Connection from {address} established")
-            
-            client_handler = threading.Thread(
-                target=self.handle_client,
-                args=(client_socket,)
-            )
-            client_handler.start()
-            
-    def handle_client(self, client_socket):
-        # Get username
+
+    async def serve_forever(self):
+        if self._server is None:
+            await self.start()
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def stop(self):
+        self._server.close()
+        senders = []
+        for clients in list(self.rooms.values()):
+            for client in list(clients):
+                self._disconnect(client)
+                senders.append(client.sender)
+        await asyncio.gather(*senders, return_exceptions=True)
+        await self._server.wait_closed()
+
+    # ------------------------------------------------------------------ connections
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        client = _Client(writer, self.queue_size)
+        client.sender = asyncio.ensure_future(self._send_loop(client))
+        self.stats["connections"] += 1
         try:
-            username_json = client_socket.recv(1024).decode('utf-8')
-            username_data = json.loads(username_json)
-            username = username_data.get('username', f"User-{len(self.clients)+1}")
-            
-            self.clients.append(client_socket)
-            self.usernames[client_socket] = username
-            
-            # Send welcome message
-            welcome_msg = {
-                "sender": "Server", 
-                "message": f"Welcome {username}! There are {len(self.clients)} user(s) connected.",
-                "timestamp": datetime.now().strftime("%H:%M:%S")
-            }
-            client_socket.send(json.dumps(welcome_msg).encode('utf-8'))
-            
-            # Handle messages
+            hello = await self._read(reader)
+            if hello is None:
+                return
+            client.username = str(hello.get('username') or f"User-{self.stats['connections']}")
+            self._join(client, str(hello.get('room') or DEFAULT_ROOM))
+
             while True:
-                message_json = client_socket.recv(1024).decode('utf-8')
-                if not message_json:
+                data = await self._read(reader)
+                if data is None:
                     break
-                
-                message_data = json.loads(message_json)
-                message = message_data.get('message', '')
-                
+                if data.get('join'):
+                    self._leave(client)
+                    self._join(client, str(data['join']))
+                    continue
+                message = data.get('message', '')
                 if message:
-                    self.broadcast(message, username)
-                    
+                    self.stats["messages_in"] += 1
+                    self.broadcast(message, client.username, client.room)
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.CancelledError):
+            pass
         except Exception as e:
-            print(f"Error: {e}")
+            logger.error(f"Error: {e}")
+        finally:
+            self._leave(client)
+            self._disconnect(client)
+
+    async def _read(self, reader: asyncio.StreamReader) -> Optional[dict]:
+        """Next JSON line; lines that are not JSON objects are skipped"""
+        while True:
+            try:
+                line = await reader.readline()
+            except ValueError:
+                # Longer than max_line: drop the connection rather than buffer it
+                return None
+            if not line:
+                return None
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                data = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if isinstance(data, dict):
+                return data
+
+    async def _send_loop(self, client: _Client):
+        try:
+            while True:
+                data = await client.queue.get()
+                if data is None or client.writer.is_closing():
+                    break
+                client.writer.write(data)
+                # Only drain when the transport buffer is actually full
+                if client.writer.transport.get_write_buffer_size() > 64 * 1024:
+                    await client.writer.drain()
+        except (ConnectionError, asyncio.CancelledError):
+            pass
         finally:
-            # Remove client
-            if client_socket in self.clients:
-                username = self.usernames.get(client_socket, "Unknown")
-                self.clients.remove(client_socket)
-                del self.usernames[client_socket]
-                self.broadcast(f"{username} has left the chat!", "Server")
-                client_socket.close()
-    
-    def broadcast(self, message, sender):
+            client.writer.close()
+
+    def _disconnect(self, client: _Client):
+        if client.sender is not None and not client.sender.done():
+            # Let queued messages flush, then stop; if the queue is full, stop now
+            try:
+                client.queue.put_nowait(None)
+            except asyncio.QueueFull:
+                client.sender.cancel()
+
+    # ------------------------------------------------------------------ rooms
+
+    def _join(self, client: _Client, room: str):
+        client.room = room
+        members = self.rooms.setdefault(room, set())
+        members.add(client)
+        self._send(client, self._encode("Server", f"Welcome {client.username}! There are {len(members)} user(s) connected.", room))
+
+    def _leave(self, client: _Client):
+        members = self.rooms.get(client.room)
+        if members is None or client not in members:
+            return
+        members.discard(client)
+        if not members:
+            del self.rooms[client.room]
+        else:
+            self.broadcast(f"{client.username} has left the chat!", "Server", client.room)
+
+    @staticmethod
+    def _encode(sender: str, message: str, room: str) -> bytes:
         msg = {
-            "sender": sender, 
+            "sender": sender,
             "message": message,
-            "timestamp": datetime.now().strftime("%H:%M:%S")
+            "timestamp": datetime.now().strftime("%H:%M:%S"),
+            "room": room,
         }
-        
-        for client in self.clients:
-            try:
-                client.send(json.dumps(msg).encode('utf-8'))
-            except:
-                # If can't send message, client is probably disconnected
-                if client in self.clients:
-                    self.clients.remove(client)
-                    if client in self.usernames:
-                        del self.usernames[client]
+        return (json.dumps(msg) + "\n").encode('utf-8')
+
+    def _send(self, client: _Client, data: bytes) -> bool:
+        try:
+            client.queue.put_nowait(data)
+            self.stats["messages_out"] += 1
+            return True
+        except asyncio.QueueFull:
+            # Slow consumer: cut it loose instead of buffering without bound
+            self.stats["slow_disconnects"] += 1
+            logger.warning(f"Disconnecting slow client {client.username}")
+            self._leave_quietly(client)
+            client.sender.cancel()
+            return False
+
+    def _leave_quietly(self, client: _Client):
+        members = self.rooms.get(client.room)
+        if members is not None:
+            members.discard(client)
+            if not members:
+                del self.rooms[client.room]
+
+    def broadcast(self, message, sender, room=DEFAULT_ROOM):
+        """Queue one message for every member of a room; never blocks"""
+        data = self._encode(sender, message, room)
+        for client in list(self.rooms.get(room, ())):
+            self._send(client, data)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the Nyaya Inbox chat server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8051)
+    parser.add_argument("--queue-size", type=int, default=SEND_QUEUE_SIZE, help="Per-client send queue length")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    server = ChatServer(args.host, args.port, queue_size=args.queue_size)
+    try:
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        pass
+
 
 if __name__ == "__main__":
-    server = ChatServer()
-    server.start()
\ No newline at end of file
+    main()
@@ -0,0 +1,77 @@
+# translationCache.py - content-addressed cache of translations
+#
+# One process-wide LRU (shared by every Streamlit session) keyed on
+# (sha1(text), source, target), plus a drop-in wrapper for any translator
+# exposing translate(text, source_lang, target_lang).
+import hashlib
+from typing import Dict, List, Optional, Tuple
+
+from queryCache import LRUCache
+
+DEFAULT_MAX_ENTRIES = 5000
+
+
+class TranslationCache:
+    """Thread-safe LRU of translated strings, keyed on (sha1(text), source, target)"""
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self._lru = LRUCache(max_entries)
+
+    @staticmethod
+    def key(text: str, source_lang: str, target_lang: str) -> Tuple[str, str, str]:
+        digest = hashlib.sha1(text.encode("utf-8")).hexdigest()
+        return digest, source_lang.lower(), target_lang.lower()
+
+    def get(self, text: str, source_lang: str, target_lang: str) -> Optional[str]:
+        return self._lru.get(self.key(text, source_lang, target_lang))
+
+    def put(self, text: str, source_lang: str, target_lang: str, translated: str):
+        self._lru.put(self.key(text, source_lang, target_lang), translated)
+
+    def stats(self) -> Dict:
+        return self._lru.stats()
+
+
+# Shared by every session in the process
+SHARED_TRANSLATION_CACHE = TranslationCache()
+
+
+class CachedTranslator:
+    """Wraps a translator so repeated (text, source, target) requests are served from cache"""
+
+    def __init__(self, translator, cache: TranslationCache = SHARED_TRANSLATION_CACHE):
+        self.translator = translator
+        self.cache = cache
+
+    def __getattr__(self, name):
+        # Pass through e.g. set_chunk_size() to the wrapped translator
+        return getattr(self.translator, name)
+
+    def translate(self, text, source_lang, target_lang):
+        if source_lang == target_lang or not text or not text.strip():
+            return text
+        cached = self.cache.get(text, source_lang, target_lang)
+        if cached is not None:
+            return cached
+        translated = self.translator.translate(text, source_lang, target_lang)
+        # The translator falls back to the original text on errors; don't cache that
+        if translated and translated != text:
+            self.cache.put(text, source_lang, target_lang, translated)
+        return translated
+
+    def translate_batch(self, texts: List[str], source_lang, target_lang) -> List[str]:
+        """Cached texts from the cache, the rest in one batch to the wrapped translator"""
+        results = [text if source_lang == target_lang or not text or not text.strip()
+                   else self.cache.get(text, source_lang, target_lang) for text in texts]
+        missing = [i for i, result in enumerate(results) if result is None]
+        if missing:
+            batch = [texts[i] for i in missing]
+            if hasattr(self.translator, "translate_batch"):
+                translated = self.translator.translate_batch(batch, source_lang, target_lang)
+            else:
+                translated = [self.translator.translate(text, source_lang, target_lang) for text in batch]
+            for i, value in zip(missing, translated):
+                if value and value != texts[i]:
+                    self.cache.put(texts[i], source_lang, target_lang, value)
+                results[i] = value
+        return results
@@ -0,0 +1,42 @@
+import os
+import sys
+import time
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "nyaya"))
+
+from firMapping import _CITATION, _CITED_SECTION
+
+
+def cited(text):
+    return [[number.group(0) for number in _CITED_SECTION.finditer(match.group(1))]
+            for match in _CITATION.finditer(text)]
+
+
+class CitationTest(unittest.TestCase):
+    def test_citations(self):
+        self.assertEqual(cited("registered u/s 61(2) of BNS"), [["61(2)"]])
+        self.assertEqual(cited("u/s 303, 318(4) BNS"), [["303", "318(4)"]])
+        self.assertEqual(cited("Sections 115 & 351(2) of Bharatiya Nyaya Sanhita"), [["115", "351(2)"]])
+        self.assertEqual(cited("Ph 9876543210, 61(2) of the BNS"), [["61(2)"]])
+
+    def test_long_numbers_are_not_sections(self):
+        self.assertEqual(cited("1234 BNS"), [])
+        self.assertEqual(cited("Aadhaar 1234 5678 9012"), [])
+
+    def test_digit_runs_are_linear(self):
+        texts = [
+            "1" * 20000,
+            " ".join(["1234"] * 5000),
+            " ".join(["12"] * 5000),
+            ", ".join(["12"] * 5000),
+            "98765 43210 " * 2000,
+        ]
+        for text in texts:
+            start = time.perf_counter()
+            self.assertEqual(cited(text), [])
+            self.assertLess(time.perf_counter() - start, 0.5, text[:40])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,84 @@
+import os
+import sys
+import time
+import asyncio
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "nyaya"))
+
+from fakeGroqServer import FakeGroqServer
+from llmGateway import LLMGateway
+
+MESSAGES = [{"role": "user", "content": "Explain section 303"}]
+MODEL = "llama-3.1-8b-instant"
+
+
+def run(server: FakeGroqServer, scenario, **gateway_options):
+    """Start the fake server, run scenario(gateway) against it on one loop, stop it"""
+    async def main():
+        await server.start()
+        try:
+            gateway = LLMGateway(api_key="test", base_url=server.base_url, **gateway_options)
+            return await scenario(gateway)
+        finally:
+            await server.stop()
+
+    return asyncio.run(main())
+
+
+class LLMGatewayTest(unittest.TestCase):
+    def test_retries_rate_limits_after_retry_after(self):
+        server = FakeGroqServer(fail_first=2, fail_status=429, retry_after=0.05)
+        gateways = []
+
+        async def scenario(gateway):
+            gateways.append(gateway)
+            return await gateway.complete(MESSAGES, MODEL)
+
+        start = time.perf_counter()
+        # A backoff this large would take seconds; Retry-After must win
+        reply = run(server, scenario, backoff_base=30.0, backoff_max=30.0)
+        elapsed = time.perf_counter() - start
+
+        self.assertEqual(reply, server.reply)
+        self.assertEqual(len(server.requests), 3)
+        self.assertEqual(gateways[0].metrics["retries"], 2)
+        self.assertEqual(gateways[0].metrics["failures"], 0)
+        self.assertGreaterEqual(elapsed, 0.1)
+        self.assertLess(elapsed, 5.0)
+
+    def test_identical_prompts_share_one_upstream_call(self):
+        server = FakeGroqServer(first_token_delay=0.2, token_delay=0.01)
+        gateways = []
+
+        async def scenario(gateway):
+            gateways.append(gateway)
+            return await asyncio.gather(*(gateway.complete(MESSAGES, MODEL, key="section-303") for _ in range(5)))
+
+        replies = run(server, scenario)
+
+        self.assertEqual(replies, [server.reply] * 5)
+        self.assertEqual(len(server.requests), 1)
+        self.assertEqual(gateways[0].metrics["upstream_calls"], 1)
+        self.assertEqual(gateways[0].metrics["coalesced"], 4)
+
+    def test_client_errors_are_not_retried(self):
+        server = FakeGroqServer(fail_first=1, fail_status=400)
+        gateways = []
+
+        async def scenario(gateway):
+            gateways.append(gateway)
+            with self.assertRaises(Exception) as raised:
+                await gateway.complete(MESSAGES, MODEL)
+            return raised.exception
+
+        error = run(server, scenario)
+
+        self.assertEqual(getattr(error, "status_code", None), 400)
+        self.assertEqual(len(server.requests), 1)
+        self.assertEqual(gateways[0].metrics["retries"], 0)
+        self.assertEqual(gateways[0].metrics["failures"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
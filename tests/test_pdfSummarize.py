@@ -0,0 +1,55 @@
+import os
+import sys
+import asyncio
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "nyaya"))
+
+import pdfSummarize
+from pdfSummarize import CHARS_PER_TOKEN, DocumentSummarizer, split_chunks
+
+CHUNK_TOKENS = 50
+
+
+class VerboseGateway:
+    """Every reply is longer than a whole chunk, so summaries never shrink"""
+
+    def __init__(self):
+        self.calls = 0
+
+    async def complete(self, messages, model):
+        self.calls += 1
+        return "- fact " * (CHUNK_TOKENS * CHARS_PER_TOKEN // 6 * 2)
+
+
+def document(pages: int) -> str:
+    return "".join(f"--- Page {n} ---\n" + "The accused took the phone. " * 10 + "\n\n" for n in range(1, pages + 1))
+
+
+class SummarizeTest(unittest.TestCase):
+    def test_blank_text_makes_no_request(self):
+        gateway = VerboseGateway()
+        self.assertEqual(split_chunks("--- Page 1 ---\n\n"), [])
+        self.assertEqual(asyncio.run(DocumentSummarizer(gateway).summarize("--- Page 1 ---\n\n")), "")
+        self.assertEqual(gateway.calls, 0)
+
+    def test_reduce_terminates_when_summaries_never_shrink(self):
+        gateway = VerboseGateway()
+        summarizer = DocumentSummarizer(gateway, chunk_tokens=CHUNK_TOKENS)
+        summary = asyncio.run(asyncio.wait_for(summarizer.summarize(document(16)), 10))
+        self.assertTrue(summary)
+        chunks = summarizer.stats["chunks"]
+        self.assertGreater(chunks, 1)
+        # One request per chunk, then at most one per partial at each halving level
+        self.assertLess(gateway.calls, 2 * chunks + summarizer.stats["levels"])
+
+    def test_reduce_levels_are_capped(self):
+        summarizer = DocumentSummarizer(VerboseGateway(), chunk_tokens=CHUNK_TOKENS)
+        with mock.patch.object(pdfSummarize, "MAX_REDUCE_LEVELS", 2):
+            with self.assertRaises(RuntimeError):
+                asyncio.run(asyncio.wait_for(summarizer.summarize(document(16)), 10))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,83 @@
+import os
+import sys
+import unittest
+import multiprocessing
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "nyaya"))
+
+import fitz
+
+import pdfUsingOCR
+
+
+class FakeEngine:
+    name = "fake"
+    version = "0"
+
+    def recognize(self, samples, width, height, dpi):
+        return "scanned page text"
+
+
+class CrashingEngine(FakeEngine):
+    def recognize(self, samples, width, height, dpi):
+        os._exit(1)
+
+
+class UnpicklableError(Exception):
+    # Unpickling calls __init__ with the message only, which fails
+    def __init__(self, message, detail):
+        super().__init__(message)
+        self.detail = detail
+
+
+class FailingEngine(FakeEngine):
+    def recognize(self, samples, width, height, dpi):
+        raise UnpicklableError("tesseract is not installed", "detail")
+
+
+def blank_pdf(pages: int = 4) -> bytes:
+    document = fitz.open()
+    for _ in range(pages):
+        document.new_page(width=200, height=200)
+    data = document.tobytes()
+    document.close()
+    return data
+
+
+@unittest.skipUnless(multiprocessing.get_start_method() == "fork",
+                     "fake engines reach the pool workers by fork")
+class OcrPoolRecoveryTest(unittest.TestCase):
+    def setUp(self):
+        # Installed before the pool forks, so every worker has them; the
+        # language key picks the engine per call
+        pdfUsingOCR._worker_engines.update({
+            ("auto", "ok"): FakeEngine(),
+            ("auto", "crash"): CrashingEngine(),
+            ("auto", "fail"): FailingEngine(),
+        })
+        self.pdf = blank_pdf()
+
+    def tearDown(self):
+        if pdfUsingOCR._pool is not None:
+            pdfUsingOCR._pool.shutdown()
+            pdfUsingOCR._pool = None
+
+    def extract(self, languages):
+        return pdfUsingOCR.extract_pages(self.pdf, workers=2, languages=languages, use_cache=False)
+
+    def test_next_call_succeeds_after_a_worker_crash(self):
+        with self.assertRaises(RuntimeError):
+            self.extract("crash")
+        pages = self.extract("ok")
+        self.assertEqual([p["text"] for p in pages], ["scanned page text"] * 4)
+
+    def test_engine_errors_fail_the_document_not_the_pool(self):
+        with self.assertRaises(RuntimeError) as raised:
+            self.extract("fail")
+        self.assertIn("tesseract is not installed", str(raised.exception))
+        self.assertFalse(pdfUsingOCR._pool._broken)
+        self.assertEqual(len(self.extract("ok")), 4)
+
+
+if __name__ == "__main__":
+    unittest.main()